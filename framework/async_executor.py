@@ -0,0 +1,184 @@
+"""
+Module to run remote operations concurrently from asyncio code
+"""
+
+import asyncio
+import functools
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from framework.remote_transfer import download_file
+from framework.ssh_connection_manager import SSHConnectionManager
+
+log = logging.getLogger(__name__)
+
+_default_executor = None
+_default_executor_lock = threading.Lock()
+
+
+class AsyncRemoteExecutor:
+    """
+    An asyncio front for running remote operations over the connection pool
+
+    Each operation runs on a pooled connection in a worker thread, so the
+    blocking SSH calls of many operations overlap while the event loop
+    keeps scheduling new ones. At most `concurrency` operations run at once,
+    and the rest wait for a free worker.
+
+    Example usage:
+        executor = AsyncRemoteExecutor(concurrency=8)
+        results = asyncio.run(
+            executor.gather(*[executor.run(f"getent passwd {uid}") for uid in uids])
+        )
+
+    """
+
+    def __init__(self, concurrency=None, pool=None):
+        """
+        Args:
+            concurrency (int): The maximum number of operations to run at once.
+                               Defaults to the size of the connection pool.
+            pool (ConnectionPool): The pool to run the operations over.
+                                   Defaults to the SSHConnectionManager pool.
+
+        """
+        self._pool = pool
+        self.concurrency = concurrency or self.pool.size
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.concurrency, thread_name_prefix="async-remote"
+        )
+
+    @property
+    def pool(self):
+        # Resolved on every access, so the executor outlives a reconnection
+        return self._pool or SSHConnectionManager().pool
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    async def run(self, cmd):
+        """
+        Execute a command on the remote host
+
+        Args:
+            cmd (str): Command to run on host
+
+        Returns:
+            tuple: tuple which contains command return code, output and error
+
+        """
+        return await self.submit(lambda conn: conn.exec_cmd(cmd))
+
+    async def run_batch(self, batch, parallelism=1, stop_on_failure=False):
+        """
+        Run a RemoteBatch on the remote host
+
+        Args:
+            batch (RemoteBatch): The batch to run
+            parallelism (int): The maximum number of commands to run at once
+            stop_on_failure (bool): Whether to skip the remaining commands
+                                    after the first failure
+
+        Returns:
+            list: A BatchResult for each command of the batch, in order
+
+        """
+        return await self.submit(
+            lambda conn: batch.run(
+                parallelism=parallelism, stop_on_failure=stop_on_failure, conn=conn
+            )
+        )
+
+    async def upload(self, local_path, remote_path):
+        """
+        Upload a file to the remote host
+
+        Args:
+            local_path (str): The full path to the local file
+            remote_path (str): The full path to the file on the remote host
+
+        """
+        return await self.submit(lambda conn: conn.upload_file(local_path, remote_path))
+
+    async def download(self, remote_path, local_path, **kwargs):
+        """
+        Download a file from the remote host in chunks
+
+        Args:
+            remote_path (str): The full path to the file on the remote host
+            local_path (str): The full path to the local file
+            **kwargs: Keyword arguments to pass to remote_transfer.download_file
+
+        Returns:
+            int: The number of bytes written to the local file
+
+        """
+        return await self.submit(
+            functools.partial(download_file, remote_path, local_path, **kwargs),
+            conn_kwarg="conn",
+        )
+
+    async def submit(self, func, conn_kwarg=None):
+        """
+        Run a blocking function with a pooled connection in a worker thread
+
+        Args:
+            func (func): The function to run. Gets the connection as its only
+                         positional argument, or as conn_kwarg if given.
+            conn_kwarg (str): The keyword argument to pass the connection as
+
+        Returns:
+            Any: The return value of the function
+
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, self._run_with_connection, func, conn_kwarg
+        )
+
+    @staticmethod
+    async def gather(*aws, return_exceptions=False):
+        """
+        Wait for several operations to complete
+
+        Args:
+            *aws: The awaitables of the operations
+            return_exceptions (bool): Whether to return the exceptions of
+                                      failed operations instead of raising the first
+
+        Returns:
+            list: The results of the operations, in order
+
+        """
+        return await asyncio.gather(*aws, return_exceptions=return_exceptions)
+
+    def close(self):
+        """
+        Stop the worker threads once the pending operations are done
+        """
+        self._executor.shutdown(wait=True)
+
+    def _run_with_connection(self, func, conn_kwarg):
+        with self.pool.checkout() as conn:
+            if conn_kwarg:
+                return func(**{conn_kwarg: conn})
+            return func(conn)
+
+
+def get_default_executor():
+    """
+    Get the executor shared by the async operations of the managers
+
+    Returns:
+        AsyncRemoteExecutor: The shared executor
+
+    """
+    global _default_executor
+    with _default_executor_lock:
+        if _default_executor is None:
+            _default_executor = AsyncRemoteExecutor()
+        return _default_executor
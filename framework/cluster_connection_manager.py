@@ -0,0 +1,311 @@
+"""
+Module to connect to all the hosts of a scale-out NSFS deployment
+"""
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from framework import config
+from framework.remote_batch import RemoteBatch
+from framework.ssh_connection_manager import SSHConnectionManager
+from noobaa_sa import constants
+from noobaa_sa.exceptions import UnexpectedBehaviour
+from utility.host_facts import get_host_facts, invalidate_host_facts
+from utility.retry import retry_until_timeout
+
+log = logging.getLogger(__name__)
+
+
+class ClusterConnectionManager:
+    """
+    A class that connects to every host of an NSFS cluster
+
+    The hosts are taken from ENV_DATA["noobaa_sa_hosts"], and default to
+    noobaa_sa_host alone. They are all connected to with the credentials of
+    noobaa_sa_host, and each connection is only established once it is first
+    needed.
+
+    Example usage:
+        cluster = ClusterConnectionManager()
+        results = cluster.broadcast("nproc")
+        cluster.rolling_restart()
+
+    """
+
+    _instance = None
+
+    def __new__(cls, *args, **kwargs):
+        if not cls._instance:
+            cls._instance = super(ClusterConnectionManager, cls).__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        if getattr(self, "_initialized", False):
+            return
+        self._initialized = True
+        self._connections = {}
+        self._lock = threading.Lock()
+        self.hosts = list(
+            config.ENV_DATA.get("noobaa_sa_hosts")
+            or [config.ENV_DATA["noobaa_sa_host"]]
+        )
+
+    def connection(self, host):
+        """
+        Get the connection to a host of the cluster
+
+        Args:
+            host (str): The host
+
+        Returns:
+            Connection: The connection to the host
+
+        Raises:
+            ValueError: If the host is not part of the cluster
+
+        """
+        if host not in self.hosts:
+            raise ValueError(f"{host} is not one of the cluster hosts {self.hosts}")
+        with self._lock:
+            conn = self._connections.get(host)
+        if conn is not None:
+            return conn
+        # Connect outside the lock, so the hosts are connected to concurrently
+        new_conn = SSHConnectionManager().create_connection(host)
+        with self._lock:
+            conn = self._connections.setdefault(host, new_conn)
+        if conn is not new_conn:
+            # Another thread connected to the host in the meantime
+            new_conn.close()
+        return conn
+
+    def exec_on(self, host, cmd):
+        """
+        Execute a command on a single host of the cluster
+
+        Args:
+            host (str): The host to run the command on
+            cmd (str): The command to run
+
+        Returns:
+            tuple: tuple which contains command return code, output and error
+
+        """
+        return self.connection(host).exec_cmd(cmd)
+
+    def broadcast(self, cmd, hosts=None, concurrency=None):
+        """
+        Execute a command on several hosts of the cluster in parallel
+
+        Args:
+            cmd (str|func): The command to run, or a function that gets a host
+                            and returns the command to run on it
+            hosts (list): The hosts to run the command on. Defaults to all hosts.
+            concurrency (int): The maximum number of hosts to run on at once.
+                               Defaults to all of them.
+
+        Returns:
+            dict: Every host mapped to the (retcode, stdout, stderr) tuple of
+                  the command on it
+
+        """
+        hosts = self.hosts if hosts is None else list(hosts)
+        if not hosts:
+            return {}
+        log.info(f"Broadcasting a command to {len(hosts)} hosts")
+
+        def _exec(host):
+            return self.exec_on(host, cmd(host) if callable(cmd) else cmd)
+
+        with ThreadPoolExecutor(max_workers=concurrency or len(hosts)) as executor:
+            return dict(zip(hosts, executor.map(_exec, hosts)))
+
+    def get_facts(self, host, refresh=False):
+        """
+        Get the cached facts of a host of the cluster
+
+        Args:
+            host (str): The host
+            refresh (bool): Whether to probe the host again even if cached
+
+        Returns:
+            dict: The host facts, see utility.host_facts.get_host_facts
+
+        """
+        return get_host_facts(self.connection(host), refresh=refresh)
+
+    def get_all_facts(self, refresh=False):
+        """
+        Get the cached facts of all the hosts, probing the missing ones in parallel
+
+        Args:
+            refresh (bool): Whether to probe the hosts again even if cached
+
+        Returns:
+            dict: Every host mapped to its facts
+
+        """
+        with ThreadPoolExecutor(max_workers=len(self.hosts)) as executor:
+            facts = executor.map(lambda host: self.get_facts(host, refresh), self.hosts)
+            return dict(zip(self.hosts, facts))
+
+    def rolling(self, func, hosts=None, wait_for=None, timeout=300, interval=5):
+        """
+        Apply an operation to the hosts one at a time
+
+        After the operation is applied to a host, the next one is only
+        started once the host is ready again, so the rest of the cluster
+        keeps serving in the meantime. If the operation fails on a host, the
+        hosts after it are left untouched.
+
+        Args:
+            func (func): A function that gets the connection to a host and
+                         applies the operation to it. It should raise if
+                         the operation failed.
+            hosts (list): The hosts to apply the operation to. Defaults to all hosts.
+            wait_for (func): A function that gets the connection to a host and
+                             returns True once the host is ready again
+            timeout (int): The maximum seconds to wait for a host to be ready
+            interval (int): The seconds between readiness checks
+
+        Returns:
+            dict: Every host mapped to the return value of func on it
+
+        Raises:
+            UnexpectedBehaviour: If a host wasn't ready within the timeout
+            Any exception: The exception raised by func
+
+        """
+        results = {}
+        for host in self.hosts if hosts is None else hosts:
+            conn = self.connection(host)
+            log.info(f"Rolling operation on {host}")
+            results[host] = func(conn)
+            if wait_for:
+
+                def _check_ready():
+                    if not wait_for(conn):
+                        raise UnexpectedBehaviour(f"{host} is not ready yet")
+                    return True
+
+                retry_until_timeout(_check_ready, timeout=timeout, interval=interval)
+        return results
+
+    def rolling_restart(
+        self, service=constants.NSFS_SERVICE_NAME, hosts=None, timeout=300
+    ):
+        """
+        Restart a service on the hosts one at a time
+
+        Args:
+            service (str): The systemd service to restart
+            hosts (list): The hosts to restart the service on. Defaults to all hosts.
+            timeout (int): The maximum seconds to wait for the service on each host
+
+        Returns:
+            dict: Every host mapped to the (retcode, stdout, stderr) tuple of
+                  the restart command on it
+
+        Raises:
+            UnexpectedBehaviour: If the service failed to restart on a host,
+                                 or wasn't active again within the timeout
+
+        """
+
+        def _restart(conn):
+            result = conn.exec_cmd(f"sudo systemctl restart {service}")
+            invalidate_host_facts(conn.host)
+            retcode, _, stderr = result
+            if retcode != 0:
+                raise UnexpectedBehaviour(
+                    f"Failed to restart {service} on {conn.host}, stopping the "
+                    f"rolling restart\nretcode: {retcode}\nstderr: {stderr}"
+                )
+            return result
+
+        def _is_active(conn):
+            retcode, _, _ = conn.exec_cmd(f"sudo systemctl is-active --quiet {service}")
+            return retcode == 0
+
+        return self.rolling(_restart, hosts=hosts, wait_for=_is_active, timeout=timeout)
+
+    def rolling_config_update(
+        self,
+        remote_path,
+        content,
+        mode=None,
+        restart_service=constants.NSFS_SERVICE_NAME,
+        hosts=None,
+        timeout=300,
+    ):
+        """
+        Write a config file on the hosts one at a time, restarting the service
+        on each host before moving on to the next one
+
+        Args:
+            remote_path (str): The full path of the config file on the hosts
+            content (str|bytes): The content of the config file
+            mode (str): The permissions to set on the file, e.g. "600"
+            restart_service (str): The systemd service to restart after the
+                                   file was written, or None to not restart
+            hosts (list): The hosts to update. Defaults to all hosts.
+            timeout (int): The maximum seconds to wait for the service on each host
+
+        Returns:
+            dict: Every host mapped to the BatchResults of the update on it
+
+        Raises:
+            UnexpectedBehaviour: If the file couldn't be written or the service
+                                 failed to restart on a host, or the service
+                                 wasn't active again within the timeout
+
+        """
+
+        def _update(conn):
+            batch = RemoteBatch(conn)
+            batch.add_file(remote_path, content, mode=mode, name="write")
+            if restart_service:
+                batch.add(f"sudo systemctl restart {restart_service}", name="restart")
+            results = batch.run(stop_on_failure=True)
+            invalidate_host_facts(conn.host)
+            actions = {
+                "write": f"write {remote_path}",
+                "restart": f"restart {restart_service}",
+            }
+            for result in results:
+                if result.retcode != 0:
+                    raise UnexpectedBehaviour(
+                        f"Failed to {actions[result.name]} on {conn.host}, stopping "
+                        f"the rolling update\nretcode: {result.retcode}"
+                        f"\nstderr: {result.stderr}"
+                    )
+            return results
+
+        def _is_active(conn):
+            retcode, _, _ = conn.exec_cmd(
+                f"sudo systemctl is-active --quiet {restart_service}"
+            )
+            return retcode == 0
+
+        return self.rolling(
+            _update,
+            hosts=hosts,
+            wait_for=_is_active if restart_service else None,
+            timeout=timeout,
+        )
+
+    @classmethod
+    def close_connection(cls):
+        """
+        Closes the connections to all the hosts
+        """
+        if cls._instance:
+            for conn in cls._instance._connections.values():
+                conn.close()
+            cls._instance = None
+
+
+def pytest_sessionfinish(session, exitstatus):
+    # Close the cluster connections at the end of the pytest session
+    ClusterConnectionManager.close_connection()
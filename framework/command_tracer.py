@@ -0,0 +1,367 @@
+"""
+Module to trace the latency of the commands run on the remote host
+"""
+
+import heapq
+import itertools
+import logging
+import os
+import threading
+import time
+from collections import namedtuple
+
+log = logging.getLogger(__name__)
+
+DEFAULT_TOP_N = 10
+
+CommandRecord = namedtuple(
+    "CommandRecord",
+    ["command_class", "cmd", "duration", "bytes_in", "bytes_out", "retcode", "test"],
+)
+CommandRecord.__doc__ = """
+A single traced remote call
+
+Attributes:
+    command_class (str): The class of the command, e.g. "noobaa-cli account add"
+    cmd (str): The command, or the paths of a file transfer
+    duration (float): The wall time of the call in seconds
+    bytes_in (int): The number of bytes sent to the remote host
+    bytes_out (int): The number of bytes received from the remote host
+    retcode (int|None): The exit code, or None if the call raised
+    test (str|None): The node id of the test that ran the call
+"""
+
+
+def classify_command(cmd):
+    """
+    Get the class of a command, to aggregate similar commands by
+
+    Args:
+        cmd (str): The shell command
+
+    Returns:
+        str: The class of the command, e.g. "noobaa-cli account add",
+             "systemctl restart" or "getent"
+
+    """
+    words = cmd.split()
+    # Skip sudo, its options and environment variable assignments
+    while words and (
+        words[0] == "sudo"
+        or words[0].startswith("-")
+        or ("=" in words[0] and not words[0].startswith("="))
+    ):
+        words.pop(0)
+    if not words:
+        return "other"
+    program = os.path.basename(words[0])
+    if program == "noobaa-cli":
+        subcommands = list(
+            itertools.takewhile(lambda word: not word.startswith("-"), words[1:3])
+        )
+        return " ".join([program] + subcommands)
+    if program == "systemctl" and len(words) > 1:
+        return f"{program} {words[1]}"
+    return program
+
+
+class CommandTracer:
+    """
+    Collects the latency of remote calls per test and for the whole session
+
+    The calls of the whole session are kept aggregated per command class,
+    with only the slowest ones kept in full, so the memory use doesn't grow
+    with the number of commands run.
+
+    Example usage:
+        tracer.start_test("tests/test_bucket.py::test_create")
+        ...
+        breakdown = tracer.end_test()
+        slowest = tracer.get_slowest(5)
+
+    """
+
+    def __init__(self, top_n=DEFAULT_TOP_N):
+        """
+        Args:
+            top_n (int): The number of slowest calls to keep
+
+        """
+        self.top_n = top_n
+        self._lock = threading.Lock()
+        self._counter = itertools.count()
+        self.reset()
+
+    def reset(self):
+        """
+        Drop all the traced calls
+        """
+        with self._lock:
+            self.current_test = None
+            self._session_stats = {}
+            self._test_stats = {}
+            self._slowest = []
+
+    def record(self, command_class, cmd, duration, bytes_in, bytes_out, retcode):
+        """
+        Record a remote call
+
+        Args:
+            command_class (str): The class of the call, see classify_command
+            cmd (str): The command, or the paths of a file transfer
+            duration (float): The wall time of the call in seconds
+            bytes_in (int): The number of bytes sent to the remote host
+            bytes_out (int): The number of bytes received from the remote host
+            retcode (int|None): The exit code, or None if the call raised
+
+        """
+        with self._lock:
+            record = CommandRecord(
+                command_class,
+                cmd,
+                duration,
+                bytes_in,
+                bytes_out,
+                retcode,
+                self.current_test,
+            )
+            _add_to_stats(self._session_stats, record)
+            if self.current_test is not None:
+                _add_to_stats(self._test_stats, record)
+            entry = (duration, next(self._counter), record)
+            if len(self._slowest) < self.top_n:
+                heapq.heappush(self._slowest, entry)
+            elif duration > self._slowest[0][0]:
+                heapq.heapreplace(self._slowest, entry)
+
+    def start_test(self, nodeid):
+        """
+        Attribute the following calls to a test
+
+        Args:
+            nodeid (str): The node id of the test
+
+        """
+        with self._lock:
+            self.current_test = nodeid
+            self._test_stats = {}
+
+    def get_test_breakdown(self):
+        """
+        Returns:
+            list: The stats of the calls of the current test per command class,
+                  see get_session_breakdown
+
+        """
+        with self._lock:
+            return _sorted_breakdown(self._test_stats)
+
+    def end_test(self):
+        """
+        Stop attributing calls to the current test
+
+        Returns:
+            list: The stats of the calls of the test per command class,
+                  see get_session_breakdown
+
+        """
+        with self._lock:
+            breakdown = _sorted_breakdown(self._test_stats)
+            self.current_test = None
+            self._test_stats = {}
+        return breakdown
+
+    def get_session_breakdown(self):
+        """
+        Returns:
+            list: A dict per command class, sorted by the total time spent
+                  on it, with the keys "command_class", "count",
+                  "total_time", "max_time", "bytes_in", "bytes_out" and "failures"
+
+        """
+        with self._lock:
+            return _sorted_breakdown(self._session_stats)
+
+    def get_slowest(self, n=None):
+        """
+        Args:
+            n (int): The number of calls to return. Defaults to top_n.
+
+        Returns:
+            list: The slowest CommandRecords of the session, slowest first
+
+        """
+        with self._lock:
+            slowest = sorted(self._slowest, reverse=True)
+        return [record for _, _, record in slowest[: n or self.top_n]]
+
+
+def format_breakdown(breakdown):
+    """
+    Format a breakdown of remote calls as a text table
+
+    Args:
+        breakdown (list): The breakdown, see CommandTracer.get_session_breakdown
+
+    Returns:
+        str: The text table
+
+    """
+    lines = [
+        f"{'command':<40} {'count':>7} {'total(s)':>10} {'max(s)':>8} "
+        f"{'in(B)':>10} {'out(B)':>10} {'failed':>6}"
+    ]
+    for stats in breakdown:
+        lines.append(
+            f"{stats['command_class']:<40} {stats['count']:>7} "
+            f"{stats['total_time']:>10.3f} {stats['max_time']:>8.3f} "
+            f"{stats['bytes_in']:>10} {stats['bytes_out']:>10} {stats['failures']:>6}"
+        )
+    return "\n".join(lines)
+
+
+def _add_to_stats(stats, record):
+    class_stats = stats.setdefault(
+        record.command_class,
+        {
+            "command_class": record.command_class,
+            "count": 0,
+            "total_time": 0.0,
+            "max_time": 0.0,
+            "bytes_in": 0,
+            "bytes_out": 0,
+            "failures": 0,
+        },
+    )
+    class_stats["count"] += 1
+    class_stats["total_time"] += record.duration
+    class_stats["max_time"] = max(class_stats["max_time"], record.duration)
+    class_stats["bytes_in"] += record.bytes_in
+    class_stats["bytes_out"] += record.bytes_out
+    if record.retcode != 0:
+        class_stats["failures"] += 1
+
+
+def _sorted_breakdown(stats):
+    return sorted(
+        (dict(class_stats) for class_stats in stats.values()),
+        key=lambda class_stats: class_stats["total_time"],
+        reverse=True,
+    )
+
+
+tracer = CommandTracer()
+
+
+class InstrumentedConnection:
+    """
+    A connection proxy that traces every remote call of the wrapped connection
+
+    All the attributes that aren't traced are delegated to the wrapped connection.
+
+    """
+
+    def __init__(self, conn, command_tracer=None):
+        """
+        Args:
+            conn (Connection): The connection to trace
+            command_tracer (CommandTracer): The tracer to record the calls with.
+                                            Defaults to the session tracer.
+
+        """
+        self.conn = conn
+        self.tracer = command_tracer or tracer
+
+    def __getattr__(self, name):
+        return getattr(self.conn, name)
+
+    def exec_cmd(self, cmd):
+        start = time.perf_counter()
+        retcode, stdout, stderr = None, "", ""
+        try:
+            retcode, stdout, stderr = self.conn.exec_cmd(cmd)
+            return retcode, stdout, stderr
+        finally:
+            self.tracer.record(
+                classify_command(cmd),
+                cmd,
+                time.perf_counter() - start,
+                len(cmd),
+                len(stdout) + len(stderr),
+                retcode,
+            )
+
+    def exec_script(self, script):
+        from framework.remote_batch import run_script
+
+        start = time.perf_counter()
+        retcode, stdout, stderr = None, "", ""
+        try:
+            retcode, stdout, stderr = run_script(self.conn, script)
+            return retcode, stdout, stderr
+        finally:
+            self.tracer.record(
+                "batch",
+                f"<batch script of {len(script)} bytes>",
+                time.perf_counter() - start,
+                len(script),
+                len(stdout) + len(stderr),
+                retcode,
+            )
+
+    def exec_cmd_stream(self, cmd, chunk_size=None):
+        from framework.remote_stream import DEFAULT_STREAM_CHUNK_SIZE, exec_cmd_stream
+
+        start = time.perf_counter()
+        retcode = None
+        bytes_out = 0
+        try:
+            for chunk in exec_cmd_stream(
+                cmd, conn=self.conn, chunk_size=chunk_size or DEFAULT_STREAM_CHUNK_SIZE
+            ):
+                bytes_out += len(chunk)
+                yield chunk
+            retcode = 0
+        finally:
+            self.tracer.record(
+                classify_command(cmd),
+                cmd,
+                time.perf_counter() - start,
+                len(cmd),
+                bytes_out,
+                retcode,
+            )
+
+    def upload_file(self, localpath, remotepath):
+        start = time.perf_counter()
+        retcode = None
+        try:
+            result = self.conn.upload_file(localpath, remotepath)
+            retcode = 0
+            return result
+        finally:
+            self.tracer.record(
+                "upload",
+                f"{localpath} -> {remotepath}",
+                time.perf_counter() - start,
+                os.path.getsize(localpath) if os.path.exists(localpath) else 0,
+                0,
+                retcode,
+            )
+
+    def download_file(self, remotepath, localpath):
+        start = time.perf_counter()
+        retcode = None
+        try:
+            result = self.conn.download_file(remotepath, localpath)
+            retcode = 0
+            return result
+        finally:
+            self.tracer.record(
+                "download",
+                f"{remotepath} -> {localpath}",
+                time.perf_counter() - start,
+                0,
+                os.path.getsize(localpath) if os.path.exists(localpath) else 0,
+                retcode,
+            )
@@ -8,6 +8,7 @@ from email.mime.text import MIMEText
 from pathlib import Path
 from jinja2 import Environment, FileSystemLoader
 from framework import config
+from framework.command_tracer import DEFAULT_TOP_N, format_breakdown, tracer
 from utility.utils import get_noobaa_sa_rpm_name
 
 
@@ -19,6 +20,18 @@ def pytest_sessionstart(session):
     Prepare results dict
     """
     session.results = dict()
+    tracer.top_n = config.REPORTING.get("slow_commands_top_n", DEFAULT_TOP_N)
+    tracer.reset()
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_protocol(item, nextitem):
+    """
+    Attribute the remote commands run by each test to it
+    """
+    tracer.start_test(item.nodeid)
+    yield
+    tracer.end_test()
 
 
 @pytest.mark.hookwrapper
@@ -45,12 +58,29 @@ def pytest_runtest_makereport(item, call):
         item.session.results[item] = report
     if report.when in ("setup", "teardown") and report.failed:
         item.session.results[item] = report
+    if report.when == "teardown":
+        breakdown = tracer.get_test_breakdown()
+        if breakdown:
+            commands_report = format_breakdown(breakdown)
+            log.info(f"Remote commands of {item.nodeid}:\n{commands_report}")
+            report.sections.append(("Remote commands", commands_report))
+
+
+@pytest.hookimpl(optionalhook=True)
+def pytest_html_results_summary(prefix, summary, postfix):
+    """
+    Add the breakdown of the remote commands and the slowest ones to the HTML report
+    """
+    prefix.append(create_remote_commands_html())
 
 
 def pytest_sessionfinish(session, exitstatus):
     """
     save session's report files and send email report
     """
+    breakdown = tracer.get_session_breakdown()
+    if breakdown:
+        log.info(f"Remote commands of the session:\n{format_breakdown(breakdown)}")
     # send_email_reports(session)
     if config.RUN["cli_params"].get("email"):
         send_email_reports(session)
@@ -130,11 +160,7 @@ def create_results_html(session):
     # jenkins job link
     website_link = config.RUN.get("jenkins_build_url")
 
-    # Set up Jinja2 environment and load template
-    current_dir = Path(__file__).parent.parent.parent
-    template_dir = os.path.join(current_dir, "templates", "html_reports")
-    env = Environment(loader=FileSystemLoader(template_dir))
-    template = env.get_template("report_template.j2")
+    template = _get_template_env().get_template("report_template.j2")
 
     # Render the template with context data
     html_output = template.render(
@@ -144,6 +170,30 @@ def create_results_html(session):
         failed_tests=failed_tests,
         passed_tests=passed_tests,
         skipped_tests=skipped_tests,
+        command_breakdown=tracer.get_session_breakdown(),
+        slowest_commands=tracer.get_slowest(),
     )
 
     return html_output
+
+
+def create_remote_commands_html():
+    """
+    Create the HTML tables of the remote commands run in the session
+
+    Returns:
+        str: The breakdown per command class and the slowest commands as HTML
+
+    """
+    template = _get_template_env().get_template("remote_commands.j2")
+    return template.render(
+        command_breakdown=tracer.get_session_breakdown(),
+        slowest_commands=tracer.get_slowest(),
+    )
+
+
+def _get_template_env():
+    # Set up Jinja2 environment to load the templates of the HTML reports
+    current_dir = Path(__file__).parent.parent.parent
+    template_dir = os.path.join(current_dir, "templates", "html_reports")
+    return Environment(loader=FileSystemLoader(template_dir))
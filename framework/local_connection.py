@@ -0,0 +1,224 @@
+"""
+Module to run the remote operations on the local machine when it is the NooBaa host
+"""
+
+import codecs
+import getpass
+import logging
+import shutil
+import socket
+import subprocess
+import tempfile
+
+from noobaa_sa.exceptions import UnexpectedBehaviour
+
+log = logging.getLogger(__name__)
+
+DEFAULT_STREAM_CHUNK_SIZE = 64 * 1024
+
+
+class LocalConnection:
+    """
+    A connection backend that runs commands as local subprocesses
+
+    It has the same interface as Connection, so it can be used by everything
+    that runs on the NooBaa host without the overhead of SSH. Files are
+    copied natively instead of over SFTP.
+
+    """
+
+    is_local = True
+
+    def __init__(self, host="localhost", user=None):
+        """
+        Args:
+            host (str): The name the host is configured with
+            user (str): The user the commands run as. Defaults to the current user.
+
+        """
+        self.host = host
+        self.user = user or getpass.getuser()
+
+    def close(self):
+        pass
+
+    def exec_cmd(self, cmd):
+        """
+        Executes command on the local machine
+
+        Args:
+            cmd (str): Command to run
+
+        Returns:
+            tuple: tuple which contains command return code, output and error
+
+        """
+        log.info(f"Executing cmd: {cmd} locally on {self.host}")
+        return self._run(cmd)
+
+    def exec_script(self, script):
+        """
+        Run a bash script on the local machine by feeding it to bash's stdin
+
+        Args:
+            script (str): The bash script to run
+
+        Returns:
+            tuple: tuple which contains the script's return code, output and error
+
+        """
+        return self._run("bash -s", input_data=script)
+
+    def exec_cmd_stream(self, cmd, chunk_size=DEFAULT_STREAM_CHUNK_SIZE):
+        """
+        Execute a command on the local machine and yield its output as it arrives
+
+        Args:
+            cmd (str): Command to run
+            chunk_size (int): The maximum number of bytes to read at a time
+
+        Yields:
+            str: Chunks of the decoded stdout of the command
+
+        Raises:
+            UnexpectedBehaviour: If the command exits with a non-zero return code.
+                                 Raised once the output is exhausted.
+
+        """
+        log.info(f"Streaming cmd: {cmd} locally on {self.host}")
+        with tempfile.TemporaryFile() as stderr_file:
+            process = subprocess.Popen(
+                cmd,
+                shell=True,
+                executable="/bin/bash",
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.PIPE,
+                stderr=stderr_file,
+            )
+            decoder = codecs.getincrementaldecoder("utf-8")("replace")
+            try:
+                while True:
+                    data = process.stdout.read1(chunk_size)
+                    text = decoder.decode(data, final=not data)
+                    if text:
+                        yield text
+                    if not data:
+                        break
+            finally:
+                process.stdout.close()
+                retcode = process.wait()
+            if retcode != 0:
+                stderr_file.seek(0)
+                stderr = stderr_file.read().decode("utf-8", "replace")
+                raise UnexpectedBehaviour(
+                    f"Command {cmd} failed with retcode {retcode}\nstderr: {stderr}"
+                )
+
+    def upload_file(self, localpath, remotepath):
+        """
+        Copy a file to its target path
+
+        Args:
+            localpath (str): file to copy
+            remotepath (str): target path. filename should be included
+
+        """
+        log.info(f"Copying {localpath} to {remotepath}")
+        shutil.copyfile(localpath, remotepath)
+
+    def download_file(self, remotepath, localpath):
+        """
+        Copy a file from its source path
+
+        Args:
+            remotepath (str): source path. filename should be included
+            localpath (str): file to copy to
+
+        """
+        log.info(f"Copying {remotepath} to {localpath}")
+        shutil.copyfile(remotepath, localpath)
+
+    def _run(self, cmd, input_data=None):
+        completed = subprocess.run(
+            cmd,
+            shell=True,
+            executable="/bin/bash",
+            input=input_data.encode("utf-8") if input_data is not None else None,
+            stdin=subprocess.DEVNULL if input_data is None else None,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        )
+        stdout = completed.stdout.decode("utf-8", "replace").strip("\n")
+        stderr = completed.stderr.decode("utf-8", "replace").strip("\n")
+        log.debug(f"retcode: {completed.returncode}")
+        log.debug(f"stdout: {stdout}")
+        log.debug(f"stderr: {stderr}")
+        return completed.returncode, stdout, stderr
+
+
+class LocalChannel:
+    """
+    A local subprocess with the subset of the paramiko Channel interface
+    that is used to stream command output
+    """
+
+    def __init__(self, cmd):
+        """
+        Args:
+            cmd (str): The command to run
+
+        """
+        self._stderr_file = tempfile.TemporaryFile()
+        self._process = subprocess.Popen(
+            cmd,
+            shell=True,
+            executable="/bin/bash",
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=self._stderr_file,
+        )
+
+    def recv(self, size):
+        return self._process.stdout.read1(size)
+
+    def makefile(self, mode="rb"):
+        return self._process.stdout
+
+    def makefile_stderr(self, mode="rb"):
+        self._process.wait()
+        self._stderr_file.seek(0)
+        return self._stderr_file
+
+    def recv_exit_status(self):
+        return self._process.wait()
+
+    def close(self):
+        self._process.stdout.close()
+        self._process.wait()
+        self._stderr_file.close()
+
+
+def is_local_host(host):
+    """
+    Check whether a host name or address resolves to the local machine
+
+    An address is local if a socket can be bound to it.
+
+    Args:
+        host (str): The host name or address
+
+    Returns:
+        bool: True if the host is the local machine, False otherwise
+
+    """
+    try:
+        addresses = socket.getaddrinfo(host, None, proto=socket.IPPROTO_UDP)
+    except socket.gaierror:
+        return False
+    for family, _, _, _, sockaddr in addresses:
+        try:
+            with socket.socket(family, socket.SOCK_DGRAM) as sock:
+                sock.bind((sockaddr[0], 0))
+        except OSError:
+            return False
+    return bool(addresses)
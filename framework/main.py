@@ -56,6 +56,8 @@ def main(argv=None):
             "-p",
             "framework.ssh_connection_manager",
             "-p",
+            "framework.cluster_connection_manager",
+            "-p",
             "framework.customizations.custom_cmd_line_arguments",
         ]
     )
@@ -0,0 +1,231 @@
+"""
+Module to run many noobaa-cli operations in a single Node.js process on the remote host
+"""
+
+import json
+import logging
+import os
+import re
+import shlex
+import time
+
+from framework.remote_batch import BatchResult, RemoteBatch
+from framework.remote_stream import exec_cmd_stream, iter_lines
+from framework.ssh_connection_manager import SSHConnectionManager
+from noobaa_sa.defaults import NOOBAA_SA_SRC
+from noobaa_sa.exceptions import UnexpectedBehaviour
+from utility.host_facts import get_host_facts
+
+log = logging.getLogger(__name__)
+
+RUNNER_SCRIPT_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "noobaa_cli_batch_runner.js"
+)
+CLI_RESULT_MARKER = "@@NB_CLI_RESULT@@"
+# A shell redirection, e.g. ">out", "2>/dev/null", "2>&1", "&>>log" or "2>"
+_REDIRECTION = re.compile(r"^(\d+|&)?(>>?|<)(?P<target>.*)$")
+
+
+class NoobaaCliBatch:
+    """
+    A batch of noobaa-cli operations that run in one Node.js process
+
+    Every noobaa-cli invocation pays for the Node.js startup and the loading
+    of noobaa-core. The batch instead ships its operations, together with
+    framework/noobaa_cli_batch_runner.js, and runs them one after the other
+    against the manage_nsfs entry point of a single process. The results are
+    streamed back as each operation completes.
+
+    The batch has the add/run interface of RemoteBatch and returns the same
+    BatchResults, so the two can be used interchangeably for noobaa-cli
+    commands. The operations always run one after the other, to completion,
+    so run() rejects a parallelism or stop_on_failure.
+
+    Example usage:
+        batch = NoobaaCliBatch()
+        for name in names:
+            batch.add(["account", "status", "--name", name], name=name)
+        results = batch.run()
+
+    """
+
+    def __init__(self, conn=None, noobaa_src=NOOBAA_SA_SRC, node=None, use_sudo=True):
+        """
+        Args:
+            conn (Connection): The connection to run the batch over.
+                               Defaults to the SSHConnectionManager connection.
+            noobaa_src (str): The noobaa-core directory on the remote host
+            node (str): The Node.js binary to run the operations with. Defaults
+                        to the one bundled with noobaa-core, which noobaa-cli
+                        runs with.
+            use_sudo (bool): Whether to run the operations as root, as
+                             noobaa-cli is run
+
+        """
+        self.conn = conn or SSHConnectionManager().connection
+        self.noobaa_src = noobaa_src
+        self.node = node or os.path.join(noobaa_src, "node/bin/node")
+        self.use_sudo = use_sudo
+        self._operations = []
+
+    def __len__(self):
+        return len(self._operations)
+
+    def add(self, args, name=None):
+        """
+        Queue a noobaa-cli operation
+
+        Args:
+            args (list|str): The noobaa-cli arguments, e.g.
+                             ["bucket", "status", "--name", "b1"]. A full
+                             noobaa-cli command is accepted too, in which case
+                             sudo, the noobaa-cli path and redirections are dropped.
+            name (str): A name to identify the operation's result by.
+                        Defaults to the operation's index in the batch.
+
+        Returns:
+            NoobaaCliBatch: The batch itself, to allow chaining
+
+        """
+        if isinstance(args, str):
+            args = _parse_cli_command(args)
+        name = name if name is not None else str(len(self._operations))
+        self._operations.append((name, [str(arg) for arg in args]))
+        return self
+
+    def iter_results(self, conn=None):
+        """
+        Run the queued operations, yielding the results as they complete
+
+        Args:
+            conn (Connection): The connection to run on. Defaults to the
+                               connection of the batch.
+
+        Yields:
+            BatchResult: A result per operation, in order. Operations that
+                         didn't run, e.g. because the runner crashed, have a
+                         retcode of None.
+
+        """
+        conn = conn or self.conn
+        # The shell expands ~ for noobaa-cli, but there's no shell in the runner
+        home_dir = get_host_facts(conn)["home_dir"]
+        operations = [
+            {
+                "id": index,
+                "args": [
+                    f"{home_dir}/{arg[2:]}" if arg.startswith("~/") else arg
+                    for arg in args
+                ],
+            }
+            for index, (_, args) in enumerate(self._operations)
+        ]
+        # The runner is run as root, so it's shipped into a directory only the
+        # connected user can write to
+        retcode, remote_dir, stderr = conn.exec_cmd("mktemp -d")
+        if retcode != 0:
+            raise UnexpectedBehaviour(
+                f"Failed to create a directory for the noobaa-cli batch: {stderr}"
+            )
+        runner_path = f"{remote_dir}/{os.path.basename(RUNNER_SCRIPT_PATH)}"
+        operations_path = f"{remote_dir}/operations.json"
+        ship_batch = RemoteBatch(conn)
+        with open(RUNNER_SCRIPT_PATH) as runner_file:
+            ship_batch.add_file(runner_path, runner_file.read(), use_sudo=False)
+        ship_batch.add_file(operations_path, json.dumps(operations), use_sudo=False)
+        for ship_result in ship_batch.run():
+            if ship_result.retcode != 0:
+                conn.exec_cmd(f"rm -rf {remote_dir}")
+                raise UnexpectedBehaviour(
+                    "Shipping the noobaa-cli batch failed with error "
+                    f"{ship_result.stderr}"
+                )
+
+        log.info(f"Running {len(operations)} noobaa-cli operations in one process")
+        sudo = "sudo " if self.use_sudo else ""
+        cmd = f"{sudo}{self.node} {runner_path} {self.noobaa_src} {operations_path}"
+        start = time.perf_counter()
+        next_index = 0
+        try:
+            for line in iter_lines(exec_cmd_stream(cmd, conn=conn)):
+                if not line.startswith(CLI_RESULT_MARKER):
+                    continue
+                result = json.loads(line[len(CLI_RESULT_MARKER) :])
+                name, args = self._operations[result["id"]]
+                next_index = result["id"] + 1
+                yield BatchResult(
+                    name,
+                    _format_cli_command(args),
+                    result["retcode"],
+                    result["stdout"],
+                    "",
+                    result["duration"],
+                )
+        except UnexpectedBehaviour as e:
+            log.error(f"The noobaa-cli batch runner failed: {e}")
+        finally:
+            conn.exec_cmd(f"rm -rf {remote_dir}")
+        for name, args in self._operations[next_index:]:
+            yield BatchResult(name, _format_cli_command(args), None, "", "", None)
+        log.info(
+            f"Ran {len(operations)} noobaa-cli operations in "
+            f"{time.perf_counter() - start:.3f}s"
+        )
+
+    def run(self, parallelism=1, stop_on_failure=False, conn=None):
+        """
+        Run the queued operations
+
+        Args:
+            parallelism (int): Only 1 is supported, the operations run one
+                               after the other
+            stop_on_failure (bool): Only False is supported, all the
+                                    operations are run
+            conn (Connection): The connection to run on. Defaults to the
+                               connection of the batch.
+
+        Returns:
+            list: A BatchResult for each operation of the batch, in order
+
+        Raises:
+            ValueError: If a parallelism or stop_on_failure is requested
+
+        """
+        if parallelism != 1 or stop_on_failure:
+            raise ValueError(
+                "The operations of a noobaa-cli batch run one after the other, "
+                f"got parallelism={parallelism}, stop_on_failure={stop_on_failure}"
+            )
+        return list(self.iter_results(conn=conn))
+
+
+def _parse_cli_command(cmd):
+    """
+    Get the noobaa-cli arguments of a full noobaa-cli command
+
+    Args:
+        cmd (str): The command, e.g. "sudo /path/noobaa-cli bucket list 2>/dev/null"
+
+    Returns:
+        list: The arguments after the noobaa-cli executable
+
+    """
+    words = shlex.split(cmd)
+    while words and (words[0] == "sudo" or words[0].startswith("-")):
+        words.pop(0)
+    # Drop the executable
+    words = iter(words[1:])
+    args = []
+    for word in words:
+        match = _REDIRECTION.match(word)
+        if match:
+            # Drop the target too if it's a separate word, e.g. "2> /dev/null"
+            if not match.group("target"):
+                next(words, None)
+            continue
+        args.append(word)
+    return args
+
+
+def _format_cli_command(args):
+    return " ".join(["noobaa-cli"] + [shlex.quote(arg) for arg in args])
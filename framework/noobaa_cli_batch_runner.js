@@ -0,0 +1,110 @@
+/* Runs many noobaa-cli operations in a single Node.js process
+ *
+ * Shipped to the NooBaa host and run by framework/noobaa_cli_batch.py as:
+ *
+ *     sudo node noobaa_cli_batch_runner.js <noobaa-core dir> <operations file>
+ *
+ * The operations file holds a JSON list of {"id": ..., "args": [...]}, where
+ * args are the noobaa-cli arguments, e.g. ["account", "status", "--name", "a1"].
+ * Each operation runs the main() of noobaa-core's manage_nsfs with its own
+ * argv, one after the other, so the Node.js startup and the loading of the
+ * noobaa-core modules are paid once for the whole batch. A result line is
+ * written as soon as each operation completes:
+ *
+ *     @@NB_CLI_RESULT@@ {"id": ..., "retcode": 0, "stdout": "...", "duration": 0.01}
+ *
+ * manage_nsfs reports its outcome by writing to stdout and calling
+ * process.exit() from the write callback, so both are intercepted while an
+ * operation runs. The intercepted exit only records the exit code, since
+ * throwing from it would be caught by manage_nsfs itself, and the operation
+ * ends when either exit is called or main() returns.
+ */
+'use strict';
+
+const fs = require('fs');
+const path = require('path');
+const { createRequire } = require('module');
+
+const RESULT_MARKER = '@@NB_CLI_RESULT@@';
+
+const real_stdout_write = process.stdout.write.bind(process.stdout);
+const real_exit = process.exit;
+const real_argv = process.argv;
+
+// A detached callback of an operation must not take the whole batch down
+process.on('unhandledRejection', err => {
+    process.stderr.write(`Unhandled rejection: ${(err && err.stack) || err}\n`);
+});
+
+function write_result(result) {
+    real_stdout_write(`${RESULT_MARKER} ${JSON.stringify(result)}\n`);
+}
+
+async function run_operation(manage_nsfs_main, script_path, operation) {
+    const output = [];
+    let exit_code;
+    let on_exit;
+    const exited = new Promise(resolve => {
+        on_exit = resolve;
+    });
+    const start = process.hrtime.bigint();
+    process.stdout.write = (chunk, encoding, callback) => {
+        // Whatever is written after exit would never have been written
+        if (exit_code === undefined) {
+            output.push(Buffer.isBuffer(chunk) ? chunk.toString('utf8') : String(chunk));
+        }
+        // Like a real write, the callback runs once the write was flushed, so
+        // after the code that follows the write
+        const write_callback = typeof encoding === 'function' ? encoding : callback;
+        if (typeof write_callback === 'function') setImmediate(write_callback);
+        return true;
+    };
+    process.exit = code => {
+        if (exit_code === undefined) {
+            exit_code = code === undefined ? process.exitCode || 0 : code;
+            on_exit();
+        }
+    };
+    // manage_nsfs parses its arguments from process.argv by default
+    process.argv = [real_argv[0], script_path, ...operation.args.map(String)];
+    try {
+        const main_done = Promise.resolve()
+            .then(() => manage_nsfs_main())
+            // Let the pending write callbacks, which may exit, run first
+            .then(() => new Promise(resolve => setImmediate(resolve)));
+        await Promise.race([main_done, exited]);
+    } catch (err) {
+        if (exit_code === undefined) {
+            exit_code = 1;
+            output.push(String((err && err.stack) || err));
+        }
+    } finally {
+        process.stdout.write = real_stdout_write;
+        process.exit = real_exit;
+        process.argv = real_argv;
+    }
+    const retcode = exit_code === undefined ? process.exitCode || 0 : exit_code;
+    process.exitCode = undefined;
+    const duration = Number(process.hrtime.bigint() - start) / 1e9;
+    return { id: operation.id, retcode, stdout: output.join('').trim(), duration };
+}
+
+async function main() {
+    const [noobaa_src, operations_file] = real_argv.slice(2);
+    const script_path = path.join(noobaa_src, 'src/cmd/manage_nsfs.js');
+    const manage_nsfs = createRequire(script_path)(script_path);
+    if (typeof manage_nsfs.main !== 'function') {
+        process.stderr.write(`${script_path} doesn't export main()\n`);
+        real_exit(2);
+    }
+    const operations = JSON.parse(fs.readFileSync(operations_file, 'utf8'));
+    for (const operation of operations) {
+        write_result(await run_operation(manage_nsfs.main, script_path, operation));
+    }
+    real_exit(0);
+}
+
+main().catch(err => {
+    process.stderr.write(`${(err && err.stack) || err}\n`);
+    real_exit(2);
+});
@@ -0,0 +1,381 @@
+"""
+Module to run management calls through a resident helper agent on the remote host
+"""
+
+import base64
+import itertools
+import json
+import logging
+import os
+import threading
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+from noobaa_sa.exceptions import UnexpectedBehaviour
+
+log = logging.getLogger(__name__)
+
+AGENT_SERVER_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "remote_agent_server.py"
+)
+REMOTE_AGENT_NAME = "noobaa_sa_ci_agent.py"
+
+
+class RemoteAgent:
+    """
+    A connection that sends its calls to a helper agent on the remote host
+
+    The agent (framework/remote_agent_server.py) is started once over a
+    single SSH exec channel and stays resident, so each call only costs a
+    JSON line round trip instead of a new channel, a sudo invocation and
+    possibly a process startup. Calls may be pipelined with submit().
+
+    The agent implements the exec_cmd, exec_script, upload_file and
+    download_file interface of Connection, so it can replace a Connection
+    wherever one is used. Raw channels, e.g. for streaming, are still
+    opened over the underlying SSH client.
+
+    Example usage:
+        agent = RemoteAgent(SSHConnectionManager().create_connection()).start()
+        retcode, stdout, stderr = agent.exec_cmd("sudo systemctl status noobaa")
+        futures = [agent.submit("stat", path=path) for path in paths]
+        stats = [future.result() for future in futures]
+
+    """
+
+    def __init__(self, conn, python="python3", timeout=None):
+        """
+        Args:
+            conn (Connection): The SSH connection to start the agent over
+            python (str): The Python interpreter to run the agent with
+            timeout (float): The default seconds to wait for a response.
+                             Defaults to waiting as long as the call takes,
+                             like Connection.exec_cmd.
+
+        """
+        self.conn = conn
+        self.host = conn.host
+        self.user = conn.user
+        self.client = conn.client
+        self.python = python
+        self.timeout = timeout
+        self._channel = None
+        self._stdin = None
+        self._reader = None
+        self._pending = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def start(self):
+        """
+        Upload the agent to the remote host and start it
+
+        Returns:
+            RemoteAgent: The agent itself, to allow chaining
+
+        Raises:
+            UnexpectedBehaviour: If the agent failed to start
+
+        """
+        # The agent runs as root, so it's uploaded to a directory only the
+        # connected user can write to, and removed once it's loaded
+        retcode, remote_dir, stderr = self.conn.exec_cmd("mktemp -d")
+        if retcode != 0:
+            raise UnexpectedBehaviour(
+                f"Failed to create a directory for the remote agent on "
+                f"{self.host}: {stderr}"
+            )
+        remote_agent_path = f"{remote_dir}/{REMOTE_AGENT_NAME}"
+        try:
+            self.conn.upload_file(AGENT_SERVER_PATH, remote_agent_path)
+            log.info(f"Starting the remote agent on {self.host}")
+            self._channel = self.client.get_transport().open_session()
+            self._channel.exec_command(f"sudo {self.python} -u {remote_agent_path}")
+            self._stdin = self._channel.makefile_stdin("wb")
+            stdout = self._channel.makefile("rb")
+            ready_line = stdout.readline()
+        finally:
+            self.conn.exec_cmd(f"rm -rf {remote_dir}")
+        if not ready_line:
+            stderr = self._channel.makefile_stderr("rb").read()
+            raise UnexpectedBehaviour(
+                f"Remote agent failed to start on {self.host}: "
+                f"{stderr.decode('utf-8', 'replace')}"
+            )
+        log.info(f"Remote agent is running on {self.host}: {ready_line.strip()}")
+        self._reader = threading.Thread(
+            target=self._read_responses,
+            args=(stdout,),
+            name=f"remote-agent-{self.host}",
+            daemon=True,
+        )
+        self._reader.start()
+        return self
+
+    def submit(self, op, **args):
+        """
+        Send a request to the agent without waiting for its response
+
+        Args:
+            op (str): The operation, e.g. "exec", "stat" or "read_file"
+            **args: The arguments of the operation
+
+        Returns:
+            Future: Resolves to the result of the operation, or raises
+                    UnexpectedBehaviour if the operation failed
+
+        """
+        future = Future()
+        with self._lock:
+            if self._closed:
+                raise UnexpectedBehaviour(f"Remote agent on {self.host} is closed")
+            request_id = next(self._ids)
+            self._pending[request_id] = future
+            line = json.dumps({"id": request_id, "op": op, "args": args})
+            self._stdin.write(f"{line}\n".encode("utf-8"))
+            self._stdin.flush()
+        return future
+
+    def call(self, op, timeout=None, **args):
+        """
+        Send a request to the agent and wait for its result
+
+        Args:
+            op (str): The operation, e.g. "exec", "stat" or "read_file"
+            timeout (float): The seconds to wait for the result.
+                             Defaults to the agent's timeout.
+            **args: The arguments of the operation
+
+        Returns:
+            dict: The result of the operation
+
+        Raises:
+            UnexpectedBehaviour: If the operation failed
+            concurrent.futures.TimeoutError: If the result didn't arrive in time
+
+        """
+        future = self.submit(op, **args)
+        try:
+            return future.result(timeout or self.timeout)
+        except FutureTimeoutError:
+            # A late response for the call is then dropped by the reader
+            with self._lock:
+                for request_id, pending_future in list(self._pending.items()):
+                    if pending_future is future:
+                        del self._pending[request_id]
+            raise
+
+    def exec_cmd(self, cmd):
+        """
+        Executes command on host through the agent
+
+        Args:
+            cmd (str): Command to run on host
+
+        Returns:
+            tuple: tuple which contains command return code, output and error
+
+        """
+        log.info(f"Executing cmd: {cmd} on {self.host} via the remote agent")
+        return self._to_cmd_result(self.call("exec", cmd=cmd))
+
+    def exec_script(self, script):
+        """
+        Run a bash script on host through the agent
+
+        Args:
+            script (str): The bash script to run
+
+        Returns:
+            tuple: tuple which contains the script's return code, output and error
+
+        """
+        return self._to_cmd_result(self.call("exec", cmd="bash -s", input=script))
+
+    def upload_file(self, localpath, remotepath):
+        """
+        Upload a file to remote host, owned by the connected user
+
+        Args:
+            localpath (str): local file to upload
+            remotepath (str): target path on the remote host. filename should be included
+
+        """
+        log.info(f"uploading {localpath} to {self.user}@{self.host}:{remotepath}")
+        with open(localpath, "rb") as f:
+            content = base64.b64encode(f.read()).decode("ascii")
+        self.call("write_file", path=remotepath, content=content, as_user=True)
+
+    def download_file(self, remotepath, localpath):
+        """
+        Download a file from a remote host
+
+        Args:
+            remotepath (str): target path on the remote host. filename should be included
+            localpath (str): local file to download to
+
+        """
+        log.info(f"Downloading {localpath} from {self.user}@{self.host}:{remotepath}")
+        with open(localpath, "wb") as f:
+            f.write(self.read_file(remotepath))
+
+    def stat(self, path):
+        """
+        Args:
+            path (str): The path on the remote host
+
+        Returns:
+            dict: "exists", and if it does "mode", "uid", "gid", "size",
+                  "mtime" and "is_dir"
+
+        """
+        return self.call("stat", path=path)
+
+    def read_file(self, path):
+        """
+        Args:
+            path (str): The path of the file on the remote host
+
+        Returns:
+            bytes: The content of the file, read as root
+
+        """
+        return base64.b64decode(self.call("read_file", path=path)["content"])
+
+    def write_file(self, path, content, mode=None):
+        """
+        Atomically write a file on the remote host as root
+
+        Args:
+            path (str): The path of the file on the remote host
+            content (str|bytes): The content of the file
+            mode (str): The permissions to set on the file, e.g. "600"
+
+        """
+        if isinstance(content, str):
+            content = content.encode("utf-8")
+        self.call(
+            "write_file",
+            path=path,
+            content=base64.b64encode(content).decode("ascii"),
+            mode=mode,
+        )
+
+    def mkdir(self, path, mode=None, parents=True):
+        """
+        Create a directory on the remote host as root
+
+        Args:
+            path (str): The path of the directory
+            mode (str): The permissions to set on the directory, e.g. "777"
+            parents (bool): Whether to create the missing parent directories
+
+        """
+        self.call("mkdir", path=path, mode=mode, parents=parents)
+
+    def getent(self, database, key=None):
+        """
+        Args:
+            database (str): Either "passwd" or "group"
+            key (str): A name or an id to look up. Returns all entries if None.
+
+        Returns:
+            list: The matching entries, in the format of getent
+
+        """
+        return self.call("getent", database=database, key=key)["entries"]
+
+    def systemctl(self, action, unit):
+        """
+        Args:
+            action (str): The systemctl action, e.g. "restart"
+            unit (str): The systemd unit
+
+        Returns:
+            tuple: tuple which contains command return code, output and error
+
+        """
+        return self._to_cmd_result(self.call("systemctl", action=action, unit=unit))
+
+    def noobaa_cli(self, cli_path, *args):
+        """
+        Run the NooBaa CLI as root without going through a shell
+
+        Args:
+            cli_path (str): The path of the CLI, e.g. MANAGE_NSFS
+            *args: The arguments of the CLI
+
+        Returns:
+            tuple: tuple which contains command return code, output and error
+
+        """
+        return self._to_cmd_result(
+            self.call("noobaa_cli", cli_path=cli_path, args=[str(arg) for arg in args])
+        )
+
+    def close(self):
+        """
+        Stop the agent and close the underlying connection
+        """
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            if self._stdin:
+                try:
+                    self._stdin.write(b'{"op": "shutdown"}\n')
+                    self._stdin.flush()
+                except OSError:
+                    pass
+        if self._channel:
+            self._channel.close()
+        self.conn.close()
+
+    def _read_responses(self, stdout):
+        """
+        Resolve the pending futures as the responses of the agent arrive
+        """
+        for line in stdout:
+            try:
+                response = json.loads(line)
+            except ValueError:
+                # The response can't be matched to its request, so every
+                # request that's waiting may have lost its response
+                log.error(
+                    f"Remote agent on {self.host} sent an invalid response: "
+                    f"{line[:200]!r}"
+                )
+                with self._lock:
+                    pending, self._pending = self._pending, {}
+                for future in pending.values():
+                    future.set_exception(
+                        UnexpectedBehaviour(
+                            f"Remote agent on {self.host} sent an invalid response"
+                        )
+                    )
+                continue
+            with self._lock:
+                future = self._pending.pop(response["id"], None)
+            if future is None:
+                continue
+            if response["ok"]:
+                future.set_result(response["result"])
+            else:
+                future.set_exception(UnexpectedBehaviour(response["error"]))
+
+        with self._lock:
+            self._closed = True
+            pending, self._pending = self._pending, {}
+        for future in pending.values():
+            future.set_exception(
+                UnexpectedBehaviour(f"Remote agent on {self.host} exited")
+            )
+
+    @staticmethod
+    def _to_cmd_result(result):
+        return (
+            result["retcode"],
+            result["stdout"].strip("\n"),
+            result["stderr"].strip("\n"),
+        )
@@ -0,0 +1,238 @@
+"""
+The helper agent that runs on the NooBaa SA host
+
+This module is shipped as-is to the remote host and run there with
+'sudo python3 -u', so it may only use the standard library of the Python 3
+interpreter of the host. It is driven by framework.remote_agent.RemoteAgent.
+
+Requests and responses are single-line JSON documents on stdin and stdout:
+    request:  {"id": 1, "op": "stat", "args": {"path": "/etc/hosts"}}
+    response: {"id": 1, "ok": true, "result": {...}}
+    error:    {"id": 1, "ok": false, "error": "..."}
+
+Requests are handled concurrently, so several of them may be pipelined on the
+same agent and their responses may arrive out of order. Commands run as root
+if they start with 'sudo ', without paying for the sudo invocation, and as the
+user that started the agent otherwise.
+
+"""
+
+import base64
+import grp
+import json
+import os
+import pwd
+import subprocess
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+MAX_WORKERS = 16
+
+_write_lock = threading.Lock()
+
+
+def _is_root():
+    return os.geteuid() == 0
+
+
+def _invoking_user():
+    uid = int(os.environ.get("SUDO_UID", os.getuid()))
+    gid = int(os.environ.get("SUDO_GID", os.getgid()))
+    return uid, gid
+
+
+def _drop_privileges():
+    uid, gid = _invoking_user()
+    os.setgroups(os.getgrouplist(pwd.getpwuid(uid).pw_name, gid))
+    os.setgid(gid)
+    os.setuid(uid)
+
+
+def _user_env():
+    uid, _ = _invoking_user()
+    entry = pwd.getpwuid(uid)
+    env = dict(os.environ)
+    env.update(
+        {"HOME": entry.pw_dir, "USER": entry.pw_name, "LOGNAME": entry.pw_name}
+    )
+    return env
+
+
+def _run(argv, input_data=None, as_root=True):
+    process = subprocess.Popen(
+        argv,
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        preexec_fn=None if as_root or not _is_root() else _drop_privileges,
+        env=None if as_root or not _is_root() else _user_env(),
+    )
+    stdout, stderr = process.communicate(
+        input_data.encode("utf-8") if input_data is not None else None
+    )
+    return {
+        "retcode": process.returncode,
+        "stdout": stdout.decode("utf-8", "replace"),
+        "stderr": stderr.decode("utf-8", "replace"),
+    }
+
+
+def op_ping():
+    return {"pid": os.getpid()}
+
+
+def op_exec(cmd, input=None):
+    as_root = cmd.startswith("sudo ") and not cmd[len("sudo ") :].startswith("-")
+    if as_root and _is_root():
+        cmd = cmd[len("sudo ") :]
+    return _run(["/bin/bash", "-c", cmd], input_data=input, as_root=as_root)
+
+
+def op_stat(path):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return {"exists": False}
+    return {
+        "exists": True,
+        "mode": st.st_mode,
+        "uid": st.st_uid,
+        "gid": st.st_gid,
+        "size": st.st_size,
+        "mtime": st.st_mtime,
+        "is_dir": os.path.isdir(path),
+    }
+
+
+def op_read_file(path, offset=0, size=-1):
+    with open(path, "rb") as f:
+        f.seek(offset)
+        data = f.read(size)
+    return {"content": base64.b64encode(data).decode("ascii")}
+
+
+def op_write_file(path, content, mode=None, as_user=False):
+    data = base64.b64decode(content)
+    tmp_path = "{}.agent-{}".format(path, threading.get_ident())
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    if mode is not None:
+        os.chmod(tmp_path, int(str(mode), 8))
+    if as_user:
+        os.chown(tmp_path, *_invoking_user())
+    os.replace(tmp_path, path)
+    return {"size": len(data)}
+
+
+def op_mkdir(path, mode=None, parents=True):
+    if parents:
+        os.makedirs(path, exist_ok=True)
+    else:
+        os.mkdir(path)
+    if mode is not None:
+        os.chmod(path, int(str(mode), 8))
+    return {}
+
+
+def op_listdir(path):
+    return {"entries": sorted(os.listdir(path))}
+
+
+def op_getent(database, key=None):
+    if database == "passwd":
+        if key is None:
+            entries = pwd.getpwall()
+        else:
+            try:
+                entries = [
+                    pwd.getpwuid(int(key)) if key.isdigit() else pwd.getpwnam(key)
+                ]
+            except KeyError:
+                entries = []
+        lines = [
+            ":".join(
+                [
+                    e.pw_name,
+                    e.pw_passwd,
+                    str(e.pw_uid),
+                    str(e.pw_gid),
+                    e.pw_gecos,
+                    e.pw_dir,
+                    e.pw_shell,
+                ]
+            )
+            for e in entries
+        ]
+    elif database == "group":
+        if key is None:
+            entries = grp.getgrall()
+        else:
+            try:
+                entries = [
+                    grp.getgrgid(int(key)) if key.isdigit() else grp.getgrnam(key)
+                ]
+            except KeyError:
+                entries = []
+        lines = [
+            ":".join([e.gr_name, e.gr_passwd, str(e.gr_gid), ",".join(e.gr_mem)])
+            for e in entries
+        ]
+    else:
+        raise ValueError("Unsupported getent database: {}".format(database))
+    return {"entries": lines}
+
+
+def op_systemctl(action, unit):
+    return _run(["systemctl", action, unit])
+
+
+def op_noobaa_cli(cli_path, args, input=None):
+    return _run([cli_path] + list(args), input_data=input)
+
+
+OPS = {
+    "ping": op_ping,
+    "exec": op_exec,
+    "stat": op_stat,
+    "read_file": op_read_file,
+    "write_file": op_write_file,
+    "mkdir": op_mkdir,
+    "listdir": op_listdir,
+    "getent": op_getent,
+    "systemctl": op_systemctl,
+    "noobaa_cli": op_noobaa_cli,
+}
+
+
+def _respond(response):
+    line = json.dumps(response) + "\n"
+    with _write_lock:
+        sys.stdout.write(line)
+        sys.stdout.flush()
+
+
+def _handle(request):
+    try:
+        result = OPS[request["op"]](**request.get("args", {}))
+        _respond({"id": request["id"], "ok": True, "result": result})
+    except Exception as e:
+        error = "{}: {}".format(type(e).__name__, e)
+        _respond({"id": request["id"], "ok": False, "error": error})
+
+
+def main():
+    _respond({"id": 0, "ok": True, "result": op_ping()})
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        for line in sys.stdin:
+            line = line.strip()
+            if not line:
+                continue
+            request = json.loads(line)
+            if request.get("op") == "shutdown":
+                break
+            executor.submit(_handle, request)
+
+
+if __name__ == "__main__":
+    main()
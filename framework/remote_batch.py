@@ -0,0 +1,322 @@
+"""
+Module to run many commands on the remote host in a single SSH round trip
+"""
+
+import base64
+import io
+import logging
+import shlex
+import tarfile
+import time
+from collections import namedtuple
+
+from framework.ssh_connection_manager import SSHConnectionManager
+
+log = logging.getLogger(__name__)
+
+BATCH_RESULT_MARKER = "@@NB_BATCH_RESULT@@"
+
+BatchResult = namedtuple(
+    "BatchResult", ["name", "cmd", "retcode", "stdout", "stderr", "duration"]
+)
+BatchResult.__doc__ = """
+The outcome of a single command of a RemoteBatch
+
+Attributes:
+    name (str): The name the command was added with
+    cmd (str): The command
+    retcode (int|None): The exit code, or None if the command didn't run
+    stdout (str): The output of the command
+    stderr (str): The error output of the command
+    duration (float|None): The remote run time of the command in seconds,
+                           or None if the command didn't run
+"""
+
+# Every command runs in its own subshell with its outputs captured to files,
+# and the framed results are printed only once all the commands are done
+_SCRIPT_HEADER = """\
+__nb_dir=$(mktemp -d)
+__nb_run() {
+    local __nb_start
+    __nb_start=$(date +%s%N)
+    ( eval "$(printf '%s' "$2" | base64 -d)" ) \\
+        >"$__nb_dir/$1.out" 2>"$__nb_dir/$1.err" </dev/null
+    local __nb_rc=$?
+    echo "$__nb_rc $__nb_start $(date +%s%N)" >"$__nb_dir/$1.rc"
+    return $__nb_rc
+}
+__nb_main() {
+"""
+
+_SCRIPT_FOOTER = """\
+}}
+__nb_main
+wait
+for __nb_i in $(seq 0 {last_index}); do
+    if [ -e "$__nb_dir/$__nb_i.rc" ]; then
+        printf '%s %s %s %s %s\\n' "{marker}" "$__nb_i" "$(cat "$__nb_dir/$__nb_i.rc")" \\
+            "$(base64 -w0 <"$__nb_dir/$__nb_i.out")" "$(base64 -w0 <"$__nb_dir/$__nb_i.err")"
+    fi
+done
+rm -rf "$__nb_dir"
+"""
+
+
+class RemoteBatch:
+    """
+    A builder of remote command batches
+
+    The queued commands are shipped as one script over a single SSH exec
+    channel, and the exit code, output and duration of each command are
+    framed in the script's output and parsed back into BatchResult tuples.
+
+    Example usage:
+        batch = RemoteBatch()
+        batch.add("getent passwd 1000", name="uid")
+        batch.add("getent group 1000", name="gid")
+        uid_result, gid_result = batch.run()
+
+    """
+
+    def __init__(self, conn=None):
+        """
+        Args:
+            conn (Connection): The connection to run the batch on.
+                               Defaults to the SSHConnectionManager connection.
+
+        """
+        self.conn = conn
+        self._commands = []
+
+    def __len__(self):
+        return len(self._commands)
+
+    def add(self, cmd, name=None):
+        """
+        Queue a command
+
+        Args:
+            cmd (str): The shell command to run
+            name (str): A name to identify the command's result by.
+                        Defaults to the command's index in the batch.
+
+        Returns:
+            RemoteBatch: The batch itself, to allow chaining
+
+        """
+        name = name if name is not None else str(len(self._commands))
+        self._commands.append((name, cmd))
+        return self
+
+    def add_file(self, remote_path, content, mode=None, use_sudo=True, name=None):
+        """
+        Queue writing a file on the remote host
+
+        The content is embedded in the batch itself, which saves the
+        separate SFTP upload round trip.
+
+        Args:
+            remote_path (str): The full path of the file on the remote host
+            content (str|bytes): The content of the file
+            mode (str): The permissions to set on the file, e.g. "600"
+            use_sudo (bool): Whether to write the file with sudo
+            name (str): A name to identify the command's result by
+
+        Returns:
+            RemoteBatch: The batch itself, to allow chaining
+
+        """
+        if isinstance(content, str):
+            content = content.encode("utf-8")
+        sudo = "sudo " if use_sudo else ""
+        quoted_path = shlex.quote(remote_path)
+        encoded_content = base64.b64encode(content).decode("ascii")
+        cmd = (
+            f"printf '%s' '{encoded_content}' | base64 -d | "
+            f"{sudo}tee {quoted_path} >/dev/null"
+        )
+        if mode:
+            cmd += f" && {sudo}chmod {mode} {quoted_path}"
+        return self.add(cmd, name=name)
+
+    def add_archive(self, remote_dir, files, use_sudo=True, name=None, symlinks=None):
+        """
+        Queue extracting a set of files into a directory on the remote host
+
+        The files are packed into a single compressed tar archive that is
+        embedded in the batch, so any number of them costs one command.
+
+        Args:
+            remote_dir (str): The directory to extract the files into.
+                              Created if it doesn't exist.
+            files (dict): Paths relative to remote_dir mapped to their
+                          content as str or bytes
+            use_sudo (bool): Whether to write the files with sudo
+            name (str): A name to identify the command's result by
+            symlinks (dict): Paths relative to remote_dir mapped to the
+                             targets of symbolic links to create there
+
+        Returns:
+            RemoteBatch: The batch itself, to allow chaining
+
+        """
+        archive = io.BytesIO()
+        with tarfile.open(fileobj=archive, mode="w:gz") as tar:
+            for path, content in files.items():
+                if isinstance(content, str):
+                    content = content.encode("utf-8")
+                info = tarfile.TarInfo(path)
+                info.size = len(content)
+                info.mode = 0o600
+                info.mtime = int(time.time())
+                tar.addfile(info, io.BytesIO(content))
+            for path, target in (symlinks or {}).items():
+                info = tarfile.TarInfo(path)
+                info.type = tarfile.SYMTYPE
+                info.linkname = target
+                info.mtime = int(time.time())
+                tar.addfile(info)
+        sudo = "sudo " if use_sudo else ""
+        quoted_dir = shlex.quote(remote_dir)
+        encoded_archive = base64.b64encode(archive.getvalue()).decode("ascii")
+        cmd = (
+            f"{sudo}mkdir -p {quoted_dir} && printf '%s' '{encoded_archive}' | "
+            f"base64 -d | {sudo}tar -xz --no-same-owner -C {quoted_dir}"
+        )
+        return self.add(cmd, name=name)
+
+    def build_script(self, parallelism=1, stop_on_failure=False):
+        """
+        Build the script that runs the queued commands
+
+        Args:
+            parallelism (int): The maximum number of commands to run at once
+            stop_on_failure (bool): Whether to skip the remaining commands after
+                                    the first failure. Only applies to
+                                    sequential batches.
+
+        Returns:
+            str: The bash script
+
+        """
+        lines = [_SCRIPT_HEADER]
+        for index, (_, cmd) in enumerate(self._commands):
+            encoded_cmd = base64.b64encode(cmd.encode("utf-8")).decode("ascii")
+            run_line = f"    __nb_run {index} '{encoded_cmd}'"
+            if parallelism > 1:
+                lines.append(f"{run_line} &\n")
+                lines.append(
+                    f'    [ "$(jobs -rp | wc -l)" -ge {parallelism} ] && wait -n\n'
+                )
+            elif stop_on_failure:
+                lines.append(f"{run_line} || return\n")
+            else:
+                lines.append(f"{run_line}\n")
+        # Bash functions can't be empty
+        lines.append("    :\n")
+        lines.append(
+            _SCRIPT_FOOTER.format(
+                last_index=len(self._commands) - 1, marker=BATCH_RESULT_MARKER
+            )
+        )
+        return "".join(lines)
+
+    def run(self, parallelism=1, stop_on_failure=False, conn=None):
+        """
+        Run the queued commands on the remote host in a single round trip
+
+        Args:
+            parallelism (int): The maximum number of commands to run at once
+            stop_on_failure (bool): Whether to skip the remaining commands after
+                                    the first failure. Only applies to
+                                    sequential batches.
+            conn (Connection): The connection to run the batch on, instead of
+                               the one the batch was created with
+
+        Returns:
+            list: A BatchResult for each queued command, in the order they were added
+
+        """
+        if not self._commands:
+            return []
+        conn = conn or self.conn or SSHConnectionManager().connection
+        script = self.build_script(parallelism, stop_on_failure)
+        log.info(
+            f"Running a batch of {len(self._commands)} commands "
+            f"with parallelism {parallelism} on {conn.host}"
+        )
+        retcode, stdout, stderr = run_script(conn, script)
+        results = self._parse_results(stdout)
+        if retcode != 0 or len(results) < len(self._commands):
+            log.warning(
+                f"Batch finished with retcode {retcode} after running "
+                f"{len(results)}/{len(self._commands)} commands: {stderr}"
+            )
+
+        batch_results = []
+        for index, (name, cmd) in enumerate(self._commands):
+            if index in results:
+                cmd_retcode, cmd_stdout, cmd_stderr, duration = results[index]
+                batch_results.append(
+                    BatchResult(name, cmd, cmd_retcode, cmd_stdout, cmd_stderr, duration)
+                )
+            else:
+                batch_results.append(BatchResult(name, cmd, None, "", "", None))
+        return batch_results
+
+    @staticmethod
+    def _parse_results(output):
+        """
+        Parse the framed results out of the batch script output
+
+        Args:
+            output (str): The output of the batch script
+
+        Returns:
+            dict: The index of each command that ran to a tuple of its
+                  retcode, stdout, stderr and duration
+
+        """
+        results = {}
+        for line in output.splitlines():
+            if not line.startswith(BATCH_RESULT_MARKER):
+                continue
+            _, index, retcode, start_ns, end_ns, encoded_out, encoded_err = line.split(
+                " "
+            )
+            results[int(index)] = (
+                int(retcode),
+                base64.b64decode(encoded_out).decode("utf-8", "replace").strip("\n"),
+                base64.b64decode(encoded_err).decode("utf-8", "replace").strip("\n"),
+                (int(end_ns) - int(start_ns)) / 1e9,
+            )
+        return results
+
+
+def run_script(conn, script):
+    """
+    Run a bash script on the remote host by feeding it to bash's stdin
+
+    Unlike exec_cmd, the script is not passed as a command line argument,
+    so it is not bound by the argument length limits of the remote host.
+
+    Args:
+        conn (Connection): The connection to run the script on
+        script (str): The bash script to run
+
+    Returns:
+        tuple: tuple which contains the script's return code, output and error
+
+    """
+    if hasattr(conn, "exec_script"):
+        return conn.exec_script(script)
+
+    stdin, stdout, stderr = conn.client.exec_command("bash -s")
+    stdin.write(script)
+    stdin.channel.shutdown_write()
+    # Drain the output before waiting for the exit code so a large output
+    # can't fill up the channel window and block the remote side
+    out = stdout.read().decode("utf-8", "replace").strip("\n")
+    err = stderr.read().decode("utf-8", "replace").strip("\n")
+    retcode = stdout.channel.recv_exit_status()
+    return retcode, out, err
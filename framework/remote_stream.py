@@ -0,0 +1,174 @@
+"""
+Module to consume the output of remote commands incrementally
+"""
+
+import codecs
+import json
+import logging
+import re
+
+from framework.ssh_connection_manager import SSHConnectionManager
+from noobaa_sa.exceptions import UnexpectedBehaviour
+
+log = logging.getLogger(__name__)
+
+DEFAULT_STREAM_CHUNK_SIZE = 64 * 1024
+# The amount of trailing stdout kept to report why a streamed command failed
+STREAM_ERROR_TAIL_SIZE = 4096
+
+_WHITESPACE_AND_COMMAS = re.compile(r"[\s,]*")
+_VALUE_DELIMITER = re.compile(r"[\s,\]]")
+
+
+def exec_cmd_stream(cmd, conn=None, chunk_size=DEFAULT_STREAM_CHUNK_SIZE):
+    """
+    Execute a command on the remote host and yield its output as it arrives
+
+    Args:
+        cmd (str): Command to run on host
+        conn (Connection): The connection to run the command on.
+                           Defaults to the SSHConnectionManager connection.
+        chunk_size (int): The maximum number of bytes to read at a time
+
+    Yields:
+        str: Chunks of the decoded stdout of the command
+
+    Raises:
+        UnexpectedBehaviour: If the command exits with a non-zero return code.
+                             Raised once the output is exhausted, with the
+                             stderr and the tail of the stdout of the command.
+
+    """
+    conn = conn or SSHConnectionManager().connection
+    if hasattr(conn, "exec_cmd_stream"):
+        yield from conn.exec_cmd_stream(cmd, chunk_size)
+        return
+
+    log.info(f"Streaming cmd: {cmd} on {conn.host}")
+    channel = conn.client.get_transport().open_session()
+    try:
+        channel.exec_command(cmd)
+        decoder = codecs.getincrementaldecoder("utf-8")("replace")
+        stdout_tail = ""
+        while True:
+            data = channel.recv(chunk_size)
+            text = decoder.decode(data, final=not data)
+            if text:
+                stdout_tail = (stdout_tail + text)[-STREAM_ERROR_TAIL_SIZE:]
+                yield text
+            if not data:
+                break
+        stderr = channel.makefile_stderr("rb").read().decode("utf-8", "replace")
+        retcode = channel.recv_exit_status()
+    finally:
+        channel.close()
+    if retcode != 0:
+        raise UnexpectedBehaviour(
+            f"Command {cmd} failed with retcode {retcode}\n"
+            f"stdout: {stdout_tail}\nstderr: {stderr}"
+        )
+
+
+def iter_lines(chunks):
+    """
+    Split a stream of text chunks into lines
+
+    Args:
+        chunks (iterable): Chunks of text, e.g. from exec_cmd_stream
+
+    Yields:
+        str: The lines, without their line endings
+
+    """
+    pending = ""
+    for chunk in chunks:
+        pending += chunk
+        lines = pending.split("\n")
+        pending = lines.pop()
+        yield from lines
+    if pending:
+        yield pending
+
+
+def iter_json_array_items(chunks, key="reply"):
+    """
+    Incrementally parse the items of a JSON array out of a stream of text chunks
+
+    The array is the value of the first occurrence of the given key, e.g. the
+    "reply" array of a noobaa-cli list response. Each item is yielded as soon
+    as it was fully received, and only the unparsed tail of the stream is kept
+    in memory. The rest of the stream is consumed once the array ends, so any
+    error raised by the stream at its end is still propagated.
+
+    Args:
+        chunks (iterable): Chunks of JSON text, e.g. from exec_cmd_stream
+        key (str): The key whose array value should be parsed
+
+    Yields:
+        Any: The decoded items of the array
+
+    Raises:
+        json.JSONDecodeError: If the key isn't found, or the array is malformed
+                              or truncated
+
+    Example usage:
+        cmd = f"sudo {MANAGE_NSFS} bucket list --wide"
+        for bucket in iter_json_array_items(exec_cmd_stream(cmd)):
+            print(bucket["name"])
+
+    """
+    chunks = iter(chunks)
+    decoder = json.JSONDecoder()
+    key_pattern = re.compile(rf'"{re.escape(key)}"\s*:\s*\[')
+
+    # Find the beginning of the array
+    buffer = ""
+    for chunk in chunks:
+        buffer += chunk
+        match = key_pattern.search(buffer)
+        if match:
+            buffer = buffer[match.end() :]
+            break
+        # Keep enough of the tail to match a key split between chunks
+        buffer = buffer[-(len(key) + 256) :]
+    else:
+        raise json.JSONDecodeError(
+            f'No "{key}" array in the JSON stream', buffer, len(buffer)
+        )
+
+    pos = 0
+    while True:
+        pos = _WHITESPACE_AND_COMMAS.match(buffer, pos).end()
+        if pos == len(buffer):
+            buffer, pos = _read_more(chunks, buffer, pos)
+            continue
+        if buffer[pos] == "]":
+            break
+        try:
+            item, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            buffer, pos = _read_more(chunks, buffer, pos)
+            continue
+        # A number or a literal is only complete once it's followed by a
+        # delimiter, e.g. "-0" might be the beginning of "-0.5"
+        if not isinstance(item, (dict, list, str)) and not _VALUE_DELIMITER.match(
+            buffer, end
+        ):
+            buffer, pos = _read_more(chunks, buffer, pos)
+            continue
+        yield item
+        pos = end
+        # Drop the parsed items from the buffer once in a while
+        if pos > DEFAULT_STREAM_CHUNK_SIZE:
+            buffer = buffer[pos:]
+            pos = 0
+
+    for _ in chunks:
+        pass
+
+
+def _read_more(chunks, buffer, pos):
+    next_chunk = next(chunks, None)
+    if next_chunk is None:
+        raise json.JSONDecodeError("Unterminated JSON array", buffer, pos)
+    return buffer[pos:] + next_chunk, 0
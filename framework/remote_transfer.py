@@ -0,0 +1,272 @@
+"""
+Module to stream files from the remote host
+"""
+
+import errno
+import hashlib
+import logging
+import os
+import shlex
+import tarfile
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+from framework.local_connection import LocalChannel
+from framework.ssh_connection_manager import SSHConnectionManager
+from noobaa_sa.exceptions import UnexpectedBehaviour
+
+log = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+
+
+def download_file(
+    remote_path,
+    local_path,
+    use_sudo=False,
+    compress=False,
+    verify_checksum=False,
+    chunk_size=DEFAULT_CHUNK_SIZE,
+    conn=None,
+):
+    """
+    Download a file from the remote host in fixed-size chunks
+
+    The file is streamed over SFTP when possible. If it can't be read
+    over SFTP due to permissions, or if sudo or compression are requested,
+    it is streamed through a raw exec channel instead, via 'sudo cat' or
+    'gzip -c'. With a local connection, the file is copied directly or
+    through a local 'sudo cat'. The content is handled as bytes throughout, so binary
+    files are transferred intact and never fully buffered in memory.
+
+    Args:
+        remote_path (str): The full path to the file on the remote host
+        local_path (str): The full path to the file on the local machine
+        use_sudo (bool): Whether to read the file with sudo
+        compress (bool): Whether to gzip the file on the wire
+        verify_checksum (bool): Whether to compare the SHA256 of the local
+                                copy with the remote file
+        chunk_size (int): The size of the chunks to read in bytes
+        conn (Connection): The connection to download with.
+                           Defaults to the SSHConnectionManager connection.
+
+    Returns:
+        int: The number of bytes written to the local file
+
+    Raises:
+        UnexpectedBehaviour: In case the file couldn't be downloaded, or its
+                             checksum doesn't match the remote file
+
+    """
+    conn = conn or SSHConnectionManager().connection
+    log.info(f"Downloading {conn.host}:{remote_path} to {local_path}")
+    sha256 = hashlib.sha256()
+
+    transferred = None
+    if getattr(conn, "is_local", False):
+        # There's nothing to gain from compression on a local copy
+        compress = False
+    if not use_sudo and not compress:
+        try:
+            if getattr(conn, "is_local", False):
+                transferred = _download_via_local_file(
+                    remote_path, local_path, sha256, chunk_size
+                )
+            else:
+                transferred = _download_via_sftp(
+                    conn, remote_path, local_path, sha256, chunk_size
+                )
+        except PermissionError:
+            log.info(f"No permission to read {remote_path} directly, using sudo")
+            use_sudo = True
+            sha256 = hashlib.sha256()
+
+    if transferred is None:
+        transferred = _download_via_channel(
+            conn, remote_path, local_path, sha256, use_sudo, compress, chunk_size
+        )
+
+    if verify_checksum:
+        sudo = "sudo " if use_sudo else ""
+        retcode, stdout, stderr = conn.exec_cmd(
+            f"{sudo}sha256sum {shlex.quote(remote_path)}"
+        )
+        remote_sha256 = stdout.split(" ")[0] if retcode == 0 else None
+        if remote_sha256 != sha256.hexdigest():
+            raise UnexpectedBehaviour(
+                f"Checksum mismatch for {remote_path}: remote {remote_sha256}, "
+                f"local {sha256.hexdigest()}\nstderr: {stderr}"
+            )
+
+    log.info(f"Downloaded {transferred} bytes from {conn.host}:{remote_path}")
+    return transferred
+
+
+def download_files(path_pairs, concurrency=4, **kwargs):
+    """
+    Download several files from the remote host in parallel
+
+    Each concurrent download runs over its own pooled SSH connection.
+
+    Args:
+        path_pairs (list): Tuples of (remote_path, local_path)
+        concurrency (int): The maximum number of concurrent downloads
+        **kwargs: Keyword arguments to pass to download_file
+
+    Returns:
+        list: The number of bytes downloaded for each pair, in order
+
+    """
+    pool = SSHConnectionManager().pool
+
+    def _download(path_pair):
+        with pool.checkout() as conn:
+            return download_file(*path_pair, conn=conn, **kwargs)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        return list(executor.map(_download, path_pairs))
+
+
+def download_directory(remote_dir, local_dir, use_sudo=True, compress=True, conn=None):
+    """
+    Download a directory tree from the remote host as a single tar stream
+
+    Args:
+        remote_dir (str): The full path to the directory on the remote host
+        local_dir (str): The local directory to extract the tree into
+        use_sudo (bool): Whether to read the tree with sudo
+        compress (bool): Whether to gzip the tar stream on the wire
+        conn (Connection): The connection to download with.
+                           Defaults to the SSHConnectionManager connection.
+
+    Raises:
+        UnexpectedBehaviour: In case the directory couldn't be downloaded
+
+    """
+    conn = conn or SSHConnectionManager().connection
+    log.info(f"Downloading directory {conn.host}:{remote_dir} to {local_dir}")
+    sudo = "sudo " if use_sudo else ""
+    tar_flags = "-cz" if compress else "-c"
+    channel = _open_exec_channel(
+        conn, f"{sudo}tar -C {shlex.quote(remote_dir)} {tar_flags} ."
+    )
+    os.makedirs(local_dir, exist_ok=True)
+    with channel.makefile("rb") as tar_stream:
+        with tarfile.open(
+            fileobj=tar_stream, mode="r|gz" if compress else "r|"
+        ) as tar:
+            if hasattr(tarfile, "data_filter"):
+                tar.extractall(local_dir, filter="data")
+            else:
+                tar.extractall(local_dir)
+    _check_channel_exit_status(channel, f"download directory {remote_dir}")
+
+
+def _download_via_sftp(conn, remote_path, local_path, sha256, chunk_size):
+    """
+    Stream a remote file to a local file over SFTP
+
+    Returns:
+        int: The number of bytes written
+
+    Raises:
+        PermissionError: If the remote file can't be read by the connected user
+
+    """
+    sftp = conn.client.open_sftp()
+    try:
+        try:
+            remote_file = sftp.open(remote_path, "rb")
+        except IOError as e:
+            if e.errno == errno.EACCES:
+                raise PermissionError(str(e)) from e
+            raise UnexpectedBehaviour(
+                f"Failed to open {remote_path} over SFTP: {e}"
+            ) from e
+        with remote_file, open(local_path, "wb") as local_file:
+            remote_file.prefetch()
+            return _copy_chunks(remote_file.read, local_file, sha256, chunk_size)
+    finally:
+        sftp.close()
+
+
+def _download_via_local_file(remote_path, local_path, sha256, chunk_size):
+    """
+    Copy a file of the local NooBaa host in chunks
+
+    Returns:
+        int: The number of bytes written
+
+    Raises:
+        PermissionError: If the file can't be read by the current user
+
+    """
+    try:
+        source_file = open(remote_path, "rb")
+    except FileNotFoundError as e:
+        raise UnexpectedBehaviour(f"Failed to open {remote_path}: {e}") from e
+    with source_file, open(local_path, "wb") as local_file:
+        return _copy_chunks(source_file.read, local_file, sha256, chunk_size)
+
+
+def _download_via_channel(
+    conn, remote_path, local_path, sha256, use_sudo, compress, chunk_size
+):
+    """
+    Stream a remote file to a local file through the output of an exec channel
+
+    Returns:
+        int: The number of bytes written
+
+    """
+    sudo = "sudo " if use_sudo else ""
+    reader = "gzip -c -1" if compress else "cat"
+    channel = _open_exec_channel(conn, f"{sudo}{reader} {shlex.quote(remote_path)}")
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS) if compress else None
+
+    def _read_chunk(size):
+        while True:
+            data = channel.recv(size)
+            if decompressor is None:
+                return data
+            if not data:
+                return decompressor.flush()
+            # Keep reading until the decompressor has some output to return
+            decompressed = decompressor.decompress(data)
+            if decompressed:
+                return decompressed
+
+    with open(local_path, "wb") as local_file:
+        transferred = _copy_chunks(_read_chunk, local_file, sha256, chunk_size)
+    _check_channel_exit_status(channel, f"download {remote_path} to {local_path}")
+    return transferred
+
+
+def _copy_chunks(read_chunk, local_file, sha256, chunk_size):
+    transferred = 0
+    while True:
+        chunk = read_chunk(chunk_size)
+        if not chunk:
+            return transferred
+        local_file.write(chunk)
+        sha256.update(chunk)
+        transferred += len(chunk)
+
+
+def _open_exec_channel(conn, cmd):
+    log.info(f"Streaming the output of cmd: {cmd} on {conn.host}")
+    if getattr(conn, "is_local", False):
+        return LocalChannel(cmd)
+    channel = conn.client.get_transport().open_session()
+    channel.exec_command(cmd)
+    return channel
+
+
+def _check_channel_exit_status(channel, action):
+    stderr = channel.makefile_stderr("rb").read().decode("utf-8", "replace")
+    retcode = channel.recv_exit_status()
+    channel.close()
+    if retcode != 0:
+        raise UnexpectedBehaviour(
+            f"Failed to {action}\nretcode: {retcode}\nstderr: {stderr}"
+        )
@@ -2,14 +2,24 @@
 Module to connect to remote host
 """
 
+import getpass
 import logging
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 
 from common_ci_utils.connection import Connection
 from framework import config
+from framework.command_tracer import InstrumentedConnection
+from framework.local_connection import LocalConnection, is_local_host
+from framework.remote_agent import RemoteAgent
 from paramiko.auth_handler import AuthenticationException, SSHException
 
 log = logging.getLogger(__name__)
 
+DEFAULT_SSH_POOL_SIZE = 4
+
 
 class SSHConnectionManager:
     """
@@ -33,9 +43,15 @@ class SSHConnectionManager:
 
         """
         # Initialize the connection only if it hasn't been created yet
+        if getattr(self, "_initialized", False):
+            return
+        self._initialized = True
         self._conn = None
+        self._pool = None
+        self._backends = {}
+        self._lock = threading.Lock()
         self.host = config.ENV_DATA["noobaa_sa_host"]
-        self.user = config.ENV_DATA["user"]
+        self.user = config.ENV_DATA.get("user")
         self.password = config.ENV_DATA.get("password")
         self.private_key = config.ENV_DATA.get("private_key")
 
@@ -48,22 +64,117 @@ class SSHConnectionManager:
             paramiko.client: Paramiko SSH client connection to host
 
         """
-        if self._conn:
-            return self._conn
+        with self._lock:
+            if not self._conn:
+                self._conn = self.create_connection()
+        return self._conn
+
+    @property
+    def pool(self):
+        """
+        Get the pool of connections to host
+
+        The pool size is taken from ENV_DATA["ssh_pool_size"], and the
+        connections are only established once they are first needed.
+
+        Returns:
+            ConnectionPool: The pool of connections to host
+
+        """
+        with self._lock:
+            if not self._pool:
+                pool_size = config.ENV_DATA.get("ssh_pool_size", DEFAULT_SSH_POOL_SIZE)
+                self._pool = ConnectionPool(self.create_connection, pool_size)
+        return self._pool
+
+    @property
+    def backend(self):
+        """
+        Get the backend the connections to host are made with
+
+        Returns:
+            str: Either "ssh" or "local", see get_backend
+
+        """
+        return self.get_backend(self.host)
 
+    def get_backend(self, host):
+        """
+        Get the backend the connections to a host are made with
+
+        Taken from ENV_DATA["connection_backend"], which is either "ssh",
+        "local" or "auto". With "auto", the local backend is used if
+        the host resolves to the local machine and the configured
+        user is the current user.
+
+        Args:
+            host (str): The host name or address
+
+        Returns:
+            str: Either "ssh" or "local"
+
+        Raises:
+            ValueError: If the configured backend is not supported
+
+        """
+        if host not in self._backends:
+            backend = config.ENV_DATA.get("connection_backend", "auto")
+            if backend == "auto":
+                is_current_user = self.user in (None, getpass.getuser())
+                backend = "local" if is_current_user and is_local_host(host) else "ssh"
+            if backend not in ("ssh", "local"):
+                raise ValueError(f"Unsupported connection backend: {backend}")
+            log.info(f"Using the {backend} connection backend for {host}")
+            self._backends[host] = backend
+        return self._backends[host]
+
+    def create_connection(self, host=None):
+        """
+        Create a new connection to host
+
+        With the local backend, the commands run as local subprocesses. If
+        ENV_DATA["use_remote_agent"] is set, the calls of an SSH connection
+        are sent to a resident helper agent on the host instead. Unless
+        ENV_DATA["trace_remote_commands"] is disabled, the latency of every
+        call is recorded by the session command tracer.
+
+        Args:
+            host (str): The host to connect to, with the credentials of
+                        noobaa_sa_host. Defaults to noobaa_sa_host.
+
+        Returns:
+            Connection|LocalConnection|RemoteAgent|InstrumentedConnection:
+                A new connection to host
+
+        Raises:
+            authException: In-case of authentication failed
+            sshException: In-case of ssh connection failed
+
+        """
+        host = host or self.host
+        if self.get_backend(host) == "local":
+            conn = LocalConnection(host=host, user=self.user)
+        else:
+            conn = self._create_ssh_connection(host)
+            if config.ENV_DATA.get("use_remote_agent"):
+                conn = RemoteAgent(conn).start()
+        if config.ENV_DATA.get("trace_remote_commands", True):
+            conn = InstrumentedConnection(conn)
+        return conn
+
+    def _create_ssh_connection(self, host):
         try:
             if self.private_key:
-                self._conn = Connection(
-                    host=self.host,
+                return Connection(
+                    host=host,
                     user=self.user,
                     private_key=self.private_key,
                 )
-            else:
-                self._conn = Connection(
-                    host=self.host,
-                    user=self.user,
-                    password=self.password,
-                )
+            return Connection(
+                host=host,
+                user=self.user,
+                password=self.password,
+            )
         except AuthenticationException as authException:
             log.error(f"Authentication failed: {authException}")
             raise authException
@@ -71,18 +182,170 @@ class SSHConnectionManager:
             log.error(f"SSH connection failed: {sshException}")
             raise sshException
 
-        return self._conn
+    def exec_many(self, cmds, concurrency=None):
+        """
+        Execute several commands on host concurrently over the connection pool
+
+        Args:
+            cmds (list): The commands to execute
+            concurrency (int): The maximum number of commands to run at once.
+                               Defaults to the pool size.
+
+        Returns:
+            list: The (retcode, stdout, stderr) tuple of each command, in the
+                  order of the given commands
+
+        """
+        if not cmds:
+            return []
+        pool = self.pool
+        max_workers = min(concurrency or pool.size, pool.size, len(cmds))
+        log.info(f"Executing {len(cmds)} commands with concurrency {max_workers}")
+
+        def _exec(cmd):
+            with pool.checkout() as conn:
+                return conn.exec_cmd(cmd)
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(_exec, cmds))
 
     @classmethod
     def close_connection(cls):
         """
         Closes SSH connection
         """
-        if cls._instance and cls._instance._conn:
-            cls._instance._conn.close()
+        if cls._instance:
+            if cls._instance._conn:
+                cls._instance._conn.close()
+            if cls._instance._pool:
+                cls._instance._pool.close()
             cls._instance = None
 
 
+class ConnectionPool:
+    """
+    A thread-safe pool of connections to host
+
+    Every checked out connection is used exclusively by one thread, so
+    commands that run concurrently are spread over separate SSH transports.
+    A connection that raised while checked out, or whose transport dropped
+    while idle, is closed and replaced by a new one on the next checkout.
+
+    Example usage:
+        with SSHConnectionManager().pool.checkout() as conn:
+            retcode, stdout, stderr = conn.exec_cmd("hostname")
+
+    """
+
+    def __init__(self, connection_factory, size=DEFAULT_SSH_POOL_SIZE):
+        """
+        Args:
+            connection_factory (func): A function that creates a new connection
+            size (int): The maximum number of connections in the pool
+
+        """
+        if size < 1:
+            raise ValueError(f"Connection pool size must be positive, got {size}")
+        self.size = size
+        self._connection_factory = connection_factory
+        # The idle queue holds None for a slot whose connection was discarded
+        self._idle = queue.LifoQueue()
+        self._connections = []
+        self._reserved = 0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def checkout(self, timeout=None):
+        """
+        Check out a connection for exclusive use
+
+        A new connection is created if all the existing ones are in use and
+        the pool is not full yet. Otherwise, the call blocks until one is returned.
+
+        Args:
+            timeout (float): The maximum seconds to wait for a connection.
+                             Waits indefinitely if None.
+
+        Yields:
+            Connection: A connection to host
+
+        Raises:
+            queue.Empty: If no connection became available within the timeout
+
+        """
+        conn = self._acquire(timeout)
+        try:
+            yield conn
+        except BaseException:
+            # The connection may be broken, so it isn't handed out again
+            self._discard(conn)
+            raise
+        self._idle.put(conn)
+
+    def close(self):
+        """
+        Close all the connections of the pool
+        """
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections = []
+            self._reserved = 0
+            self._idle = queue.LifoQueue()
+
+    def _acquire(self, timeout=None):
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                can_grow = self._reserved < self.size
+                if can_grow:
+                    # Reserve the slot before connecting outside the lock
+                    self._reserved += 1
+            conn = None if can_grow else self._idle.get(timeout=timeout)
+
+        while conn is not None and not _is_transport_active(conn):
+            log.info(f"Replacing a pooled connection to {conn.host} that dropped")
+            self._discard(conn)
+            conn = self._idle.get(timeout=timeout)
+        if conn is not None:
+            return conn
+
+        # Connect in the reserved slot, or in the slot of a discarded connection
+        try:
+            conn = self._connection_factory()
+        except Exception:
+            # Keep the slot for the next checkout, which may be waiting for it
+            self._idle.put(None)
+            raise
+        with self._lock:
+            self._connections.append(conn)
+        return conn
+
+    def _discard(self, conn):
+        with self._lock:
+            if conn in self._connections:
+                self._connections.remove(conn)
+        try:
+            conn.close()
+        except Exception as e:
+            log.warning(f"Failed to close a discarded connection to {conn.host}: {e}")
+        self._idle.put(None)
+
+
+def _is_transport_active(conn):
+    """
+    Check whether the SSH transport of a connection is still up
+
+    Connections without an SSH client, e.g. local ones, are always active.
+    """
+    client = getattr(conn, "client", None)
+    if client is None:
+        return True
+    transport = client.get_transport()
+    return transport is not None and transport.is_active()
+
+
 def pytest_sessionfinish(session, exitstatus):
     # Close the SSH connection at the end of the pytest session
     SSHConnectionManager.close_connection()
@@ -5,15 +5,29 @@ Module which contain account operations like create, delete, list and update
 import json
 import logging
 import os
-import tempfile
+import random
 from abc import ABC, abstractmethod
 
 from common_ci_utils.random_utils import generate_unique_resource_name
 from common_ci_utils.templating import Templating
 
 from framework import config
+from framework.async_executor import get_default_executor
+from framework.noobaa_cli_batch import NoobaaCliBatch
+from framework.remote_batch import RemoteBatch
+from framework.remote_stream import exec_cmd_stream, iter_json_array_items
 from framework.ssh_connection_manager import SSHConnectionManager
 from noobaa_sa import constants
+from noobaa_sa.account_cache import account_cache
+from noobaa_sa.config_dir import (
+    IDENTITIES_LAYOUT,
+    clone_account,
+    detect_layout,
+    get_config_root_full_path,
+    read_config_file,
+    remove_entries,
+    seed_entries,
+)
 from noobaa_sa.defaults import MANAGE_NSFS
 from noobaa_sa.exceptions import (
     AccountCreationFailed,
@@ -21,8 +35,15 @@ from noobaa_sa.exceptions import (
     AccountListFailed,
     AccountStatusQueryFailed,
     AccountUpdateFailed,
+    UnexpectedBehaviour,
+)
+from noobaa_sa.records import AccountRecord, RecordListing
+from utility.host_facts import get_host_facts
+from utility.utils import (
+    generate_random_key,
+    get_compiled_template,
+    get_noobaa_sa_host_home_path,
 )
-from utility.utils import generate_random_key, get_noobaa_sa_host_home_path
 
 log = logging.getLogger(__name__)
 
@@ -67,6 +88,8 @@ class NSFSAccount(Account):
     def __init__(self, account_json):
         super().__init__(account_json)
         self.accounts_created = []
+        # The config files of the seeded accounts per config root
+        self.accounts_seeded = {}
 
     def create(
         self,
@@ -99,6 +122,81 @@ class NSFSAccount(Account):
 
         """
 
+        batch, account_name, access_key, secret_key = self._build_create_batch(
+            account_name,
+            access_key,
+            secret_key,
+            config_root,
+            fs_backend,
+            allow_bucket_creation,
+        )
+        # Run all the steps in a single round trip
+        self._finish_create(account_name, config_root, batch.run())
+        return account_name, access_key, secret_key
+
+    async def create_async(
+        self,
+        account_name="",
+        access_key="",
+        secret_key="",
+        config_root=None,
+        fs_backend=constants.DEFAULT_FS_BACKEND,
+        allow_bucket_creation=True,
+        executor=None,
+    ):
+        """
+        Account creation that can overlap with other async operations
+
+        Args:
+            account_name (str): name of the account
+            access_key (str): access key for the account
+            secret_key (str): secret key for the account
+            config_root (str): path to config root
+            fs_backend (str): filesystem backend
+            allow_bucket_creation (bool): allow bucket creation
+            executor (AsyncRemoteExecutor): The executor to run the creation on.
+                                            Defaults to the shared executor.
+
+        Returns:
+            tuple: account_name, access_key and secret_key, see create
+
+        Example usage:
+            accounts = await executor.gather(
+                *[account_manager.create_async() for _ in range(100)]
+            )
+
+        """
+        executor = executor or get_default_executor()
+        batch, account_name, access_key, secret_key = self._build_create_batch(
+            account_name,
+            access_key,
+            secret_key,
+            config_root,
+            fs_backend,
+            allow_bucket_creation,
+        )
+        self._finish_create(
+            account_name, config_root, await executor.run_batch(batch)
+        )
+        return account_name, access_key, secret_key
+
+    def _build_create_batch(
+        self,
+        account_name,
+        access_key,
+        secret_key,
+        config_root,
+        fs_backend,
+        allow_bucket_creation,
+    ):
+        """
+        Build the batch that creates an account
+
+        Returns:
+            tuple: The RemoteBatch, and the account_name, access_key and
+                   secret_key with the missing ones generated
+
+        """
         # Set default values if not provided
         if not account_name:
             account_name = generate_unique_resource_name(prefix="account")
@@ -109,10 +207,10 @@ class NSFSAccount(Account):
 
         hd = get_noobaa_sa_host_home_path()
         bucket_path = os.path.join(hd, f"fs_{account_name}")
+        batch = RemoteBatch(self.conn)
 
         # create bucket path
-        cmd = f"sudo mkdir {bucket_path}"
-        self.conn.exec_cmd(cmd)
+        batch.add(f"sudo mkdir {bucket_path}")
 
         # form the account json file
         templating = Templating(base_path=config.ENV_DATA["template_dir"])
@@ -128,33 +226,317 @@ class NSFSAccount(Account):
         account_data_full = templating.render_template(account_template, account_data)
         log.info(f"account content: {account_data_full}")
 
-        # write to file
-        with tempfile.NamedTemporaryFile(
-            mode="w+", prefix="account_", delete=False
-        ) as account_file:
-            account_file.write(account_data_full)
-
-        # upload to noobaa-sa host
-        self.conn.exec_cmd(f"sudo mkdir -p {os.path.dirname(account_file.name)}")
-        self.conn.exec_cmd(f"sudo chmod a+w {os.path.dirname(account_file.name)}")
-        self.conn.upload_file(account_file.name, account_file.name)
+        # write the account json file on the noobaa-sa host
+        account_file_path = f"/tmp/account_{account_name}.json"
+        batch.add_file(account_file_path, account_data_full, mode="600")
 
         if config_root is None:
             config_root = self.config_root
         log.info(f"config root path: {config_root}")
         log.info("Adding account for NSFS deployment")
-        cmd = f"sudo {self.manage_nsfs} account add --config_root {config_root} --from_file {account_file.name}"
-        retcode, stdout, _ = self.conn.exec_cmd(cmd)
-        if retcode != 0:
+        cmd = f"sudo {self.manage_nsfs} account add --config_root {config_root} --from_file {account_file_path}"
+        batch.add(cmd)
+        batch.add(f"sudo rm -f {account_file_path}")
+        return batch, account_name, access_key, secret_key
+
+    def _finish_create(self, account_name, config_root, batch_results):
+        """
+        Check the results of an account creation batch and track the account
+
+        Raises:
+            AccountCreationFailed: If the account wasn't added
+
+        """
+        _, _, add_result, _ = batch_results
+        if add_result.retcode != 0:
             raise AccountCreationFailed(
-                f"Creation of account failed with error {stdout}"
+                f"Creation of account failed with error {add_result.stdout}"
             )
         log.info("Account created successfully")
+        self._cache_cli_reply(config_root, add_result.stdout)
 
         # Keep track of the accounts created
         self.accounts_created.append(account_name)
 
-        return account_name, access_key, secret_key
+    def _cache_cli_reply(self, config_root, stdout):
+        """
+        Cache the account in the reply of a noobaa-cli account command, if any
+        """
+        if config_root is None:
+            config_root = self.config_root
+        try:
+            account = json.loads(stdout)["response"]["reply"]
+        except (ValueError, KeyError, TypeError):
+            return
+        if isinstance(account, dict) and "name" in account:
+            account_cache.put(config_root, account)
+
+    def create_many(
+        self,
+        n,
+        config_root=None,
+        parallelism=None,
+        name_prefix="account",
+        single_process=False,
+        **template_overrides,
+    ):
+        """
+        Create many accounts in bulk
+
+        The account documents are rendered locally from the cached compiled
+        account template and shipped to the host in a single archive. The
+        bucket paths and accounts are then created in one batched invocation
+        that runs up to `parallelism` noobaa-cli processes at once, or all
+        the noobaa-cli operations in one Node.js process if `single_process`.
+
+        Args:
+            n (int): The number of accounts to create
+            config_root (str): path to config root
+            parallelism (int): The maximum number of accounts to create at once.
+                               Defaults to the number of CPUs of the host.
+            name_prefix (str): The prefix of the generated account names
+            single_process (bool): Whether to run the noobaa-cli operations one
+                                   after the other in a single Node.js process
+                                   instead of a process per account
+            **template_overrides: Values to render the account template with
+                                  instead of the defaults, e.g. fs_backend or
+                                  allow_bucket_creation
+
+        Returns:
+            list: A dict per account, in creation order, with the keys:
+                  - "account_name" (str)
+                  - "access_key" (str)
+                  - "secret_key" (str)
+                  - "bucket_path" (str): The new_buckets_path of the account
+                  - "success" (bool): Whether the account was created
+                  - "error" (str): The error output if the creation failed
+                  - "duration" (float|None): The remote creation time in seconds
+
+        Raises:
+            AccountCreationFailed: If the account documents couldn't be shipped
+
+        Example usage:
+            results = account_manager.create_many(1000, fs_backend="GPFS")
+            failed = [result for result in results if not result["success"]]
+
+        """
+        if config_root is None:
+            config_root = self.config_root
+        if parallelism is None:
+            parallelism = get_host_facts(self.conn)["cpu_count"] or 4
+        hd = get_noobaa_sa_host_home_path()
+        template = get_compiled_template("account.json")
+
+        accounts = []
+        account_files = {}
+        used_names = set()
+        while len(accounts) < n:
+            account_name = generate_unique_resource_name(prefix=name_prefix)
+            if account_name in used_names:
+                continue
+            used_names.add(account_name)
+            account_data = {
+                "account_name": account_name,
+                "access_key": generate_random_key(constants.EXPECTED_ACCESS_KEY_LEN),
+                "secret_key": generate_random_key(constants.EXPECTED_SECRET_KEY_LEN),
+                "bucket_path": os.path.join(hd, f"fs_{account_name}"),
+                "fs_backend": constants.DEFAULT_FS_BACKEND,
+                "allow_bucket_creation": True,
+            }
+            account_data.update(template_overrides)
+            account_files[f"{account_name}.json"] = template.render(**account_data)
+            accounts.append(account_data)
+
+        # Ship all the account documents at once
+        staging_dir = f"/tmp/accounts_{generate_unique_resource_name(prefix='bulk')}"
+        log.info(f"Shipping {n} account documents to {staging_dir}")
+        ship_batch = RemoteBatch(self.conn)
+        ship_batch.add_archive(staging_dir, account_files, name="ship")
+        if single_process:
+            # The runner only runs noobaa-cli, so the bucket paths are made upfront
+            for account_data in accounts:
+                ship_batch.add(
+                    f"sudo mkdir -p {account_data['bucket_path']}",
+                    name=account_data["account_name"],
+                )
+        try:
+            ship_results = ship_batch.run()
+            if ship_results[0].retcode != 0:
+                raise AccountCreationFailed(
+                    "Shipping the account documents failed with error "
+                    f"{ship_results[0].stderr}"
+                )
+            # The accounts whose bucket path couldn't be made aren't added
+            mkdir_failures = {
+                result.name: result
+                for result in ship_results[1:]
+                if result.retcode != 0
+            }
+
+            log.info(f"Adding {n} accounts with parallelism {parallelism}")
+            if single_process:
+                batch = NoobaaCliBatch(self.conn)
+            else:
+                batch = RemoteBatch(self.conn)
+            for account_data in accounts:
+                account_name = account_data["account_name"]
+                if account_name in mkdir_failures:
+                    continue
+                add_cmd = (
+                    f"sudo {self.manage_nsfs} account add --config_root {config_root} "
+                    f"--from_file {staging_dir}/{account_name}.json"
+                )
+                if not single_process:
+                    add_cmd = (
+                        f"sudo mkdir -p {account_data['bucket_path']} && {add_cmd}"
+                    )
+                batch.add(add_cmd, name=account_name)
+            if not len(batch):
+                add_results = []
+            elif single_process:
+                add_results = batch.run()
+            else:
+                add_results = batch.run(parallelism=parallelism)
+        finally:
+            self.conn.exec_cmd(f"sudo rm -rf {staging_dir}")
+        add_results = {result.name: result for result in add_results}
+        batch_results = [
+            add_results.get(account_data["account_name"])
+            or mkdir_failures[account_data["account_name"]]
+            for account_data in accounts
+        ]
+
+        results = []
+        for account_data, batch_result in zip(accounts, batch_results):
+            success = batch_result.retcode == 0
+            error = ""
+            if success:
+                self.accounts_created.append(account_data["account_name"])
+                self._cache_cli_reply(config_root, batch_result.stdout)
+            else:
+                error = batch_result.stdout or batch_result.stderr
+            results.append(
+                {
+                    "account_name": account_data["account_name"],
+                    "access_key": account_data["access_key"],
+                    "secret_key": account_data["secret_key"],
+                    "bucket_path": account_data["bucket_path"],
+                    "success": success,
+                    "error": error,
+                    "duration": batch_result.duration,
+                }
+            )
+        created = sum(result["success"] for result in results)
+        log.info(f"Created {created}/{n} accounts")
+        return results
+
+    def seed_many(self, n, config_root=None, name_prefix="account", sample_size=5):
+        """
+        Create many accounts by writing their config files directly
+
+        Meant for setting up large scale benchmarks only. A single exemplar
+        account is created through noobaa-cli and cloned under new names and
+        access keys, so all the accounts share the secret key, uid/gid and
+        new_buckets_path of the exemplar. The clones are written into the
+        config root in bulk, and a random sample of them is verified through
+        `account status`.
+
+        Args:
+            n (int): The number of accounts to create, besides the exemplar
+            config_root (str): path to config root
+            name_prefix (str): The prefix of the generated account names
+            sample_size (int): The number of accounts to verify
+
+        Returns:
+            list: A dict per account with the keys "account_name", "access_key",
+                  "secret_key" and "_id"
+
+        Raises:
+            AccountCreationFailed: If the accounts couldn't be written, or a
+                                   sampled account doesn't match its config
+
+        Example usage:
+            accounts = account_manager.seed_many(100000)
+            ...
+            account_manager.delete_seeded()
+
+        """
+        if config_root is None:
+            config_root = self.config_root
+        full_config_root = get_config_root_full_path(config_root)
+        exemplar_name, _, secret_key = self.create(
+            account_name=generate_unique_resource_name(prefix=name_prefix),
+            config_root=config_root,
+        )
+        layout = detect_layout(self.conn, full_config_root)
+        if layout == IDENTITIES_LAYOUT:
+            exemplar_path = (
+                f"{full_config_root}/accounts_by_name/{exemplar_name}.symlink"
+            )
+        else:
+            exemplar_path = f"{full_config_root}/accounts/{exemplar_name}.json"
+        exemplar = read_config_file(self.conn, exemplar_path)
+
+        accounts = []
+        files = {}
+        symlinks = {}
+        used_names = {exemplar_name}
+        while len(accounts) < n:
+            account_name = generate_unique_resource_name(prefix=name_prefix)
+            if account_name in used_names:
+                continue
+            used_names.add(account_name)
+            access_key = generate_random_key(constants.EXPECTED_ACCESS_KEY_LEN)
+            account, account_files, account_symlinks = clone_account(
+                exemplar, account_name, access_key, layout
+            )
+            files.update(account_files)
+            symlinks.update(account_symlinks)
+            accounts.append(
+                {
+                    "account_name": account_name,
+                    "access_key": access_key,
+                    "secret_key": secret_key,
+                    "_id": account["_id"],
+                }
+            )
+        try:
+            seed_entries(self.conn, full_config_root, files, symlinks)
+        except UnexpectedBehaviour as err:
+            raise AccountCreationFailed(f"Seeding accounts failed: {err}")
+        seeded_paths = list(files)
+        if layout == IDENTITIES_LAYOUT:
+            # Remove the whole identity directories
+            seeded_paths = [os.path.dirname(path) for path in seeded_paths]
+        self.accounts_seeded.setdefault(config_root, []).extend(
+            seeded_paths + list(symlinks)
+        )
+
+        for account in random.sample(accounts, min(sample_size, len(accounts))):
+            status = self.status(account["account_name"], config_root)
+            if status["access_keys"][0]["access_key"] != account["access_key"]:
+                raise AccountCreationFailed(
+                    f"The seeded account {account['account_name']} doesn't match "
+                    f"its config: {status}"
+                )
+        log.info(f"Seeded {n} accounts into {config_root}")
+        return accounts
+
+    def delete_seeded(self, config_root=None):
+        """
+        Delete the accounts that were seeded into a config root
+
+        Args:
+            config_root (str): path to config root. Defaults to all the
+                               config roots that were seeded.
+
+        """
+        config_roots = [config_root] if config_root else list(self.accounts_seeded)
+        for root in config_roots:
+            paths = self.accounts_seeded.pop(root, [])
+            if paths:
+                log.info(f"Deleting {len(paths)} seeded account entries")
+                remove_entries(self.conn, get_config_root_full_path(root), paths)
 
     def create_anonymous(self, uid=None, gid=None, user=None):
         """
@@ -201,20 +583,60 @@ class NSFSAccount(Account):
         Args:
             config_root (str): Path to config root
 
+        """
+        account_list = list(self.iter_list(config_root=config_root))
+        log.info(account_list)
+        return account_list
+
+    def iter_list(self, config_root=None, use_wide=False):
+        """
+        Lists accounts while the output of the CLI is still being received
+
+        The reply of the CLI is parsed incrementally, so the accounts can be
+        processed in bounded memory before the listing completes.
+
+        Args:
+            config_root (str): Path to config root
+            use_wide (bool): Get the config data of the accounts
+
+        Yields:
+            str|dict: Account names or dictionaries of account config data if
+                      use_wide is True
+
+        Raises:
+            AccountListFailed: If the listing failed
+
         """
         if config_root is None:
             config_root = self.config_root
         log.info("Listing accounts for NSFS deployment")
         cmd = f"sudo {self.manage_nsfs} account list --config_root {config_root}"
-        retcode, stdout, _ = self.conn.exec_cmd(cmd)
-        log.info(stdout)
-        if retcode != 0:
-            raise AccountListFailed(f"Listing of accounts failed with error {stdout}")
-        account_ls = json.loads(stdout)
-        account_ls = account_ls["response"]["reply"]
-        account_list = [item["name"] for item in account_ls]
-        log.info(account_list)
-        return account_list
+        cmd += " --wide" if use_wide else ""
+        try:
+            for item in iter_json_array_items(exec_cmd_stream(cmd, conn=self.conn)):
+                yield item if use_wide else item["name"]
+        except (UnexpectedBehaviour, ValueError) as e:
+            raise AccountListFailed(f"Listing of accounts failed with error {e}")
+
+    def list_records(self, config_root=None):
+        """
+        Lists accounts into compact records, indexed by name
+
+        Args:
+            config_root (str): Path to config root
+
+        Returns:
+            RecordListing: An AccountRecord per account, which can be looked up
+                           by "id" or "new_buckets_path" with find()
+
+        Raises:
+            AccountListFailed: If the listing failed
+
+        """
+        return RecordListing(
+            AccountRecord.from_dict(account)
+            for account in self.iter_list(config_root=config_root, use_wide=True)
+        )
 
     def delete(self, account_name=None, config_root=None):
         """
@@ -225,6 +647,29 @@ class NSFSAccount(Account):
             account_json (str): Path to account json file
 
         """
+        retcode, stdout, _ = self.conn.exec_cmd(
+            self._build_delete_cmd(account_name, config_root)
+        )
+        self._finish_delete(account_name, config_root, retcode, stdout)
+
+    async def delete_async(self, account_name=None, config_root=None, executor=None):
+        """
+        Account Deletion that can overlap with other async operations
+
+        Args:
+            account_name (str): name of the account
+            config_root (str): Path to config root
+            executor (AsyncRemoteExecutor): The executor to run the deletion on.
+                                            Defaults to the shared executor.
+
+        """
+        executor = executor or get_default_executor()
+        retcode, stdout, _ = await executor.run(
+            self._build_delete_cmd(account_name, config_root)
+        )
+        self._finish_delete(account_name, config_root, retcode, stdout)
+
+    def _build_delete_cmd(self, account_name, config_root):
         if config_root is None:
             config_root = self.config_root
         log.info("Deleting account for NSFS deployment")
@@ -235,11 +680,13 @@ class NSFSAccount(Account):
             cmd += f"--name {account_name} --config_root {config_root}"
         else:
             cmd += f"--anonymous"
+        return cmd
 
-        retcode, stdout, _ = self.conn.exec_cmd(cmd)
+    def _finish_delete(self, account_name, config_root, retcode, stdout):
         if retcode != 0:
             raise AccountDeletionFailed(f"Deleting account failed with error {stdout}")
         log.info("Account deleted successfully")
+        account_cache.invalidate(config_root or self.config_root, account_name)
 
         # Stop tracking the deleted account
         if account_name in self.accounts_created:
@@ -273,6 +720,8 @@ class NSFSAccount(Account):
         if account_name != "anonymous":
             cmd += f" --config_root {config_root}"
 
+        # Invalidate before updating, as a failed update might be partial
+        account_cache.invalidate(config_root, account_name)
         retcode, stdout, _ = self.conn.exec_cmd(cmd)
         if retcode != 0:
             raise AccountUpdateFailed(f"Updating account failed with error {stdout}")
@@ -312,7 +761,30 @@ class NSFSAccount(Account):
             )
 
         response_dict = json.loads(stdout)
-        return response_dict["response"]["reply"]
+        account = response_dict["response"]["reply"]
+        if account_name != "anonymous":
+            account_cache.put(config_root, account)
+        return account
+
+    def get_cached_status(self, account_name, config_root=None):
+        """
+        Get the config data of a given account, from the session account
+        cache if it's there
+
+        Args:
+            account_name (str): name of the account
+            config_root (str): path to config root
+
+        Returns:
+            dict: The config data of the account, see status
+
+        """
+        if config_root is None:
+            config_root = self.config_root
+        account = account_cache.get_by_name(account_name, config_root)
+        if account is None:
+            account = self.status(account_name, config_root)
+        return account
 
 
 class DBAccount(Account):
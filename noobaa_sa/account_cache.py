@@ -0,0 +1,149 @@
+"""
+Module which contain a session cache of the config data of NSFS accounts
+"""
+
+import copy
+import logging
+import threading
+
+log = logging.getLogger(__name__)
+
+
+class AccountCache:
+    """
+    A cache of account config data, per config root
+
+    The cache is filled by NSFSAccount from the output of account creation
+    and status, and the entries are invalidated when NSFSAccount updates or
+    deletes the account. Changes made outside of NSFSAccount, e.g. by running
+    noobaa-cli directly, are not seen by the cache.
+
+    Example usage:
+        account = account_cache.get_by_name("account-1", config_root)
+        if account is None:
+            account = account_manager.status("account-1", config_root)
+
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        """
+        Drop all the cached accounts
+        """
+        with self._lock:
+            self._by_name = {}
+            self._names_by_id = {}
+            self._names_by_access_key = {}
+            self.hits = 0
+            self.misses = 0
+
+    def put(self, config_root, account):
+        """
+        Cache the config data of an account
+
+        The access keys of an account status without --show_secrets are left
+        out of its output, so the access keys of the cached entry are kept
+        when the new config data lacks them.
+
+        Args:
+            config_root (str): The config root of the account
+            account (dict): The config data, as returned by account status
+
+        """
+        account = copy.deepcopy(account)
+        key = (config_root, account["name"])
+        with self._lock:
+            cached = self._by_name.get(key)
+            if cached and _has_secrets(cached) and not _has_secrets(account):
+                account["access_keys"] = copy.deepcopy(cached["access_keys"])
+            self._remove(key)
+            self._by_name[key] = account
+            if "_id" in account:
+                self._names_by_id[(config_root, account["_id"])] = key
+            for access_key in account.get("access_keys") or []:
+                if "access_key" in access_key:
+                    self._names_by_access_key[
+                        (config_root, access_key["access_key"])
+                    ] = key
+
+    def invalidate(self, config_root, account_name):
+        """
+        Drop an account from the cache
+
+        Args:
+            config_root (str): The config root of the account
+            account_name (str): The name of the account
+
+        """
+        with self._lock:
+            self._remove((config_root, account_name))
+
+    def get_by_name(self, account_name, config_root):
+        """
+        Args:
+            account_name (str): The name of the account
+            config_root (str): The config root of the account
+
+        Returns:
+            dict: The cached config data of the account, or None
+
+        """
+        with self._lock:
+            return self._get((config_root, account_name))
+
+    def get_by_id(self, account_id, config_root):
+        """
+        Args:
+            account_id (str): The _id of the account
+            config_root (str): The config root of the account
+
+        Returns:
+            dict: The cached config data of the account, or None
+
+        """
+        with self._lock:
+            return self._get(self._names_by_id.get((config_root, account_id)))
+
+    def get_by_access_key(self, access_key, config_root):
+        """
+        Args:
+            access_key (str): One of the access keys of the account
+            config_root (str): The config root of the account
+
+        Returns:
+            dict: The cached config data of the account, or None
+
+        """
+        with self._lock:
+            return self._get(self._names_by_access_key.get((config_root, access_key)))
+
+    def _get(self, key):
+        account = self._by_name.get(key)
+        if account is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return copy.deepcopy(account)
+
+    def _remove(self, key):
+        account = self._by_name.pop(key, None)
+        if account is None:
+            return
+        config_root = key[0]
+        self._names_by_id.pop((config_root, account.get("_id")), None)
+        for access_key in account.get("access_keys") or []:
+            self._names_by_access_key.pop(
+                (config_root, access_key.get("access_key")), None
+            )
+
+
+def _has_secrets(account):
+    return any(
+        "secret_key" in access_key for access_key in account.get("access_keys") or []
+    )
+
+
+account_cache = AccountCache()
@@ -0,0 +1,309 @@
+"""
+Module which contain a pool of pre-provisioned accounts that tests can lease
+"""
+
+import logging
+import os
+import queue
+import threading
+import time
+
+from framework import config
+from framework.ssh_connection_manager import SSHConnectionManager
+from noobaa_sa.account import NSFSAccount
+from noobaa_sa.bucket import BucketManager
+from noobaa_sa.exceptions import (
+    AccountDeletionFailed,
+    AccountStatusQueryFailed,
+    BucketDeletionFailed,
+    UnexpectedBehaviour,
+)
+from noobaa_sa.teardown import TeardownEngine
+
+log = logging.getLogger(__name__)
+
+DEFAULT_POOL_GROW_STEP = 4
+
+
+class AccountPool:
+    """
+    A pool of NSFS accounts that are created ahead of time and recycled
+
+    The initial accounts are created in the background right after start().
+    A lease that finds the pool empty asks it to grow, up to max_size, and
+    waits for the next account. Released accounts are scrubbed of their
+    buckets and objects before they are leased again.
+
+    Example usage:
+        pool = AccountPool(size=8).start()
+        account = pool.lease()
+        s3_client = S3Client(endpoint, account["access_key"], account["secret_key"])
+        ...
+        pool.release(account)
+
+    """
+
+    def __init__(
+        self,
+        size,
+        max_size=None,
+        grow_step=DEFAULT_POOL_GROW_STEP,
+        config_root=None,
+        **template_overrides,
+    ):
+        """
+        Args:
+            size (int): The number of accounts to create up front
+            max_size (int): The maximum number of accounts. Defaults to 4 * size.
+            grow_step (int): The number of accounts to add when the pool runs dry
+            config_root (str): Path to config root
+            **template_overrides: Values to render the account template with,
+                                  see NSFSAccount.create_many
+
+        """
+        self.size = size
+        self.max_size = max_size or 4 * size
+        self.grow_step = grow_step
+        self.config_root = config_root or config.ENV_DATA["config_root"]
+        self.template_overrides = template_overrides
+
+        # The background work runs on dedicated connections
+        self._account_manager = NSFSAccount(None)
+        self._account_manager.conn = SSHConnectionManager().create_connection()
+        self._bucket_manager = BucketManager()
+        self._bucket_manager.conn = self._account_manager.conn
+
+        self._idle = queue.Queue()
+        self._accounts = {}
+        self._bucket_paths = {}
+        self._leased = set()
+        self._requested = 0
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._worker = None
+        self._stats = {
+            "leases": 0,
+            "created": 0,
+            "creation_failures": 0,
+            "recycled": 0,
+            "retired": 0,
+            "total_wait_time": 0.0,
+            "max_wait_time": 0.0,
+        }
+
+    def start(self):
+        """
+        Start creating the initial accounts in the background
+
+        Returns:
+            AccountPool: The pool itself, to allow chaining
+
+        """
+        self._worker = threading.Thread(
+            target=self._provision, name="account-pool", daemon=True
+        )
+        self._worker.start()
+        self._request(self.size)
+        return self
+
+    def lease(self, timeout=600):
+        """
+        Lease an account for exclusive use
+
+        Args:
+            timeout (float): The maximum seconds to wait for an account
+
+        Returns:
+            dict: The "account_name", "access_key" and "secret_key" of the account
+
+        Raises:
+            queue.Empty: If no account became available within the timeout
+
+        """
+        start = time.perf_counter()
+        try:
+            account = self._idle.get_nowait()
+        except queue.Empty:
+            log.info("The account pool is empty, waiting for an account")
+            self._request(self.grow_step)
+            account = self._idle.get(timeout=timeout)
+        wait_time = time.perf_counter() - start
+        with self._cond:
+            self._leased.add(account["account_name"])
+            self._stats["leases"] += 1
+            self._stats["total_wait_time"] += wait_time
+            self._stats["max_wait_time"] = max(self._stats["max_wait_time"], wait_time)
+        log.info(f"Leased account {account['account_name']} after {wait_time:.3f}s")
+        return dict(account)
+
+    def release(self, account):
+        """
+        Return a leased account to the pool
+
+        The buckets of the account and the objects under the buckets path the
+        pool created for it are deleted first. An account that can't be
+        scrubbed, e.g. because its buckets path was changed, is deleted
+        instead of being returned to the pool. Accounts that aren't leased
+        from the pool, e.g. ones already released, are ignored.
+
+        Args:
+            account (dict|str): The leased account, or its name
+
+        """
+        account_name = account if isinstance(account, str) else account["account_name"]
+        with self._cond:
+            if account_name not in self._leased or account_name not in self._accounts:
+                log.warning(
+                    f"Account {account_name} isn't leased from the pool, ignoring "
+                    "its release"
+                )
+                return
+            self._leased.discard(account_name)
+        try:
+            self._scrub(account_name)
+        except Exception as e:
+            log.warning(f"Failed to scrub account {account_name}, retiring it: {e}")
+            self._retire(account_name)
+            return
+        with self._cond:
+            account = self._accounts.get(account_name)
+            if account is None:
+                log.warning(f"Account {account_name} was removed from the pool")
+                return
+            self._stats["recycled"] += 1
+            self._idle.put(account)
+
+    def get_stats(self):
+        """
+        Returns:
+            dict: The counters of the pool, with the average lease wait time
+                  as "avg_wait_time", the number of accounts as "total" and
+                  the number of idle ones as "idle"
+
+        """
+        with self._cond:
+            stats = dict(self._stats)
+            stats["total"] = len(self._accounts)
+        stats["idle"] = self._idle.qsize()
+        stats["avg_wait_time"] = (
+            stats["total_wait_time"] / stats["leases"] if stats["leases"] else 0.0
+        )
+        return stats
+
+    def close(self):
+        """
+        Stop provisioning and delete all the accounts of the pool
+        """
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        if self._worker:
+            self._worker.join()
+        log.info(f"Account pool stats: {self.get_stats()}")
+
+        TeardownEngine(
+            self._bucket_manager, self._account_manager, config_root=self.config_root
+        ).teardown(accounts=list(self._accounts))
+        with self._cond:
+            self._accounts = {}
+            self._bucket_paths = {}
+        self._account_manager.conn.close()
+
+    def _request(self, count):
+        with self._cond:
+            pending = len(self._accounts) + self._requested
+            count = min(count, self.max_size - pending)
+            if count > 0:
+                self._requested += count
+                self._cond.notify_all()
+
+    def _provision(self):
+        while True:
+            with self._cond:
+                while not self._requested and not self._stopped:
+                    self._cond.wait()
+                if self._stopped:
+                    return
+                count = self._requested
+            log.info(f"Provisioning {count} accounts for the account pool")
+            try:
+                results = self._account_manager.create_many(
+                    count, config_root=self.config_root, **self.template_overrides
+                )
+            except Exception as e:
+                log.error(f"Failed to provision accounts for the pool: {e}")
+                results = []
+            # The pool owns the accounts, not the manager
+            self._account_manager.accounts_created = []
+            with self._cond:
+                self._requested -= count
+                for result in results:
+                    if not result["success"]:
+                        self._stats["creation_failures"] += 1
+                        continue
+                    account = {
+                        key: result[key]
+                        for key in ("account_name", "access_key", "secret_key")
+                    }
+                    self._accounts[account["account_name"]] = account
+                    self._bucket_paths[account["account_name"]] = result["bucket_path"]
+                    self._stats["created"] += 1
+                    self._idle.put(account)
+
+    def _scrub(self, account_name):
+        status = self._account_manager.status(account_name, self.config_root)
+        self._delete_buckets(account_name, status["_id"])
+        # Pick up the credentials in case the test rotated them
+        access_keys = status.get("access_keys") or []
+        with self._cond:
+            if account_name not in self._accounts:
+                raise UnexpectedBehaviour(f"{account_name} was removed from the pool")
+            if access_keys and "secret_key" in access_keys[0]:
+                self._accounts[account_name].update(
+                    access_key=access_keys[0]["access_key"],
+                    secret_key=access_keys[0]["secret_key"],
+                )
+            buckets_path = self._bucket_paths[account_name]
+        # The objects are deleted as root, so only from the directory the pool
+        # created for the account, and never from a path a test set instead
+        status_path = status["nsfs_account_config"]["new_buckets_path"]
+        if os.path.normpath(status_path) != os.path.normpath(buckets_path):
+            raise UnexpectedBehaviour(
+                f"The buckets path of {account_name} was changed from "
+                f"{buckets_path} to {status_path}, refusing to scrub it"
+            )
+        if os.path.basename(os.path.normpath(buckets_path)) != f"fs_{account_name}":
+            log.info(
+                f"{buckets_path} isn't private to {account_name}, not scrubbing it"
+            )
+            return
+        retcode, _, stderr = self._account_manager.conn.exec_cmd(
+            f"sudo find {buckets_path} -mindepth 1 -delete"
+        )
+        if retcode != 0:
+            raise BucketDeletionFailed(
+                f"Failed to delete the objects under {buckets_path}: {stderr}"
+            )
+
+    def _delete_buckets(self, account_name, account_id=None):
+        if account_id is None:
+            account_id = self._account_manager.get_cached_status(
+                account_name, self.config_root
+            )["_id"]
+        listing = self._bucket_manager.list_records(config_root=self.config_root)
+        for bucket in listing.find("owner", account_id):
+            self._bucket_manager.delete(
+                bucket.name, config_root=self.config_root, force=True
+            )
+
+    def _retire(self, account_name):
+        with self._cond:
+            self._accounts.pop(account_name, None)
+            self._bucket_paths.pop(account_name, None)
+            self._stats["retired"] += 1
+        try:
+            self._account_manager.delete(account_name, self.config_root)
+        except (AccountDeletionFailed, AccountStatusQueryFailed) as e:
+            log.warning(f"Failed to delete the retired account {account_name}: {e}")
+        # Keep the pool at its size
+        self._request(1)
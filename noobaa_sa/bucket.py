@@ -5,11 +5,28 @@ Module which contain bucket operations like create, delete, list, status and upd
 import json
 import logging
 import os
+import random
+
+from common_ci_utils.random_utils import generate_unique_resource_name
 
 from framework import config
+from framework.async_executor import get_default_executor
+from framework.noobaa_cli_batch import NoobaaCliBatch
+from framework.remote_batch import RemoteBatch
+from framework.remote_stream import exec_cmd_stream, iter_json_array_items
 from framework.ssh_connection_manager import SSHConnectionManager
+from utility.host_facts import get_host_facts
 from utility.utils import get_noobaa_sa_host_home_path
+from noobaa_sa.account_cache import account_cache
+from noobaa_sa.config_dir import (
+    clone_bucket,
+    get_config_root_full_path,
+    read_config_file,
+    remove_entries,
+    seed_entries,
+)
 from noobaa_sa.defaults import MANAGE_NSFS
+from noobaa_sa.records import BucketRecord, RecordListing
 import noobaa_sa.exceptions as e
 
 log = logging.getLogger(__name__)
@@ -29,6 +46,8 @@ class BucketManager:
         self.base_cmd = f"sudo {self.manage_nsfs}"
         self.unwanted_log = "2>/dev/null"
         self.conn = SSHConnectionManager().connection
+        # The config files of the seeded buckets per config root
+        self.buckets_seeded = {}
 
     def create(self, account_name, bucket_name, config_root=None, **kwargs):
         """
@@ -38,31 +57,101 @@ class BucketManager:
             account_name: User name
             bucket_name: Name of the bucket
             config_root (str): Path to config root
+
+            Supported options via kwargs:
+            path (str): An explicit bucket path, created if it doesn't exist
+            custom_path: Create the bucket under its own fs_<account>_<bucket> path
+            custom_fs_backend (str): The filesystem backend of the bucket
+        """
+        if config_root is None:
+            config_root = self.config_root
+        account_info = account_cache.get_by_name(account_name, config_root)
+        if account_info is None:
+            status_cmd = self._build_account_status_cmd(account_name, config_root)
+            account_info = self._parse_account_info(
+                config_root, *self.conn.exec_cmd(status_cmd)
+            )
+        mkdir_cmd, add_cmd = self._build_create_cmds(
+            account_info, account_name, bucket_name, config_root, **kwargs
+        )
+        if mkdir_cmd:
+            self.conn.exec_cmd(mkdir_cmd)
+        self._finish_create(*self.conn.exec_cmd(add_cmd))
+
+    async def create_async(
+        self, account_name, bucket_name, config_root=None, executor=None, **kwargs
+    ):
+        """
+        Create bucket using CLI, overlapping with other async operations
+
+        Args:
+            account_name: User name
+            bucket_name: Name of the bucket
+            config_root (str): Path to config root
+            executor (AsyncRemoteExecutor): The executor to run the creation on.
+                                            Defaults to the shared executor.
+
+        Example usage:
+            await executor.gather(
+                *[bucket_manager.create_async(account_name, name) for name in names]
+            )
         """
         if config_root is None:
             config_root = self.config_root
+        executor = executor or get_default_executor()
+        account_info = account_cache.get_by_name(account_name, config_root)
+        if account_info is None:
+            status_cmd = self._build_account_status_cmd(account_name, config_root)
+            account_info = self._parse_account_info(
+                config_root, *await executor.run(status_cmd)
+            )
+        mkdir_cmd, add_cmd = self._build_create_cmds(
+            account_info, account_name, bucket_name, config_root, **kwargs
+        )
+        if mkdir_cmd:
+            await executor.run(mkdir_cmd)
+        self._finish_create(*await executor.run(add_cmd))
+
+    def _build_account_status_cmd(self, account_name, config_root):
         log.info("Gather user info before creating bucket")
-        cmd = f"{self.base_cmd} account status --config_root {config_root} --name {account_name} {self.unwanted_log}"
-        retcode, stdout, stderr = self.conn.exec_cmd(cmd)
+        return f"{self.base_cmd} account status --config_root {config_root} --name {account_name} {self.unwanted_log}"
+
+    def _parse_account_info(self, config_root, retcode, stdout, stderr):
         if retcode != 0:
             raise e.AccountStatusFailed(f"Failed to get status of account {stderr}")
         log.info(stdout)
-        account_info = json.loads(stdout)
-        account_owner = account_info["response"]["reply"]["name"]
+        account_info = json.loads(stdout)["response"]["reply"]
+        account_cache.put(config_root, account_info)
+        return account_info
+
+    def _build_create_cmds(
+        self, account_info, account_name, bucket_name, config_root, **kwargs
+    ):
+        """
+        Build the commands that create a bucket for an account
+
+        Returns:
+            tuple: The command that creates the custom bucket path or None,
+                   and the command that adds the bucket
+        """
+        account_owner = account_info["name"]
         extra_param = ""
-        if "custom_path" in kwargs:
+        mkdir_cmd = None
+        if "path" in kwargs:
+            bucket_path = kwargs["path"]
+            mkdir_cmd = f"sudo mkdir -p {bucket_path}"
+        elif "custom_path" in kwargs:
             hd = get_noobaa_sa_host_home_path()
             bucket_path = os.path.join(hd, f"fs_{account_name}_{bucket_name}")
-            cmd = f"sudo mkdir {bucket_path}"
-            self.conn.exec_cmd(cmd)
+            mkdir_cmd = f"sudo mkdir {bucket_path}"
         else:
-            bucket_path = account_info["response"]["reply"]["nsfs_account_config"][
-                "new_buckets_path"
-            ]
+            bucket_path = account_info["nsfs_account_config"]["new_buckets_path"]
         if "custom_fs_backend" in kwargs:
             extra_param = f"--fs_backend={kwargs.get('custom_fs_backend')} "
-        cmd = f"{self.base_cmd} bucket add --config_root {config_root} --name {bucket_name} --owner {account_owner} --path {bucket_path} {extra_param} {self.unwanted_log}"
-        retcode, stdout, stderr = self.conn.exec_cmd(cmd)
+        add_cmd = f"{self.base_cmd} bucket add --config_root {config_root} --name {bucket_name} --owner {account_owner} --path {bucket_path} {extra_param} {self.unwanted_log}"
+        return mkdir_cmd, add_cmd
+
+    def _finish_create(self, retcode, stdout, stderr):
         if retcode != 0:
             raise e.BucketCreationFailed(f"Failed to create bucket {stderr}")
         log.info("Bucket created successfully")
@@ -78,19 +167,56 @@ class BucketManager:
         Returns:
             list(str|dict): List of bucket names or dictionaries of bucket metadata if use_wide is True
         """
+        bucket_ls = list(self.iter_list(use_wide=use_wide, config_root=config_root))
+        log.info(bucket_ls)
+        return bucket_ls
+
+    def iter_list(self, use_wide=False, config_root=None):
+        """
+        Lists Buckets while the output of the CLI is still being received
+
+        The reply of the CLI is parsed incrementally, so the buckets can be
+        processed in bounded memory before the listing completes.
+
+        Args:
+            use_wide (bool): Get more information about the buckets
+            config_root (str): Path to config root
+
+        Yields:
+            str|dict: Bucket names or dictionaries of bucket metadata if use_wide is True
+
+        Raises:
+            BucketListFailed: If the listing failed
+        """
         if config_root is None:
             config_root = self.config_root
         log.info("Listing available buckets")
         cmd = f"{self.base_cmd} bucket list --config_root {config_root}"
         cmd += " --wide" if use_wide else ""
-        retcode, stdout, stderr = self.conn.exec_cmd(cmd)
-        if retcode != 0:
-            raise e.BucketListFailed(f"Listing of buckets failed with error {stderr}")
-        bucket_ls = json.loads(stdout)
-        bucket_ls = bucket_ls["response"]["reply"]
-        bucket_ls = bucket_ls if use_wide else [item["name"] for item in bucket_ls]
-        log.info(bucket_ls)
-        return bucket_ls
+        try:
+            for item in iter_json_array_items(exec_cmd_stream(cmd, conn=self.conn)):
+                yield item if use_wide else item["name"]
+        except (e.UnexpectedBehaviour, ValueError) as err:
+            raise e.BucketListFailed(f"Listing of buckets failed with error {err}")
+
+    def list_records(self, config_root=None):
+        """
+        Lists Buckets into compact records, indexed by name
+
+        Args:
+            config_root (str): Path to config root
+
+        Returns:
+            RecordListing: A BucketRecord per bucket, which can be looked up
+                           by "owner", "owner_name" or "path" with find()
+
+        Raises:
+            BucketListFailed: If the listing failed
+        """
+        return RecordListing(
+            BucketRecord.from_dict(bucket)
+            for bucket in self.iter_list(use_wide=True, config_root=config_root)
+        )
 
     def delete(
         self,
@@ -105,11 +231,34 @@ class BucketManager:
             bucket_name (str): Bucket to be deleted
             config_root (str): Path to config root
         """
+        self._finish_delete(
+            *self.conn.exec_cmd(self._build_delete_cmd(bucket_name, config_root))
+        )
+
+    async def delete_async(
+        self, bucket_name, config_root=None, force=False, executor=None
+    ):
+        """
+        Bucket Deletion that can overlap with other async operations
+
+        Args:
+            bucket_name (str): Bucket to be deleted
+            config_root (str): Path to config root
+            executor (AsyncRemoteExecutor): The executor to run the deletion on.
+                                            Defaults to the shared executor.
+        """
+        executor = executor or get_default_executor()
+        self._finish_delete(
+            *await executor.run(self._build_delete_cmd(bucket_name, config_root))
+        )
+
+    def _build_delete_cmd(self, bucket_name, config_root):
         if config_root is None:
             config_root = self.config_root
         log.info(f"Deleting {bucket_name} Bucket from NSFS")
-        cmd = f"{self.base_cmd} bucket delete --name {bucket_name} --config_root {config_root} --force"
-        retcode, stdout, stderr = self.conn.exec_cmd(cmd)
+        return f"{self.base_cmd} bucket delete --name {bucket_name} --config_root {config_root} --force"
+
+    def _finish_delete(self, retcode, stdout, stderr):
         if retcode != 0:
             raise e.BucketDeletionFailed(f"Deleting bucket failed with error {stderr}")
         log.info(stdout)
@@ -136,13 +285,8 @@ class BucketManager:
         if config_root is None:
             config_root = self.config_root
         self.update_data = kwargs
-        update_cmd = ""
-        if "new_name" in self.update_data:
-            update_cmd = update_cmd + f"--new_name {self.update_data.get('new_name')} "
-        if "path" in self.update_data:
-            update_cmd = update_cmd + f"--path {self.update_data.get('path')} "
         log.info(f'Updating the bucket "{bucket_name}"')
-        cmd = f"{self.base_cmd} bucket update --name {bucket_name} {update_cmd} --config_root {config_root} {self.unwanted_log}"
+        cmd = self._build_update_cmd(bucket_name, config_root, **kwargs)
         retcode, stdout, stderr = self.conn.exec_cmd(cmd)
         if retcode != 0:
             raise e.BucketUpdateFailed(
@@ -154,6 +298,211 @@ class BucketManager:
         # TODO: Implement --fs_backend update operation
         # TODO: Implement --email update operation
 
+    def _build_update_cmd(self, bucket_name, config_root, **kwargs):
+        update_cmd = ""
+        if "new_name" in kwargs:
+            update_cmd = update_cmd + f"--new_name {kwargs.get('new_name')} "
+        if "path" in kwargs:
+            update_cmd = update_cmd + f"--path {kwargs.get('path')} "
+        return f"{self.base_cmd} bucket update --name {bucket_name} {update_cmd} --config_root {config_root} {self.unwanted_log}"
+
+    def create_many(
+        self, specs, config_root=None, parallelism=None, single_process=False
+    ):
+        """
+        Create many buckets in bulk
+
+        The owners that aren't in the account cache are looked up in one
+        batch, and the buckets are then created in one batched invocation
+        that runs up to `parallelism` noobaa-cli processes at once, or all
+        the noobaa-cli operations in one Node.js process if `single_process`.
+
+        Args:
+            specs (list): A dict per bucket with the keys "bucket_name" and
+                          "account_name" of the owner, and optionally the
+                          create kwargs: "path" for an explicit bucket path,
+                          "custom_path" or "custom_fs_backend"
+            config_root (str): Path to config root
+            parallelism (int): The maximum number of buckets to create at once.
+                               Defaults to the number of CPUs of the host.
+            single_process (bool): Whether to run the noobaa-cli operations one
+                                   after the other in a single Node.js process
+                                   instead of a process per bucket
+
+        Returns:
+            list: A dict per bucket, in the order of the specs, with the keys:
+                  - "bucket_name" (str)
+                  - "success" (bool): Whether the bucket was created
+                  - "error" (str): The error output if the creation failed
+                  - "duration" (float|None): The remote creation time in seconds
+
+        Example usage:
+            specs = [
+                {"bucket_name": f"bucket-{i}", "account_name": account_name}
+                for i in range(10000)
+            ]
+            results = bucket_manager.create_many(specs)
+        """
+        if config_root is None:
+            config_root = self.config_root
+        owners, owner_errors = self._get_owners_info(
+            {spec["account_name"] for spec in specs}, config_root
+        )
+        add_cmds = []
+        mkdir_batch = RemoteBatch(self.conn)
+        for spec in specs:
+            if spec["account_name"] in owner_errors:
+                continue
+            kwargs = {
+                key: value
+                for key, value in spec.items()
+                if key not in ("bucket_name", "account_name")
+            }
+            mkdir_cmd, add_cmd = self._build_create_cmds(
+                owners[spec["account_name"]],
+                spec["account_name"],
+                spec["bucket_name"],
+                config_root,
+                **kwargs,
+            )
+            if mkdir_cmd and single_process:
+                # The runner only runs noobaa-cli, so the bucket paths are made upfront
+                mkdir_batch.add(mkdir_cmd, name=spec["bucket_name"])
+            elif mkdir_cmd:
+                add_cmd = f"{mkdir_cmd} && {add_cmd}"
+            add_cmds.append((spec["bucket_name"], add_cmd))
+        # The buckets whose path couldn't be made aren't added
+        mkdir_failures = {
+            result.name: result.stdout or result.stderr
+            for result in mkdir_batch.run(parallelism=parallelism or 4)
+            if result.retcode != 0
+        }
+        batch = NoobaaCliBatch(self.conn) if single_process else RemoteBatch(self.conn)
+        for bucket_name, add_cmd in add_cmds:
+            if bucket_name not in mkdir_failures:
+                batch.add(add_cmd, name=bucket_name)
+        log.info(f"Creating {len(batch)} buckets")
+        results = self._run_bulk(batch, parallelism, single_process)
+        errors = dict(mkdir_failures)
+        for spec in specs:
+            if spec["account_name"] in owner_errors:
+                errors[spec["bucket_name"]] = owner_errors[spec["account_name"]]
+        for bucket_name, error in errors.items():
+            results[bucket_name] = {
+                "bucket_name": bucket_name,
+                "success": False,
+                "error": error,
+                "duration": None,
+            }
+        created = sum(result["success"] for result in results.values())
+        log.info(f"Created {created}/{len(specs)} buckets")
+        return [results[spec["bucket_name"]] for spec in specs]
+
+    def update_many(
+        self, updates, config_root=None, parallelism=None, single_process=False
+    ):
+        """
+        Update many buckets in bulk
+
+        Args:
+            updates (list): A dict per bucket with the key "bucket_name" and
+                            the update kwargs, e.g. "new_name" or "path"
+            config_root (str): Path to config root
+            parallelism (int): The maximum number of buckets to update at once.
+                               Defaults to the number of CPUs of the host.
+            single_process (bool): Whether to run the updates one after the
+                                   other in a single Node.js process
+
+        Returns:
+            list: A dict per bucket, in the order of the updates, with the keys
+                  "bucket_name", "success", "error" and "duration", see create_many
+
+        Example usage:
+            bucket_manager.update_many(
+                [{"bucket_name": name, "new_name": f"{name}-renamed"} for name in names]
+            )
+        """
+        if config_root is None:
+            config_root = self.config_root
+        batch = NoobaaCliBatch(self.conn) if single_process else RemoteBatch(self.conn)
+        for update in updates:
+            kwargs = {
+                key: value for key, value in update.items() if key != "bucket_name"
+            }
+            batch.add(
+                self._build_update_cmd(update["bucket_name"], config_root, **kwargs),
+                name=update["bucket_name"],
+            )
+        log.info(f"Updating {len(updates)} buckets")
+        results = self._run_bulk(batch, parallelism, single_process)
+        updated = sum(result["success"] for result in results.values())
+        log.info(f"Updated {updated}/{len(updates)} buckets")
+        return [results[update["bucket_name"]] for update in updates]
+
+    def _get_owners_info(self, account_names, config_root):
+        """
+        Get the config data of bucket owners, looking up the uncached ones in one batch
+
+        Returns:
+            tuple: The account names mapped to their config data, and the
+                   names of the accounts that couldn't be looked up mapped
+                   to the error
+        """
+        owners = {}
+        missing = []
+        for account_name in account_names:
+            account_info = account_cache.get_by_name(account_name, config_root)
+            if account_info is None:
+                missing.append(account_name)
+            else:
+                owners[account_name] = account_info
+        errors = {}
+        if missing:
+            batch = RemoteBatch(self.conn)
+            for account_name in missing:
+                batch.add(
+                    self._build_account_status_cmd(account_name, config_root),
+                    name=account_name,
+                )
+            for result in batch.run():
+                try:
+                    owners[result.name] = self._parse_account_info(
+                        config_root, result.retcode, result.stdout, result.stderr
+                    )
+                except (e.AccountStatusFailed, ValueError, KeyError) as err:
+                    errors[result.name] = str(err)
+        return owners, errors
+
+    def _run_bulk(self, batch, parallelism, single_process=False):
+        """
+        Run a batch of per bucket commands
+
+        Returns:
+            dict: The bucket names mapped to their result dicts, see create_many
+        """
+        if not len(batch):
+            return {}
+        if single_process:
+            # The operations of the single process run one after the other
+            batch_results = batch.run()
+        else:
+            if parallelism is None:
+                parallelism = get_host_facts(self.conn)["cpu_count"] or 4
+            batch_results = batch.run(parallelism=parallelism)
+        results = {}
+        for batch_result in batch_results:
+            success = batch_result.retcode == 0
+            error = ""
+            if not success:
+                error = batch_result.stdout or batch_result.stderr
+            results[batch_result.name] = {
+                "bucket_name": batch_result.name,
+                "success": success,
+                "error": error,
+                "duration": batch_result.duration,
+            }
+        return results
+
     def status(self, bucket_name, config_root=None):
         """
         Bucket status
@@ -176,3 +525,79 @@ class BucketManager:
             )
         log.info(stdout)
         return json.loads(stdout)
+
+    def seed_many(
+        self, account_name, n, config_root=None, name_prefix="bucket", sample_size=5
+    ):
+        """
+        Create many buckets by writing their config files directly
+
+        Meant for setting up large scale benchmarks only. A single exemplar
+        bucket is created through the CLI and cloned under new names, so all
+        the buckets share the owner and path of the exemplar. The clones are
+        written into the config root in bulk, and a random sample of them is
+        verified through `bucket status`.
+
+        Args:
+            account_name (str): The owner of the buckets
+            n (int): The number of buckets to create, besides the exemplar
+            config_root (str): Path to config root
+            name_prefix (str): The prefix of the generated bucket names
+            sample_size (int): The number of buckets to verify
+
+        Returns:
+            list: The names of the buckets
+
+        Raises:
+            BucketCreationFailed: If the buckets couldn't be written, or a
+                                  sampled bucket doesn't match its config
+        """
+        if config_root is None:
+            config_root = self.config_root
+        full_config_root = get_config_root_full_path(config_root)
+        exemplar_name = generate_unique_resource_name(prefix=name_prefix)
+        self.create(account_name, exemplar_name, config_root=config_root)
+        exemplar = read_config_file(
+            self.conn, f"{full_config_root}/buckets/{exemplar_name}.json"
+        )
+
+        bucket_names = []
+        files = {}
+        used_names = {exemplar_name}
+        while len(bucket_names) < n:
+            bucket_name = generate_unique_resource_name(prefix=name_prefix)
+            if bucket_name in used_names:
+                continue
+            used_names.add(bucket_name)
+            _, bucket_files = clone_bucket(exemplar, bucket_name)
+            files.update(bucket_files)
+            bucket_names.append(bucket_name)
+        try:
+            seed_entries(self.conn, full_config_root, files)
+        except e.UnexpectedBehaviour as err:
+            raise e.BucketCreationFailed(f"Seeding buckets failed: {err}")
+        self.buckets_seeded.setdefault(config_root, []).extend(files)
+
+        for bucket_name in random.sample(bucket_names, min(sample_size, n)):
+            status = self.status(bucket_name, config_root)
+            if status["response"]["reply"]["name"] != bucket_name:
+                raise e.BucketCreationFailed(
+                    f"The seeded bucket {bucket_name} doesn't match its config: {status}"
+                )
+        log.info(f"Seeded {n} buckets into {config_root}")
+        return bucket_names
+
+    def delete_seeded(self, config_root=None):
+        """
+        Delete the buckets that were seeded into a config root
+
+        Args:
+            config_root (str): Path to config root. Defaults to all the
+                               config roots that were seeded.
+        """
+        config_roots = [config_root] if config_root else list(self.buckets_seeded)
+        for root in config_roots:
+            paths = self.buckets_seeded.pop(root, [])
+            if paths:
+                log.info(f"Deleting {len(paths)} seeded bucket entries")
+                remove_entries(self.conn, get_config_root_full_path(root), paths)
@@ -0,0 +1,258 @@
+"""
+Module to seed NooBaa config_root entries by writing the config files directly
+
+This bypasses noobaa-cli, which costs a Node.js process start per entity,
+and is meant for setting up large scale benchmarks only. The entries are
+cloned from an exemplar created through noobaa-cli, so they match the config
+format of the installed NooBaa version.
+"""
+
+import copy
+import json
+import logging
+import os
+import random
+import shlex
+import time
+from datetime import datetime, timezone
+
+from common_ci_utils.random_utils import generate_unique_resource_name
+
+from framework.remote_batch import RemoteBatch
+from noobaa_sa.exceptions import UnexpectedBehaviour
+from utility.utils import get_noobaa_sa_host_home_path
+
+log = logging.getLogger(__name__)
+
+# The layout of NooBaa 5.17 and above, keyed by account id
+IDENTITIES_LAYOUT = "identities"
+# The layout of older NooBaa versions, keyed by account name
+ACCOUNTS_LAYOUT = "accounts"
+
+# The number of entities shipped in a single archive
+SEED_CHUNK_SIZE = 5000
+
+
+def get_config_root_full_path(config_root):
+    """
+    Expand a config root under the home directory of the NooBaa host
+
+    Args:
+        config_root (str): The config root, possibly starting with "~/"
+
+    Returns:
+        str: The full path of the config root
+
+    """
+    if config_root.startswith("~/"):
+        return f"{get_noobaa_sa_host_home_path()}/{config_root[2:]}"
+    return config_root
+
+
+def detect_layout(conn, config_root):
+    """
+    Detect the layout of the account entries of a config root
+
+    Args:
+        conn (Connection): The connection to the NooBaa host
+        config_root (str): The full path of the config root
+
+    Returns:
+        str: IDENTITIES_LAYOUT or ACCOUNTS_LAYOUT
+
+    """
+    retcode, _, _ = conn.exec_cmd(f"sudo test -d {config_root}/identities")
+    layout = IDENTITIES_LAYOUT if retcode == 0 else ACCOUNTS_LAYOUT
+    log.info(f"The config root {config_root} uses the {layout} layout")
+    return layout
+
+
+def read_config_file(conn, path):
+    """
+    Read a JSON config file of the config root
+
+    Args:
+        conn (Connection): The connection to the NooBaa host
+        path (str): The full path of the file. Symbolic links are followed.
+
+    Returns:
+        dict: The content of the file
+
+    Raises:
+        UnexpectedBehaviour: If the file couldn't be read
+
+    """
+    retcode, stdout, stderr = conn.exec_cmd(f"sudo cat {path}")
+    if retcode != 0:
+        raise UnexpectedBehaviour(f"Failed to read {path}: {stderr}")
+    return json.loads(stdout)
+
+
+def generate_object_id():
+    """
+    Generate an id in the format of the ids NooBaa assigns to config entries
+
+    Returns:
+        str: 24 hex digits, starting with the current timestamp
+
+    """
+    return f"{int(time.time()):08x}{random.getrandbits(64):016x}"
+
+
+def get_creation_date():
+    """
+    Returns:
+        str: The current time in the format of the creation_date of config entries
+
+    """
+    now = datetime.now(timezone.utc)
+    return now.strftime("%Y-%m-%dT%H:%M:%S.") + f"{now.microsecond // 1000:03d}Z"
+
+
+def clone_account(exemplar, account_name, access_key, layout):
+    """
+    Clone the config of an account under a new name and access key
+
+    The clone keeps the encrypted secret key, the uid/gid and the
+    new_buckets_path of the exemplar.
+
+    Args:
+        exemplar (dict): The config of an account created through noobaa-cli
+        account_name (str): The name of the clone
+        access_key (str): The access key of the clone
+        layout (str): The layout of the config root, see detect_layout
+
+    Returns:
+        tuple: The config of the clone, and a dict of its files and a dict of
+               its symbolic links, with paths relative to the config root
+
+    """
+    account = copy.deepcopy(exemplar)
+    account["_id"] = generate_object_id()
+    account["name"] = account_name
+    if "email" in account:
+        account["email"] = account_name
+    account["creation_date"] = get_creation_date()
+    account["access_keys"][0]["access_key"] = access_key
+    content = json.dumps(account)
+    if layout == IDENTITIES_LAYOUT:
+        identity_path = f"identities/{account['_id']}/identity.json"
+        files = {identity_path: content}
+        symlinks = {
+            f"accounts_by_name/{account_name}.symlink": f"../{identity_path}",
+            f"access_keys/{access_key}.symlink": f"../{identity_path}",
+        }
+    else:
+        account_path = f"accounts/{account_name}.json"
+        files = {account_path: content}
+        symlinks = {f"access_keys/{access_key}.symlink": f"../{account_path}"}
+    return account, files, symlinks
+
+
+def clone_bucket(exemplar, bucket_name):
+    """
+    Clone the config of a bucket under a new name
+
+    The clone keeps the owner and the path of the exemplar.
+
+    Args:
+        exemplar (dict): The config of a bucket created through noobaa-cli
+        bucket_name (str): The name of the clone
+
+    Returns:
+        tuple: The config of the clone, and a dict of its files with paths
+               relative to the config root
+
+    """
+    bucket = copy.deepcopy(exemplar)
+    bucket["_id"] = generate_object_id()
+    bucket["name"] = bucket_name
+    bucket["creation_date"] = get_creation_date()
+    return bucket, {f"buckets/{bucket_name}.json": json.dumps(bucket)}
+
+
+def seed_entries(conn, config_root, files, symlinks=None, subdirs=None):
+    """
+    Write config entries into a config root in bulk
+
+    The entries are extracted into a staging directory on the same filesystem
+    as the config root and then moved into place. Each move is a rename, so
+    NooBaa never sees a partially written file, and the files are moved in
+    before the symbolic links that point at them. The files are made
+    readable by root only, as noobaa-cli does, since they hold secrets.
+
+    Args:
+        conn (Connection): The connection to the NooBaa host
+        config_root (str): The full path of the config root
+        files (dict): Paths relative to the config root mapped to their content
+        symlinks (dict): Paths relative to the config root mapped to the
+                         targets of symbolic links
+        subdirs (list): The top directories of the entries, in the order to
+                        move them in. Defaults to the order they appear in.
+
+    Raises:
+        UnexpectedBehaviour: If the entries couldn't be written
+
+    """
+    symlinks = symlinks or {}
+    if subdirs is None:
+        subdirs = list(
+            dict.fromkeys(path.split("/")[0] for path in [*files, *symlinks])
+        )
+    staging_dir = os.path.join(
+        config_root, f".{generate_unique_resource_name(prefix='seed')}"
+    )
+    log.info(f"Seeding {len(files)} files into {config_root} through {staging_dir}")
+
+    batch = RemoteBatch(conn)
+    file_items = list(files.items())
+    for start in range(0, len(file_items), SEED_CHUNK_SIZE):
+        batch.add_archive(
+            staging_dir, dict(file_items[start : start + SEED_CHUNK_SIZE])
+        )
+    symlink_items = list(symlinks.items())
+    for start in range(0, len(symlink_items), SEED_CHUNK_SIZE):
+        batch.add_archive(
+            staging_dir,
+            {},
+            symlinks=dict(symlink_items[start : start + SEED_CHUNK_SIZE]),
+        )
+    if files:
+        batch.add(f"sudo find {staging_dir} -type f -exec chmod 600 {{}} +")
+    for subdir in subdirs:
+        batch.add(
+            f"sudo mkdir -p {config_root}/{subdir} && "
+            f"sudo find {staging_dir}/{subdir} -mindepth 1 -maxdepth 1 "
+            f"-exec mv -t {config_root}/{subdir} {{}} +"
+        )
+    try:
+        results = batch.run(stop_on_failure=True)
+    finally:
+        conn.exec_cmd(f"sudo rm -rf {staging_dir}")
+    for result in results:
+        if result.retcode != 0:
+            raise UnexpectedBehaviour(
+                f"Seeding {config_root} failed with error {result.stderr}"
+            )
+
+
+def remove_entries(conn, config_root, paths):
+    """
+    Remove seeded config entries in bulk
+
+    Args:
+        conn (Connection): The connection to the NooBaa host
+        config_root (str): The full path of the config root
+        paths (list): The paths of the entries, relative to the config root
+
+    """
+    manifest_path = f"/tmp/{generate_unique_resource_name(prefix='seed')}.manifest"
+    batch = RemoteBatch(conn)
+    batch.add_file(manifest_path, "\n".join(paths) + "\n", mode="600")
+    # The config root is only accessible by root, so the cd needs sudo as well
+    remove_cmd = f"cd {config_root} && xargs -a {manifest_path} rm -rf --"
+    batch.add(f"sudo sh -c {shlex.quote(remove_cmd)}")
+    batch.add(f"sudo rm -f {manifest_path}")
+    results = batch.run()
+    if results[1].retcode != 0:
+        log.warning(f"Failed to remove seeded entries: {results[1].stderr}")
@@ -0,0 +1,239 @@
+"""
+Module to snapshot the config root and the bucket paths, to detect leaked resources
+"""
+
+import logging
+from collections import namedtuple
+
+from framework.ssh_connection_manager import SSHConnectionManager
+from noobaa_sa.exceptions import UnexpectedBehaviour
+from utility.utils import get_env_config_root_full_path, get_noobaa_sa_host_home_path
+
+log = logging.getLogger(__name__)
+
+SNAPSHOT_SECTION_MARKER = "@@NB_SNAPSHOT@@"
+
+# The config root directories that have an entry per resource, in both the
+# identities and the older accounts layouts
+_RESOURCE_DIRS = {
+    "accounts": "accounts",
+    "accounts_by_name": "accounts",
+    "buckets": "buckets",
+    "access_keys": "access_keys",
+}
+
+SnapshotEntry = namedtuple("SnapshotEntry", ["type", "size", "mtime", "sha256"])
+SnapshotEntry.__doc__ = """
+A file or directory captured in a snapshot
+
+Attributes:
+    type (str): The find type letter, e.g. "f", "d" or "l"
+    size (int): The size in bytes
+    mtime (float): The modification time
+    sha256 (str|None): The hash of the content, for the JSON config files only
+"""
+
+
+class ConfigSnapshot:
+    """
+    The state of a config root and of the bucket paths at a point in time
+
+    A snapshot is taken in a single remote command. It records the name,
+    size and mtime of every entry of the config root and of the fs_* bucket
+    path directories under the home dir, and the hash of every JSON config
+    file.
+
+    Example usage:
+        before = ConfigSnapshot.take()
+        ...
+        diff = ConfigSnapshot.take().diff(before)
+        leaked = diff.created_resources()
+
+    """
+
+    def __init__(self, config_entries, bucket_path_entries):
+        """
+        Args:
+            config_entries (dict): Paths relative to the config root mapped
+                                   to their SnapshotEntry
+            bucket_path_entries (dict): Paths relative to the home dir mapped
+                                        to their SnapshotEntry
+
+        """
+        self.config_entries = config_entries
+        self.bucket_path_entries = bucket_path_entries
+
+    @classmethod
+    def take(cls, config_root=None, bucket_paths_dir=None, conn=None):
+        """
+        Take a snapshot of the config root and the bucket paths
+
+        Args:
+            config_root (str): The full path of the config root.
+                               Defaults to the config root of ENV_DATA.
+            bucket_paths_dir (str): The directory of the fs_* bucket paths.
+                                    Defaults to the home dir of the NooBaa host.
+            conn (Connection): The connection to the NooBaa host
+
+        Returns:
+            ConfigSnapshot: The snapshot
+
+        Raises:
+            UnexpectedBehaviour: If the snapshot command failed
+
+        """
+        config_root = config_root or get_env_config_root_full_path()
+        bucket_paths_dir = bucket_paths_dir or get_noobaa_sa_host_home_path()
+        conn = conn or SSHConnectionManager().connection
+        marker = SNAPSHOT_SECTION_MARKER
+        cmd = (
+            f"echo {marker}; "
+            f"sudo find {config_root} -mindepth 1 -printf '%P\\t%y\\t%s\\t%T@\\n'; "
+            f"echo {marker}; "
+            f"sudo find {config_root} -type f -name '*.json' -exec sha256sum {{}} +; "
+            f"echo {marker}; "
+            f"sudo find {bucket_paths_dir} -mindepth 1 -maxdepth 2 "
+            f"-path '{bucket_paths_dir}/fs_*' -printf '%P\\t%y\\t%s\\t%T@\\n'"
+        )
+        retcode, stdout, stderr = conn.exec_cmd(cmd)
+        sections = stdout.split(marker)
+        if retcode != 0 or len(sections) != 4:
+            raise UnexpectedBehaviour(
+                f"Taking a snapshot of {config_root} failed with error {stderr}"
+            )
+        _, config_listing, hashes, bucket_paths_listing = sections
+
+        config_hashes = {}
+        prefix = f"{config_root.rstrip('/')}/"
+        for line in hashes.splitlines():
+            sha256, _, path = line.partition("  ")
+            config_hashes[path[len(prefix) :]] = sha256
+        return cls(
+            _parse_listing(config_listing, config_hashes),
+            _parse_listing(bucket_paths_listing),
+        )
+
+    def diff(self, before):
+        """
+        Compare the snapshot to an earlier one
+
+        Args:
+            before (ConfigSnapshot): The earlier snapshot
+
+        Returns:
+            SnapshotDiff: The changes since the earlier snapshot
+
+        """
+        created, modified, deleted = _diff_entries(
+            before.config_entries, self.config_entries
+        )
+        created_paths, modified_paths, deleted_paths = _diff_entries(
+            before.bucket_path_entries, self.bucket_path_entries
+        )
+        return SnapshotDiff(
+            created, modified, deleted, created_paths, modified_paths, deleted_paths
+        )
+
+
+class SnapshotDiff(
+    namedtuple(
+        "SnapshotDiff",
+        [
+            "created",
+            "modified",
+            "deleted",
+            "created_bucket_paths",
+            "modified_bucket_paths",
+            "deleted_bucket_paths",
+        ],
+    )
+):
+    """
+    The changes between two snapshots
+
+    Attributes:
+        created (list): The config root paths that were created
+        modified (list): The config root paths whose content changed
+        deleted (list): The config root paths that were deleted
+        created_bucket_paths (list): The bucket paths that were created
+        modified_bucket_paths (list): The bucket paths that were modified
+        deleted_bucket_paths (list): The bucket paths that were deleted
+
+    """
+
+    __slots__ = ()
+
+    def __bool__(self):
+        return any(self)
+
+    def created_resources(self):
+        """
+        Get the resources that were created, which are leaked if the second
+        snapshot was taken after the cleanup
+
+        Returns:
+            dict: The names of the "accounts", "buckets", "access_keys" and
+                  "bucket_paths" that were created
+
+        """
+        resources = {
+            "accounts": [],
+            "buckets": [],
+            "access_keys": [],
+            "bucket_paths": [
+                path for path in self.created_bucket_paths if "/" not in path
+            ],
+        }
+        for path in self.created:
+            parts = path.split("/")
+            if len(parts) != 2:
+                continue
+            kind = _RESOURCE_DIRS.get(parts[0])
+            if kind:
+                resources[kind].append(parts[1].rsplit(".", 1)[0])
+        return resources
+
+    def format(self):
+        """
+        Returns:
+            str: A readable summary of the changes
+
+        """
+        lines = []
+        for field in self._fields:
+            paths = getattr(self, field)
+            if paths:
+                lines.append(f"{field} ({len(paths)}):")
+                lines.extend(f"    {path}" for path in paths)
+        return "\n".join(lines)
+
+
+def _parse_listing(listing, hashes=None):
+    entries = {}
+    for line in listing.splitlines():
+        fields = line.split("\t")
+        if len(fields) != 4:
+            continue
+        path, entry_type, size, mtime = fields
+        entries[path] = SnapshotEntry(
+            entry_type, int(size), float(mtime), (hashes or {}).get(path)
+        )
+    return entries
+
+
+def _diff_entries(before, after):
+    created = sorted(set(after) - set(before))
+    deleted = sorted(set(before) - set(after))
+    modified = []
+    for path in sorted(set(before) & set(after)):
+        old, new = before[path], after[path]
+        if old.type == "d":
+            # A directory's mtime changes with its content, which is diffed anyway
+            continue
+        if old.sha256 is not None and new.sha256 is not None:
+            changed = old.sha256 != new.sha256
+        else:
+            changed = (old.size, old.mtime) != (new.size, new.mtime)
+        if changed:
+            modified.append(path)
+    return created, modified, deleted
@@ -10,6 +10,7 @@ DEFAULT_FS_BACKEND = "GPFS"
 UNWANTED_LOG = "2>/dev/null"
 DEFAULT_NSFS_PORT = 6443
 DEFAULT_CONFIG_ROOT_PATH = "/etc/noobaa.conf.d"
+NSFS_LOG_PATH = "/var/log/noobaa.log"
 EXPECTED_ACCESS_KEY_LEN = 20
 EXPECTED_SECRET_KEY_LEN = 40
 
@@ -33,3 +34,13 @@ OBJECT_OPERATIONS = [
     "HeadObject",
     "CopyObject",
 ]
+
+# S3 transfer profiles - whether the SigV4 signature covers the payload hash,
+# and which flexible checksum algorithm (if any) is sent along with the payload
+S3_TRANSFER_PROFILES = {
+    "signed": {"payload_signing_enabled": True, "checksum_algorithm": None},
+    "unsigned": {"payload_signing_enabled": False, "checksum_algorithm": None},
+    "crc32": {"payload_signing_enabled": False, "checksum_algorithm": "CRC32"},
+    "crc32c": {"payload_signing_enabled": False, "checksum_algorithm": "CRC32C"},
+    "sha256": {"payload_signing_enabled": False, "checksum_algorithm": "SHA256"},
+}
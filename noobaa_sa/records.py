@@ -0,0 +1,179 @@
+"""
+Module which contain compact records of listed buckets and accounts
+"""
+
+import sys
+from collections import defaultdict
+
+
+def _intern(value):
+    # Owners, paths and backends repeat across many records
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+class BucketRecord:
+    """
+    The fields of a bucket from a wide bucket listing
+
+    Attributes:
+        name (str): The bucket name
+        owner (str): The _id of the owner account, or its name in versions
+                     that only record the owner by name
+        owner_name (str): The name of the owner account, if recorded
+        path (str): The bucket path
+        fs_backend (str): The filesystem backend, if set
+        creation_date (str): The creation date
+
+    """
+
+    __slots__ = ("name", "owner", "owner_name", "path", "fs_backend", "creation_date")
+
+    def __init__(self, name, owner, owner_name, path, fs_backend, creation_date):
+        self.name = name
+        self.owner = _intern(owner)
+        self.owner_name = _intern(owner_name)
+        self.path = _intern(path)
+        self.fs_backend = _intern(fs_backend)
+        self.creation_date = creation_date
+
+    @classmethod
+    def from_dict(cls, bucket):
+        """
+        Args:
+            bucket (dict): A bucket of the wide listing
+
+        Returns:
+            BucketRecord: The record of the bucket
+
+        """
+        return cls(
+            bucket["name"],
+            bucket.get("owner_account") or bucket.get("bucket_owner"),
+            bucket.get("bucket_owner"),
+            bucket.get("path"),
+            bucket.get("fs_backend"),
+            bucket.get("creation_date"),
+        )
+
+    def __repr__(self):
+        return (
+            f"BucketRecord(name={self.name!r}, owner={self.owner!r}, "
+            f"path={self.path!r})"
+        )
+
+
+class AccountRecord:
+    """
+    The fields of an account from a wide account listing
+
+    Attributes:
+        name (str): The account name
+        id (str): The _id of the account
+        new_buckets_path (str): The path new buckets are created under
+        fs_backend (str): The filesystem backend, if set
+        creation_date (str): The creation date
+
+    """
+
+    __slots__ = ("name", "id", "new_buckets_path", "fs_backend", "creation_date")
+
+    def __init__(self, name, id, new_buckets_path, fs_backend, creation_date):
+        self.name = name
+        self.id = id
+        self.new_buckets_path = _intern(new_buckets_path)
+        self.fs_backend = _intern(fs_backend)
+        self.creation_date = creation_date
+
+    @classmethod
+    def from_dict(cls, account):
+        """
+        Args:
+            account (dict): An account of the wide listing
+
+        Returns:
+            AccountRecord: The record of the account
+
+        """
+        nsfs_account_config = account.get("nsfs_account_config") or {}
+        return cls(
+            account["name"],
+            account.get("_id"),
+            nsfs_account_config.get("new_buckets_path"),
+            nsfs_account_config.get("fs_backend"),
+            account.get("creation_date"),
+        )
+
+    def __repr__(self):
+        return f"AccountRecord(name={self.name!r}, id={self.id!r})"
+
+
+class RecordListing:
+    """
+    A listing of records, with lookups by name and indexes by other fields
+
+    The records are collected from an iterable, so a listing can be built
+    while the output of the CLI is still being parsed. The index of a field
+    is built on its first lookup.
+
+    Example usage:
+        buckets = bucket_manager.list_records()
+        for bucket in buckets.find("owner", account_id):
+            ...
+
+    """
+
+    def __init__(self, records):
+        """
+        Args:
+            records (iterable): The records, e.g. BucketRecords
+
+        """
+        self._by_name = {record.name: record for record in records}
+        self._indexes = {}
+
+    def __len__(self):
+        return len(self._by_name)
+
+    def __iter__(self):
+        return iter(self._by_name.values())
+
+    def __contains__(self, name):
+        return name in self._by_name
+
+    def names(self):
+        """
+        Returns:
+            list: The names of all the records
+
+        """
+        return list(self._by_name)
+
+    def get(self, name):
+        """
+        Args:
+            name (str): The name of the record
+
+        Returns:
+            The record, or None if there's no record of the name
+
+        """
+        return self._by_name.get(name)
+
+    def find(self, field, value):
+        """
+        Find the records with a field value
+
+        Args:
+            field (str): The field, e.g. "owner" or "path"
+            value: The value to look up
+
+        Returns:
+            list: The records whose field has the value
+
+        """
+        if field not in self._indexes:
+            index = defaultdict(list)
+            for record in self._by_name.values():
+                index[getattr(record, field)].append(record)
+            self._indexes[field] = dict(index)
+        return list(self._indexes[field].get(value, []))
@@ -1,16 +1,23 @@
+import copy
+import hashlib
 import json
 import logging
 import os
 import tempfile
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 
 import boto3
 from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
 from botocore.exceptions import ClientError
 from common_ci_utils.random_utils import (
     generate_random_files,
     generate_unique_resource_name,
 )
 
+from noobaa_sa.constants import S3_TRANSFER_PROFILES
 from noobaa_sa.exceptions import (
     BucketCreationFailed,
     BucketNotEmpty,
@@ -19,6 +26,7 @@ from noobaa_sa.exceptions import (
     NoSuchKey,
     UnexpectedBehaviour,
 )
+from utility.single_flight import SingleFlight
 
 log = logging.getLogger(__name__)
 
@@ -33,11 +41,38 @@ class S3Client:
 
     To use different credentials, instantiate a new S3Client object.
 
+    Uploads via put_object and initiate_upload_part can use a transfer profile
+    (see constants.S3_TRANSFER_PROFILES) that picks between a signed payload,
+    UNSIGNED-PAYLOAD and the flexible checksum algorithms, either per client
+    or per call. The client CPU time spent in each profile is accumulated and
+    can be fetched via get_transfer_cpu_report.
+
+    With coalesce_reads enabled, identical concurrent calls of the read-only
+    methods in COALESCED_METHODS are merged into a single request, and every
+    caller gets its own copy of the response.
+
     """
 
     static_tls_crt_path = ""
 
-    def __init__(self, endpoint, access_key, secret_key, verify_tls=True):
+    COALESCED_METHODS = {
+        "head_bucket",
+        "head_object",
+        "list_buckets",
+        "get_bucket_policy",
+        "get_bucket_versioning",
+        "get_bucket_cors",
+    }
+
+    def __init__(
+        self,
+        endpoint,
+        access_key,
+        secret_key,
+        verify_tls=True,
+        transfer_profile=None,
+        coalesce_reads=False,
+    ):
         """
 
         Args:
@@ -45,12 +80,27 @@ class S3Client:
             access_key (str): The access key of the S3 account
             secret_key (str): The secret key of the S3 account
             verify_tls (bool): Whether to use secure connections via TLS
+            transfer_profile (str): The default transfer profile for uploads.
+                                    If None, the boto3 defaults are used.
+            coalesce_reads (bool): Whether to merge identical concurrent
+                                   read-only requests into one request
+
+        Raises:
+            ValueError: If the transfer profile is not supported
 
         """
+        if transfer_profile is not None and transfer_profile not in S3_TRANSFER_PROFILES:
+            raise ValueError(f"Unsupported transfer profile: {transfer_profile}")
+
         self.endpoint = endpoint
         self._access_key = access_key
         self._secret_key = secret_key
         self.verify_tls = verify_tls
+        self.transfer_profile = transfer_profile
+        self._transfer_clients = {}
+        self._transfer_stats = {}
+        self._transfer_lock = threading.Lock()
+        self._single_flight = SingleFlight() if coalesce_reads else None
 
         # Set the AWS_CA_BUNDLE environment variable in order to
         # include the TLS certificate in the boto3 and AWS CLI calls
@@ -224,6 +274,120 @@ class S3Client:
         log.info(f"Listed objects: {listed_obs}")
         return response_dict if get_response else listed_obs
 
+    def iter_objects(self, bucket_name, prefix="", delimiter="", page_size=1000):
+        """
+        Iterate over all the objects under a prefix using a flat paginated
+        ListObjectsV2 listing
+
+        Unlike list_objects, this method follows the continuation tokens
+        and yields the objects page by page instead of collecting them.
+
+        Args:
+            bucket_name (str): The name of the bucket
+            prefix (str): A prefix where the objects will be listed from
+            delimiter (str): Passed as the listing delimiter if not empty
+            page_size (int): The maximum number of keys per listing page
+
+        Yields:
+            dict: The metadata of each listed object, as it appears under
+                  the "Contents" key of the ListObjectsV2 response
+
+        """
+        log.info(f"Iterating over objects in s3://{bucket_name}/{prefix} via boto3")
+        for page in self._paginate_objects(bucket_name, prefix, delimiter, page_size):
+            yield from page.get("Contents", [])
+
+    def walk(self, bucket_name, prefix="", delimiter="/", concurrency=8):
+        """
+        Iterate over all the objects under a prefix by listing the
+        hierarchy level by level
+
+        Every level is listed with the given delimiter, and the listing of
+        each of its CommonPrefixes is fanned out across a pool of workers.
+        On NSFS this maps to listing many small directories concurrently
+        instead of a single recursive scan of the whole tree.
+
+        Args:
+            bucket_name (str): The name of the bucket
+            prefix (str): The prefix to start walking from
+            delimiter (str): The delimiter that separates the hierarchy levels
+            concurrency (int): The maximum number of concurrent listings
+
+        Yields:
+            dict: The metadata of each listed object, in no particular order
+
+        Raises:
+            UnexpectedBehaviour: If the delimiter is empty
+
+        Example usage:
+            for obj in s3_client.walk("my-bucket", prefix="dir/", concurrency=16):
+                print(obj["Key"], obj["Size"])
+
+        """
+        if not delimiter:
+            raise UnexpectedBehaviour("walk requires a non-empty delimiter")
+
+        log.info(
+            f"Walking s3://{bucket_name}/{prefix} with delimiter '{delimiter}' "
+            f"and concurrency {concurrency} via boto3"
+        )
+
+        def _list_level(level_prefix):
+            objects, sub_prefixes = [], []
+            for page in self._paginate_objects(bucket_name, level_prefix, delimiter):
+                objects.extend(page.get("Contents", []))
+                sub_prefixes.extend(
+                    common_prefix["Prefix"]
+                    for common_prefix in page.get("CommonPrefixes", [])
+                )
+            return objects, sub_prefixes
+
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            pending = {executor.submit(_list_level, prefix)}
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    objects, sub_prefixes = future.result()
+                    pending.update(
+                        executor.submit(_list_level, sub_prefix)
+                        for sub_prefix in sub_prefixes
+                    )
+                    yield from objects
+
+    def _paginate_objects(self, bucket_name, prefix="", delimiter="", page_size=1000):
+        """
+        Iterate over the pages of a ListObjectsV2 listing
+
+        Args:
+            bucket_name (str): The name of the bucket
+            prefix (str): A prefix where the objects will be listed from
+            delimiter (str): Passed as the listing delimiter if not empty
+            page_size (int): The maximum number of keys per listing page
+
+        Yields:
+            dict: The response of each ListObjectsV2 call
+
+        Raises:
+            NoSuchBucket: If the bucket does not exist
+            UnexpectedBehaviour: If any of the listing calls fails
+
+        """
+        list_kwargs = {"Bucket": bucket_name, "Prefix": prefix, "MaxKeys": page_size}
+        if delimiter:
+            list_kwargs["Delimiter"] = delimiter
+        while True:
+            response_dict = self._exec_boto3_method("list_objects_v2", **list_kwargs)
+            if response_dict["Code"] == "NoSuchBucket":
+                raise NoSuchBucket(f"Bucket {bucket_name} does not exist")
+            if response_dict["Code"] != 200:
+                raise UnexpectedBehaviour(
+                    f"Listing s3://{bucket_name}/{prefix} failed: {response_dict}"
+                )
+            yield response_dict
+            if not response_dict.get("IsTruncated"):
+                break
+            list_kwargs["ContinuationToken"] = response_dict["NextContinuationToken"]
+
     def head_object(self, bucket_name, object_key, **kwargs):
         """
         Get the metadata of an object in an S3 bucket using boto3
@@ -246,7 +410,7 @@ class S3Client:
         )
         return response_dict
 
-    def put_object(self, bucket_name, object_key, body):
+    def put_object(self, bucket_name, object_key, body, transfer_profile=None):
         """
         Put an object to an S3 bucket using boto3
 
@@ -254,6 +418,8 @@ class S3Client:
             bucket_name (str): The name of the bucket
             object_key (str): The key of the object
             body (bytes|file-like object): The data to write to the object
+            transfer_profile (str): The transfer profile to use for this call.
+                                    Defaults to the profile of the client.
 
         Returns:
             dict: A dictionary containing the response from the put_object call.
@@ -261,9 +427,23 @@ class S3Client:
 
         """
         log.info(f"Putting object {object_key} in bucket {bucket_name} via boto3")
+        profile, boto3_client, profile_kwargs = self._resolve_transfer_profile(
+            transfer_profile
+        )
+        body_size = self._get_body_size(body)
+        start_cpu_time = time.thread_time()
         response_dict = self._exec_boto3_method(
-            "put_object", Bucket=bucket_name, Key=object_key, Body=body
+            "put_object",
+            boto3_client=boto3_client,
+            Bucket=bucket_name,
+            Key=object_key,
+            Body=body,
+            **profile_kwargs,
         )
+        if response_dict["Code"] == 200:
+            self._record_transfer(
+                profile, body_size, time.thread_time() - start_cpu_time
+            )
         return response_dict
 
     def get_object(self, bucket_name, object_key, **kwargs):
@@ -465,6 +645,47 @@ class S3Client:
             "list_object_versions", Bucket=bucket_name, **kwargs
         )
 
+    def iter_object_versions(self, bucket_name, prefix="", page_size=1000):
+        """
+        Iterate over all the object versions and delete markers under a prefix
+        by following the ListObjectVersions key and version markers
+
+        Args:
+            bucket_name (str): The name of the bucket
+            prefix (str): A prefix where the versions will be listed from
+            page_size (int): The maximum number of keys per listing page
+
+        Yields:
+            tuple:
+                dict: The metadata of a version or a delete marker
+                bool: True if the entry is a delete marker, False otherwise
+
+        Raises:
+            NoSuchBucket: If the bucket does not exist
+            UnexpectedBehaviour: If any of the listing calls fails
+
+        """
+        log.info(
+            f"Iterating over object versions in s3://{bucket_name}/{prefix} via boto3"
+        )
+        list_kwargs = {"Bucket": bucket_name, "Prefix": prefix, "MaxKeys": page_size}
+        while True:
+            response_dict = self._exec_boto3_method("list_object_versions", **list_kwargs)
+            if response_dict["Code"] == "NoSuchBucket":
+                raise NoSuchBucket(f"Bucket {bucket_name} does not exist")
+            if response_dict["Code"] != 200:
+                raise UnexpectedBehaviour(
+                    f"Listing versions of s3://{bucket_name}/{prefix} failed: {response_dict}"
+                )
+            for version in response_dict.get("Versions", []):
+                yield version, False
+            for delete_marker in response_dict.get("DeleteMarkers", []):
+                yield delete_marker, True
+            if not response_dict.get("IsTruncated"):
+                break
+            list_kwargs["KeyMarker"] = response_dict["NextKeyMarker"]
+            list_kwargs["VersionIdMarker"] = response_dict["NextVersionIdMarker"]
+
     def upload_directory(self, local_dir, bucket_name, prefix=""):
         """
         Upload a directory to an S3 bucket using boto3
@@ -525,6 +746,180 @@ class S3Client:
                 ExtraArgs=kwargs,
             )
 
+    def sync(
+        self,
+        local_dir,
+        bucket_name,
+        prefix="",
+        direction="upload",
+        compare="size_mtime",
+        delete=False,
+        concurrency=8,
+        mtime_tolerance=2,
+    ):
+        """
+        Synchronize a local directory and a bucket prefix by transferring
+        only the files that differ between them
+
+        The bucket side is compared against a streamed listing of the prefix,
+        so unchanged data sets cost a single listing instead of a full transfer.
+
+        Args:
+            local_dir (str): The local directory to synchronize
+            bucket_name (str): The name of the bucket to synchronize
+            prefix (str): The prefix in the bucket that mirrors local_dir
+            direction (str): "upload" to make the bucket match local_dir,
+                             or "download" to make local_dir match the bucket
+            compare (str): How to detect changed files:
+                           - "size": Only compare the sizes
+                           - "size_mtime": Compare the sizes, and treat a source
+                             that was modified after the target as changed
+                           - "etag": Compare the sizes and the MD5 of the local
+                             file against the ETag (multipart ETags fall back
+                             to comparing the sizes)
+            delete (bool): Whether to delete target entries that don't exist
+                           in the source
+            concurrency (int): The maximum number of concurrent transfers
+            mtime_tolerance (float): The seconds a source may be newer than the
+                                     target and still count as unchanged with
+                                     "size_mtime", to absorb the whole second
+                                     granularity of LastModified and clock skew
+
+        Returns:
+            dict: A summary of the sync with the following keys:
+                  - "transferred" (list): The keys that were transferred
+                  - "deleted" (list): The keys that were deleted from the target
+                  - "skipped" (int): The number of unchanged entries
+
+        Raises:
+            ValueError: If direction or compare are not supported
+
+        Example usage:
+            s3_client.sync("/tmp/dataset", "my-bucket", prefix="dataset/", delete=True)
+
+        """
+        if direction not in ("upload", "download"):
+            raise ValueError(f"Unsupported sync direction: {direction}")
+        if compare not in ("size", "size_mtime", "etag"):
+            raise ValueError(f"Unsupported sync comparison: {compare}")
+        if prefix and not prefix.endswith("/"):
+            prefix += "/"
+
+        log.info(
+            f"Syncing {local_dir} and s3://{bucket_name}/{prefix} "
+            f"(direction: {direction}, compare: {compare}, delete: {delete})"
+        )
+
+        local_entries = {}
+        for root, _, files in os.walk(local_dir):
+            for filename in files:
+                local_path = os.path.join(root, filename)
+                relative_path = os.path.relpath(local_path, local_dir)
+                local_entries[relative_path.replace(os.sep, "/")] = os.stat(local_path)
+
+        remote_entries = {
+            obj["Key"][len(prefix) :]: obj
+            for obj in self.iter_objects(bucket_name, prefix)
+            if not obj["Key"].endswith("/")
+        }
+
+        if direction == "upload":
+            source_entries, target_entries = local_entries, remote_entries
+        else:
+            source_entries, target_entries = remote_entries, local_entries
+
+        to_transfer = [
+            relative_key
+            for relative_key in source_entries
+            if relative_key not in target_entries
+            or self._sync_entry_changed(
+                os.path.join(local_dir, relative_key),
+                local_entries[relative_key],
+                remote_entries[relative_key],
+                direction,
+                compare,
+                mtime_tolerance,
+            )
+        ]
+        to_delete = (
+            [key for key in target_entries if key not in source_entries]
+            if delete
+            else []
+        )
+
+        def _transfer(relative_key):
+            local_path = os.path.join(local_dir, relative_key)
+            if direction == "upload":
+                self._boto3_client.upload_file(
+                    local_path, bucket_name, f"{prefix}{relative_key}"
+                )
+            else:
+                os.makedirs(os.path.dirname(local_path), exist_ok=True)
+                self._boto3_client.download_file(
+                    bucket_name, f"{prefix}{relative_key}", local_path
+                )
+                # Align the mtime with the object so the next sync skips it
+                last_modified = remote_entries[relative_key]["LastModified"].timestamp()
+                os.utime(local_path, (last_modified, last_modified))
+
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            list(executor.map(_transfer, to_transfer))
+
+        if to_delete and direction == "upload":
+            for i in range(0, len(to_delete), 1000):
+                self.delete_objects(
+                    bucket_name, [f"{prefix}{key}" for key in to_delete[i : i + 1000]]
+                )
+        for key in to_delete if direction == "download" else []:
+            os.remove(os.path.join(local_dir, key))
+
+        skipped_count = len(source_entries) - len(to_transfer)
+        log.info(
+            f"Sync transferred {len(to_transfer)} files, deleted {len(to_delete)} "
+            f"and skipped {skipped_count} unchanged files"
+        )
+        return {
+            "transferred": to_transfer,
+            "deleted": to_delete,
+            "skipped": skipped_count,
+        }
+
+    def _sync_entry_changed(
+        self, local_path, local_stat, remote_obj, direction, compare, mtime_tolerance
+    ):
+        """
+        Check whether a file that exists on both sides of a sync has changed
+
+        Args:
+            local_path (str): The full path of the local file
+            local_stat (os.stat_result): The stat result of the local file
+            remote_obj (dict): The listed metadata of the object
+            direction (str): The direction of the sync
+            compare (str): The comparison mode of the sync
+            mtime_tolerance (float): The allowed mtime difference in seconds
+
+        Returns:
+            bool: True if the file should be transferred
+
+        """
+        if local_stat.st_size != remote_obj["Size"]:
+            return True
+        if compare == "size_mtime":
+            remote_mtime = remote_obj["LastModified"].timestamp()
+            if direction == "upload":
+                return local_stat.st_mtime - remote_mtime > mtime_tolerance
+            return remote_mtime - local_stat.st_mtime > mtime_tolerance
+        if compare == "etag":
+            etag = remote_obj["ETag"].strip('"')
+            if "-" in etag:
+                return False
+            md5 = hashlib.md5()
+            with open(local_path, "rb") as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                    md5.update(chunk)
+            return md5.hexdigest() != etag
+        return False
+
     def put_random_objects(
         self,
         bucket_name,
@@ -618,6 +1013,7 @@ class S3Client:
         part_id,
         upload_id,
         file_chunk,
+        transfer_profile=None,
     ):
         """
         Upload multiple parts of the file as object to the bucket using boto3
@@ -628,18 +1024,27 @@ class S3Client:
             part_id (int): Part number
             upload_id (str): id generated by create_multipart_upload method
             file_chunk (str): Chunk of file to be uploaded.
+            transfer_profile (str): The transfer profile to use for this call.
+                                    Defaults to the profile of the client.
 
         Returns:
             List: List contains all part information
 
         """
-        part_info = self._boto3_client.upload_part(
+        profile, boto3_client, profile_kwargs = self._resolve_transfer_profile(
+            transfer_profile
+        )
+        body_size = self._get_body_size(file_chunk)
+        start_cpu_time = time.thread_time()
+        part_info = boto3_client.upload_part(
             Bucket=bucket_name,
             Key=object_name,
             PartNumber=part_id,
             UploadId=upload_id,
             Body=file_chunk,
+            **profile_kwargs,
         )
+        self._record_transfer(profile, body_size, time.thread_time() - start_cpu_time)
         return part_info
 
     def list_multipart_upload(self, bucket_name):
@@ -745,12 +1150,188 @@ class S3Client:
         )
         return list_parts
 
-    def _exec_boto3_method(self, method_name, **kwargs):
+    def get_coalescing_stats(self):
+        """
+        Get the counters of the read-only requests that were coalesced
+
+        Returns:
+            dict: A dictionary with the following keys:
+                  - "executed_calls" (int): The number of requests sent
+                  - "coalesced_calls" (int): The number of requests saved by
+                    reusing an identical in-flight request
+                  Both are zero if coalesce_reads is disabled.
+
+        """
+        if self._single_flight is None:
+            return {"executed_calls": 0, "coalesced_calls": 0}
+        return self._single_flight.get_stats()
+
+    def get_transfer_cpu_report(self):
+        """
+        Get the client CPU cost of the uploads done so far by each transfer profile
+
+        The CPU time is measured on the calling thread around each upload,
+        which covers the payload hashing, signing and checksum calculation
+        that boto3 performs before the data is sent.
+
+        Returns:
+            dict: A dictionary of the used profiles ("default" for the boto3
+                  defaults) to dictionaries with the following keys:
+                  - "bytes" (int): The number of uploaded bytes
+                  - "cpu_seconds" (float): The client CPU seconds spent
+                  - "cpu_seconds_per_gb" (float|None): The CPU seconds per GB,
+                    or None if nothing was uploaded
+
+        """
+        report = {}
+        with self._transfer_lock:
+            for profile, stats in self._transfer_stats.items():
+                uploaded_gb = stats["bytes"] / 1024**3
+                report[profile] = {
+                    "bytes": stats["bytes"],
+                    "cpu_seconds": stats["cpu_seconds"],
+                    "cpu_seconds_per_gb": (
+                        stats["cpu_seconds"] / uploaded_gb if uploaded_gb else None
+                    ),
+                }
+        return report
+
+    def reset_transfer_stats(self):
+        """
+        Reset the accumulated transfer CPU statistics
+        """
+        with self._transfer_lock:
+            self._transfer_stats = {}
+
+    def _resolve_transfer_profile(self, transfer_profile=None):
+        """
+        Resolve the transfer profile of an upload call
+
+        Args:
+            transfer_profile (str): The profile requested by the call, if any
+
+        Returns:
+            tuple:
+                str: The name of the resolved profile, or None for the boto3 defaults
+                botocore.client.BaseClient: The boto3 client to upload with
+                dict: Extra keyword arguments to pass to the upload method
+
+        Raises:
+            ValueError: If the transfer profile is not supported
+
+        """
+        profile = transfer_profile or self.transfer_profile
+        if profile is None:
+            return None, self._boto3_client, {}
+        if profile not in S3_TRANSFER_PROFILES:
+            raise ValueError(f"Unsupported transfer profile: {profile}")
+
+        payload_signing_enabled = S3_TRANSFER_PROFILES[profile][
+            "payload_signing_enabled"
+        ]
+        checksum_algorithm = S3_TRANSFER_PROFILES[profile]["checksum_algorithm"]
+        with self._transfer_lock:
+            if payload_signing_enabled not in self._transfer_clients:
+                config_kwargs = {
+                    "s3": {"payload_signing_enabled": payload_signing_enabled}
+                }
+                # Newer botocore versions add a CRC32 checksum to every upload
+                # by default, so only send the checksums the profile asks for
+                if "request_checksum_calculation" in Config.OPTION_DEFAULTS:
+                    config_kwargs["request_checksum_calculation"] = "when_required"
+                self._transfer_clients[payload_signing_enabled] = boto3.client(
+                    "s3",
+                    endpoint_url=self.endpoint,
+                    aws_access_key_id=self.access_key,
+                    aws_secret_access_key=self.secret_key,
+                    config=Config(**config_kwargs),
+                )
+            boto3_client = self._transfer_clients[payload_signing_enabled]
+
+        profile_kwargs = (
+            {"ChecksumAlgorithm": checksum_algorithm} if checksum_algorithm else {}
+        )
+        return profile, boto3_client, profile_kwargs
+
+    def _record_transfer(self, profile, body_size, cpu_seconds):
+        """
+        Accumulate the CPU time spent on an upload under its transfer profile
+
+        Args:
+            profile (str): The name of the transfer profile, or None for the boto3 defaults
+            body_size (int): The size of the uploaded body in bytes
+            cpu_seconds (float): The CPU seconds spent on the upload
+
+        """
+        profile = profile or "default"
+        with self._transfer_lock:
+            stats = self._transfer_stats.setdefault(
+                profile, {"bytes": 0, "cpu_seconds": 0.0}
+            )
+            stats["bytes"] += body_size
+            stats["cpu_seconds"] += cpu_seconds
+
+    @staticmethod
+    def _get_body_size(body):
+        """
+        Get the size of an upload body without consuming it
+
+        Args:
+            body (bytes|str|file-like object): The upload body
+
+        Returns:
+            int: The number of bytes that will be uploaded
+
+        """
+        if isinstance(body, str):
+            return len(body.encode("utf-8"))
+        if isinstance(body, (bytes, bytearray)):
+            return len(body)
+        try:
+            current_position = body.tell()
+            body.seek(0, os.SEEK_END)
+            size = body.tell() - current_position
+            body.seek(current_position)
+            return size
+        except (AttributeError, OSError):
+            return 0
+
+    def _exec_boto3_method(self, method_name, boto3_client=None, **kwargs):
         """
         Execute a boto3 method and return its response
 
         Args:
             method_name (str): The name of the boto3 method to execute
+            boto3_client (botocore.client.BaseClient): The boto3 client to use.
+                                                       Defaults to the client of this instance.
+            **kwargs: The keyword arguments to pass to the method
+
+        Returns:
+            dict: A dictionary containing the response from the boto3 method call.
+                  Also includes the added Code key at the root level.
+
+        """
+        if (
+            self._single_flight is not None
+            and boto3_client is None
+            and method_name in S3Client.COALESCED_METHODS
+        ):
+            call_key = (method_name, repr(sorted(kwargs.items())))
+            response_dict, _ = self._single_flight.do(
+                call_key, lambda: self._call_boto3_method(method_name, **kwargs)
+            )
+            # The response may be shared between callers, so each gets its own copy
+            return copy.deepcopy(response_dict)
+        return self._call_boto3_method(method_name, boto3_client, **kwargs)
+
+    def _call_boto3_method(self, method_name, boto3_client=None, **kwargs):
+        """
+        Call a boto3 method and normalize its response
+
+        Args:
+            method_name (str): The name of the boto3 method to call
+            boto3_client (botocore.client.BaseClient): The boto3 client to use.
+                                                       Defaults to the client of this instance.
             **kwargs: The keyword arguments to pass to the method
 
         Returns:
@@ -758,16 +1339,22 @@ class S3Client:
                   Also includes the added Code key at the root level.
 
         """
-        log.info(f"Executing boto3 method {method_name} with given arguments {kwargs}")
+        # Avoid rendering the payload, which would dominate the CPU cost of big uploads
+        logged_kwargs = {k: v for k, v in kwargs.items() if k != "Body"}
+        log.info(
+            f"Executing boto3 method {method_name} with given arguments {logged_kwargs}"
+        )
         response_dict = {}
         try:
-            boto3_method = getattr(self._boto3_client, method_name)
+            boto3_method = getattr(boto3_client or self._boto3_client, method_name)
             response_dict = boto3_method(**kwargs)
             response_dict["Code"] = response_dict["ResponseMetadata"]["HTTPStatusCode"]
         except ClientError as e:
             response_dict = e.response
             response_dict["Code"] = e.response["Error"]["Code"]
-            log.warn(f"Failed to execute {method_name} with arguments {kwargs}: {e}")
+            log.warn(
+                f"Failed to execute {method_name} with arguments {logged_kwargs}: {e}"
+            )
 
         # Convert the response code to an int if possible for uniformity
         try:
@@ -0,0 +1,138 @@
+"""
+Module to delete accounts and their buckets in bulk
+"""
+
+import asyncio
+import logging
+from collections import namedtuple
+
+from framework.async_executor import get_default_executor
+from noobaa_sa.exceptions import AccountStatusQueryFailed
+
+log = logging.getLogger(__name__)
+
+TeardownResult = namedtuple(
+    "TeardownResult", ["deleted_buckets", "deleted_accounts", "failures"]
+)
+TeardownResult.__doc__ = """
+The outcome of a teardown
+
+Attributes:
+    deleted_buckets (list): The names of the deleted buckets
+    deleted_accounts (list): The names of the deleted accounts
+    failures (list): A (kind, name, error) tuple per resource that couldn't
+                     be deleted, where kind is "bucket" or "account"
+"""
+
+
+class TeardownEngine:
+    """
+    Deletes accounts and buckets in parallel waves
+
+    The buckets are listed once into records indexed by owner, so finding the
+    buckets of many accounts costs a single listing. All the buckets are then
+    deleted concurrently, followed by all the accounts. A failure to delete
+    a resource is collected and the teardown carries on with the rest.
+
+    Example usage:
+        engine = TeardownEngine(bucket_manager, account_manager)
+        result = engine.teardown(accounts=account_manager.accounts_created)
+        assert not result.failures
+
+    """
+
+    def __init__(
+        self, bucket_manager, account_manager=None, config_root=None, executor=None
+    ):
+        """
+        Args:
+            bucket_manager (BucketManager): The manager to list and delete the
+                                            buckets with
+            account_manager (NSFSAccount): The manager to delete the accounts with.
+                                           Only needed to delete accounts.
+            config_root (str): Path to config root
+            executor (AsyncRemoteExecutor): The executor to run the deletions on,
+                                            which bounds their concurrency.
+                                            Defaults to the shared executor.
+
+        """
+        self.account_manager = account_manager
+        self.bucket_manager = bucket_manager
+        self.config_root = config_root or bucket_manager.config_root
+        self.executor = executor
+
+    def teardown(self, accounts=(), buckets=()):
+        """
+        Delete accounts with all their buckets, and additional buckets
+
+        Args:
+            accounts (list): The names of the accounts to delete
+            buckets (list): The names of additional buckets to delete
+
+        Returns:
+            TeardownResult: The deleted resources and the failures
+
+        """
+        accounts = list(accounts)
+        failures = []
+        bucket_names = list(dict.fromkeys(buckets))
+        if accounts:
+            # List once, then look up the buckets of every account in the index
+            listing = self.bucket_manager.list_records(config_root=self.config_root)
+            for account_name in accounts:
+                owned = listing.find("owner", account_name) + listing.find(
+                    "owner_name", account_name
+                )
+                try:
+                    account_id = self.account_manager.get_cached_status(
+                        account_name, self.config_root
+                    )["_id"]
+                    owned += listing.find("owner", account_id)
+                except AccountStatusQueryFailed as e:
+                    log.warning(f"Failed to get the status of {account_name}: {e}")
+                bucket_names.extend(record.name for record in owned)
+            bucket_names = list(dict.fromkeys(bucket_names))
+
+        log.info(
+            f"Tearing down {len(bucket_names)} buckets and {len(accounts)} accounts"
+        )
+        deleted_buckets = asyncio.run(
+            self._delete_wave(
+                "bucket",
+                bucket_names,
+                lambda name: self.bucket_manager.delete_async(
+                    name,
+                    config_root=self.config_root,
+                    force=True,
+                    executor=self.executor,
+                ),
+                failures,
+            )
+        )
+        deleted_accounts = asyncio.run(
+            self._delete_wave(
+                "account",
+                accounts,
+                lambda name: self.account_manager.delete_async(
+                    name, config_root=self.config_root, executor=self.executor
+                ),
+                failures,
+            )
+        )
+        for kind, name, error in failures:
+            log.warning(f"Failed to delete {kind} {name}: {error}")
+        return TeardownResult(deleted_buckets, deleted_accounts, failures)
+
+    async def _delete_wave(self, kind, names, delete, failures):
+        # The executor bounds how many of the deletions run at once
+        executor = self.executor or get_default_executor()
+        results = await executor.gather(
+            *[delete(name) for name in names], return_exceptions=True
+        )
+        deleted = []
+        for name, result in zip(names, results):
+            if isinstance(result, Exception):
+                failures.append((kind, name, result))
+            else:
+                deleted.append(name)
+        return deleted
@@ -1,7 +1,5 @@
 import os
 import logging
-import random
-import string
 import tempfile
 import pytest
 
@@ -13,18 +11,19 @@ from common_ci_utils.random_utils import (
 )
 from framework.ssh_connection_manager import SSHConnectionManager
 from noobaa_sa import constants
-from noobaa_sa.exceptions import AccountDeletionFailed, BucketDeletionFailed
+from noobaa_sa.account_pool import AccountPool
+from noobaa_sa.config_snapshot import ConfigSnapshot
 from noobaa_sa.factories import AccountFactory
+from noobaa_sa.teardown import TeardownEngine
 from noobaa_sa.bucket import BucketManager
 from framework import config
 from noobaa_sa.s3_client import S3Client
+from utility.linux_users import LinuxUserAllocator
 from utility.retry import retry_until_timeout
 from utility.utils import (
     get_env_config_root_full_path,
     get_current_test_name,
     get_noobaa_sa_host_home_path,
-    is_linux_username_available,
-    is_uid_gid_available,
     get_noobaa_sa_rpm_name,
     get_noobaa_sa_version_string,
 )
@@ -57,24 +56,12 @@ def account_manager_implementation(request, account_json=None):
         """
         Make sure to delete the created account abd buckets
         """
-        # Delete all the accounts that were created by this fixture
-        bucket_manager = BucketManager()
-        for acc in acc_manager_instance.accounts_created:
-            # Delete all the buckets that were created by this account
-            acc_id = acc_manager_instance.status(account_name=acc)["_id"]
-            for bucket in bucket_manager.list(use_wide=True):
-                bucket_name = bucket.get("name")
-                owner_account = bucket.get("owner_account")
-
-                if bucket_name and owner_account == acc_id:
-                    try:
-                        bucket_manager.delete(bucket_name, force=True)
-                    except BucketDeletionFailed as e:
-                        log.warning(f"Failed to delete bucket {bucket_name}: {e}")
-            try:
-                acc_manager_instance.delete(account_name=acc)
-            except AccountDeletionFailed as e:
-                log.warning(f"Failed to delete account {acc}: {e}")
+        acc_manager_instance.delete_seeded()
+        # Delete all the accounts that were created by this fixture,
+        # along with all of their buckets
+        TeardownEngine(BucketManager(), acc_manager_instance).teardown(
+            accounts=acc_manager_instance.accounts_created
+        )
 
     request.addfinalizer(cleanup)
     return acc_manager_instance
@@ -85,13 +72,93 @@ def bucket_manager(request):
     bucket_manager = BucketManager()
 
     def bucket_cleanup():
-        for bucket in bucket_manager.list():
-            bucket_manager.delete(bucket, force=True)
+        bucket_manager.delete_seeded()
+        # Delete the buckets concurrently over the connection pool
+        TeardownEngine(bucket_manager).teardown(buckets=bucket_manager.iter_list())
 
     request.addfinalizer(bucket_cleanup)
     return bucket_manager
 
 
+def _config_root_leak_check_implementation(request, scope):
+    if not config.ENV_DATA.get("detect_config_root_leaks"):
+        return
+    before = ConfigSnapshot.take()
+
+    def _check_config_root_leaks():
+        diff = ConfigSnapshot.take().diff(before)
+        leaked = {
+            kind: names for kind, names in diff.created_resources().items() if names
+        }
+        if leaked:
+            log.warning(f"Resources leaked by the {scope}: {leaked}")
+        if diff:
+            log.info(f"Config root changes during the {scope}:\n{diff.format()}")
+
+    request.addfinalizer(_check_config_root_leaks)
+
+
+@pytest.fixture(scope="session", autouse=True)
+def session_config_root_leak_check(request):
+    """
+    Warn about the accounts and buckets left behind by the session, when
+    ENV_DATA["detect_config_root_leaks"] is set
+    """
+    _config_root_leak_check_implementation(request, "session")
+
+
+@pytest.fixture(autouse=True)
+def config_root_leak_check(request):
+    """
+    Warn about the accounts and buckets left behind by the test, when
+    ENV_DATA["detect_config_root_leaks"] is set
+
+    Being autouse, the fixture is set up before the other function scoped
+    fixtures, so it's finalized after their cleanup.
+    """
+    _config_root_leak_check_implementation(request, f"test {request.node.name}")
+
+
+@pytest.fixture(scope="session")
+def account_pool(request):
+    """
+    Session pool of pre-provisioned accounts that tests can lease
+
+    The pool is created with ENV_DATA["account_pool_size"] accounts, and is
+    None if the size is 0.
+
+    Returns:
+        AccountPool: The account pool, or None if it's disabled
+
+    """
+    pool_size = config.ENV_DATA.get("account_pool_size", 0)
+    if not pool_size or config.ENV_DATA["deployment_type"] != constants.NSFS_DEPLOYMENT:
+        return None
+    pool = AccountPool(
+        size=pool_size,
+        max_size=config.ENV_DATA.get("account_pool_max_size"),
+        config_root=get_env_config_root_full_path(),
+    ).start()
+    request.addfinalizer(pool.close)
+    return pool
+
+
+@pytest.fixture
+def pooled_account(request, account_pool):
+    """
+    Lease an account from the session account pool for the test
+
+    Returns:
+        dict: The "account_name", "access_key" and "secret_key" of the account
+
+    """
+    if account_pool is None:
+        pytest.skip("The account pool is disabled")
+    account = account_pool.lease()
+    request.addfinalizer(lambda: account_pool.release(account))
+    return account
+
+
 @pytest.fixture(scope="session")
 def set_nsfs_server_config_root(request):
     """
@@ -163,29 +230,52 @@ def s3_client_factory_class(set_nsfs_server_config_root, account_manager_class):
 
 
 @pytest.fixture(scope="function")
-def s3_client_factory(set_nsfs_server_config_root, account_manager):
+def s3_client_factory(
+    request, set_nsfs_server_config_root, account_manager, account_pool
+):
     """
     Function scoped factory to create S3Client instances with given credentials.
 
     Args:
         set_nsfs_server_config_root (fixture): The prerequisite fixture to setup the NSFS server TLS certificate.
         account_manager (AccountManager): The account manager instance.
+        account_pool (AccountPool): The session account pool, or None if it's disabled.
 
     Returns:
         func: A function that creates S3Client instances.
 
     """
+    leased_accounts = []
+
+    def _release_leased_accounts():
+        for account in leased_accounts:
+            account_pool.release(account)
+
+    request.addfinalizer(_release_leased_accounts)
     return s3_client_factory_implementation(
-        set_nsfs_server_config_root, account_manager
+        set_nsfs_server_config_root,
+        account_manager,
+        account_pool=account_pool,
+        leased_accounts=leased_accounts,
     )
 
 
-def s3_client_factory_implementation(set_nsfs_server_config_root, account_manager):
+def s3_client_factory_implementation(
+    set_nsfs_server_config_root,
+    account_manager,
+    account_pool=None,
+    leased_accounts=None,
+):
     """
     Factory to create S3Client instances with given credentials.
 
     Args:
         account_manager (AccountManager): The account manager instance.
+        account_pool (AccountPool): A pool to lease the accounts of clients that
+                                    use the default config root from, instead
+                                    of creating new ones.
+        leased_accounts (list): The list to add the leased accounts to, for
+                                the caller to release them.
 
     Returns:
         func: A function that creates S3Client instances.
@@ -210,6 +300,7 @@ def s3_client_factory_implementation(set_nsfs_server_config_root, account_manage
             S3Client: An S3Client instance.
 
         """
+        use_account_pool = account_pool is not None and not config_root
         if not config_root:
             config_root = get_env_config_root_full_path()
 
@@ -225,7 +316,11 @@ def s3_client_factory_implementation(set_nsfs_server_config_root, account_manage
             setup_nsfs_tls_cert(config_root)
 
         # Set the AWS access and secret keys
-        if access_and_secret_keys_tuple is None:
+        if access_and_secret_keys_tuple is None and use_account_pool:
+            account = account_pool.lease()
+            leased_accounts.append(account)
+            access_key, secret_key = account["access_key"], account["secret_key"]
+        elif access_and_secret_keys_tuple is None:
             _, access_key, secret_key = account_manager.create()
         else:
             access_key, secret_key = access_and_secret_keys_tuple
@@ -304,7 +399,7 @@ def tmp_directories_factory(request):
 
 
 @pytest.fixture(scope="function")
-def linux_user_factory(request):
+def linux_user_factory(linux_users_factory):
     """
     Factory for creating random Linux users on the remote machine, and cleanup after the test.
 
@@ -312,9 +407,6 @@ def linux_user_factory(request):
         func: A function that creates a random Linux user.
 
     """
-    conn = SSHConnectionManager().connection
-    created_groups = []
-    created_users = []
 
     def _create_user():
         """
@@ -324,59 +416,25 @@ def linux_user_factory(request):
             tuple: A tuple containing the UID, GID, and username of the created user.
 
         """
+        return linux_users_factory(1)[0]
 
-        def _random_username():
-            """Generate a random string of fixed length."""
-            letters = string.ascii_lowercase
-            return "".join(random.choice(letters) for i in range(8))
-
-        def _random_uid_gid():
-            """Generate a random UID and GID between 1000 and 9999."""
-            return random.randint(1000, 9999), random.randint(1000, 9999)
+    return _create_user
 
-        # Generate until available credentials are found
-        username = _random_username()
-        while not is_linux_username_available(username):
-            username = _random_username()
 
-        uid, gid = _random_uid_gid()
-        while not is_uid_gid_available(uid, gid):
-            uid, gid = _random_uid_gid()
+@pytest.fixture(scope="function")
+def linux_users_factory(request):
+    """
+    Factory for creating many random Linux users on the remote machine in a
+    single round trip, and cleanup after the test.
 
-        # Create the group
-        group_name = f"group_{username}"
-        create_group_cmd = f"sudo groupadd -g {gid} {group_name}"
-        retcode, stdout, _ = conn.exec_cmd(create_group_cmd)
-        if retcode != 0:
-            raise ValueError(f"Failed to create group: {stdout}")
-        created_groups.append(group_name)
+    Returns:
+        func: A function that gets the number of users to create, and returns
+              a (uid, gid, username) tuple per created user.
 
-        # Create the user
-        create_cmd = f"sudo useradd -u {uid} -g {gid} {username}"
-        retcode, stdout, _ = conn.exec_cmd(create_cmd)
-        if retcode != 0:
-            raise ValueError(f"Failed to create user: {stdout}")
-        created_users.append(username)
-
-        return uid, gid, username
-
-    def _cleanup():
-        # Delete the created users
-        for user_name in created_users:
-            delete_cmd = f"sudo userdel {user_name}"
-            retcode, stdout, _ = conn.exec_cmd(delete_cmd)
-            if retcode != 0:
-                raise ValueError(f"Failed to delete user: {stdout}")
-
-        # Delete the created groups
-        for group in created_groups:
-            delete_group_cmd = f"sudo groupdel {group}"
-            retcode, stdout, _ = conn.exec_cmd(delete_group_cmd)
-            if retcode != 0:
-                raise ValueError(f"Failed to delete group: {stdout}")
-
-    request.addfinalizer(_cleanup)
-    return _create_user
+    """
+    allocator = LinuxUserAllocator()
+    request.addfinalizer(allocator.cleanup)
+    return allocator.create
 
 
 @pytest.fixture(scope="session", autouse=True)
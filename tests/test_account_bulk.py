@@ -0,0 +1,170 @@
+import functools
+import itertools
+import logging
+import os
+import shutil
+from pathlib import Path
+
+import pytest
+
+from framework import config
+from framework.customizations.marks import tier1, tier3
+from framework.local_connection import LocalConnection
+from framework.noobaa_cli_batch import NoobaaCliBatch
+from noobaa_sa import account
+from noobaa_sa.account import NSFSAccount
+from noobaa_sa.exceptions import AccountCreationFailed
+
+log = logging.getLogger(__name__)
+
+TEMPLATE_DIR = str(Path(__file__).parent.parent / "templates")
+
+# Runs the command as the current user, and fails tar if FAIL_TAR is set
+FAKE_SUDO = """\
+#!/bin/bash
+if [ "$1" = tar ] && [ -n "$FAIL_TAR" ]; then
+    echo "tar: Cannot open: Permission denied" >&2
+    exit 2
+fi
+exec "$@"
+"""
+
+# Replies to account add with the name of the account in the given file
+FAKE_NOOBAA_CLI = """\
+#!/bin/bash
+while [ $# -gt 0 ]; do
+    [ "$1" = --from_file ] && from_file=$2
+    shift
+done
+name=$(sed -n 's/.*"name": "\\(.*\\)".*/\\1/p' "$from_file")
+echo "{\\"response\\": {\\"code\\": \\"AccountCreated\\", \\"reply\\": {\\"name\\": \\"$name\\"}}}"
+"""
+
+STUB_MANAGE_NSFS = """\
+'use strict';
+const fs = require('fs');
+
+async function main(argv = process.argv.slice(2)) {
+    const file = argv[argv.indexOf('--from_file') + 1];
+    const { name } = JSON.parse(fs.readFileSync(file, 'utf8'));
+    const res = JSON.stringify({ response: { code: 'AccountCreated', reply: { name } } });
+    process.stdout.write(res + '\\n', () => process.exit(0));
+}
+
+exports.main = main;
+"""
+
+
+class TestCreateMany:
+    """
+    Test creating accounts in bulk against a fake noobaa-cli on the local machine
+    """
+
+    @pytest.fixture
+    def account_manager(self, tmp_path, monkeypatch):
+        bin_dir = tmp_path / "bin"
+        bin_dir.mkdir()
+        for name, script in [("sudo", FAKE_SUDO), ("noobaa-cli", FAKE_NOOBAA_CLI)]:
+            (bin_dir / name).write_text(script)
+            (bin_dir / name).chmod(0o755)
+        monkeypatch.setenv("PATH", f"{bin_dir}:{os.environ['PATH']}")
+        monkeypatch.setitem(config.ENV_DATA, "template_dir", TEMPLATE_DIR)
+        monkeypatch.setattr(
+            account, "get_noobaa_sa_host_home_path", lambda: str(tmp_path)
+        )
+        # Predictable names, so a bucket path can be made to fail upfront
+        counter = itertools.count()
+        monkeypatch.setattr(
+            account,
+            "generate_unique_resource_name",
+            lambda prefix: f"{prefix}-{tmp_path.name}-{next(counter)}",
+        )
+
+        account_manager = NSFSAccount.__new__(NSFSAccount)
+        account_manager.conn = LocalConnection()
+        account_manager.manage_nsfs = str(bin_dir / "noobaa-cli")
+        account_manager.config_root = str(tmp_path / "config_root")
+        account_manager.accounts_created = []
+        account_manager.accounts_seeded = {}
+        return account_manager
+
+    def _staging_dirs(self, tmp_path):
+        return list(Path("/tmp").glob(f"accounts_bulk-{tmp_path.name}-*"))
+
+    @tier1
+    def test_create_many(self, account_manager, tmp_path):
+        """
+        Test that every account is created with its bucket path, and the
+        staging dir of the account documents is removed
+        """
+        results = account_manager.create_many(3, parallelism=2, fs_backend="GPFS")
+
+        assert [result["success"] for result in results] == [True] * 3
+        for result in results:
+            assert Path(result["bucket_path"]).is_dir()
+            assert result["bucket_path"] == str(
+                tmp_path / f"fs_{result['account_name']}"
+            )
+        assert account_manager.accounts_created == [
+            result["account_name"] for result in results
+        ]
+        assert not self._staging_dirs(tmp_path)
+
+    @tier3
+    @pytest.mark.parametrize(
+        "single_process",
+        [
+            False,
+            pytest.param(
+                True,
+                marks=pytest.mark.skipif(
+                    not shutil.which("node"), reason="Node.js is not installed"
+                ),
+            ),
+        ],
+    )
+    def test_failed_bucket_path(
+        self, account_manager, tmp_path, monkeypatch, single_process
+    ):
+        """
+        Test that an account whose bucket path can't be made fails alone:
+        1. Block the bucket path of the second account with a file
+        2. Create three accounts
+        3. Verify that only the second account failed
+        """
+        if single_process:
+            cmd_dir = tmp_path / "src" / "cmd"
+            cmd_dir.mkdir(parents=True)
+            (cmd_dir / "manage_nsfs.js").write_text(STUB_MANAGE_NSFS)
+            monkeypatch.setattr(
+                account,
+                "NoobaaCliBatch",
+                functools.partial(
+                    NoobaaCliBatch,
+                    noobaa_src=str(tmp_path),
+                    node=shutil.which("node"),
+                    use_sudo=False,
+                ),
+            )
+        (tmp_path / f"fs_account-{tmp_path.name}-1").write_text("")
+
+        results = account_manager.create_many(
+            3, parallelism=2, single_process=single_process
+        )
+
+        assert [result["success"] for result in results] == [True, False, True]
+        assert "File exists" in results[1]["error"]
+        assert len(account_manager.accounts_created) == 2
+        assert not self._staging_dirs(tmp_path)
+
+    @tier3
+    def test_failed_shipping(self, account_manager, tmp_path, monkeypatch):
+        """
+        Test that the staging dir is removed when shipping the documents fails
+        """
+        monkeypatch.setenv("FAIL_TAR", "1")
+
+        with pytest.raises(AccountCreationFailed, match="Permission denied"):
+            account_manager.create_many(2, parallelism=2)
+        assert not account_manager.accounts_created
+        assert not self._staging_dirs(tmp_path)
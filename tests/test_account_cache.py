@@ -0,0 +1,92 @@
+import logging
+
+from framework.customizations.marks import tier1, tier3
+from noobaa_sa.account_cache import AccountCache
+
+log = logging.getLogger(__name__)
+
+CONFIG_ROOT = "/etc/noobaa.conf.d"
+
+
+def _account(name, account_id, access_key, secret_key="secret"):
+    access_keys = [{"access_key": access_key}]
+    if secret_key:
+        access_keys[0]["secret_key"] = secret_key
+    return {"name": name, "_id": account_id, "access_keys": access_keys}
+
+
+class TestAccountCache:
+    """
+    Test the lookups and the invalidation of the account cache
+    """
+
+    @tier1
+    def test_lookups(self):
+        """
+        Test that an account is found by its name, _id and access key, only
+        in its own config root
+        """
+        cache = AccountCache()
+        cache.put(CONFIG_ROOT, _account("account-1", "id-1", "AK1"))
+
+        assert cache.get_by_name("account-1", CONFIG_ROOT)["_id"] == "id-1"
+        assert cache.get_by_id("id-1", CONFIG_ROOT)["name"] == "account-1"
+        assert cache.get_by_access_key("AK1", CONFIG_ROOT)["name"] == "account-1"
+        assert cache.get_by_name("account-1", "/other/config_root") is None
+        assert cache.get_by_name("account-2", CONFIG_ROOT) is None
+        assert (cache.hits, cache.misses) == (3, 2)
+
+    @tier1
+    def test_cached_entries_are_copies(self):
+        """
+        Test that changing a returned entry doesn't change the cache
+        """
+        cache = AccountCache()
+        account = _account("account-1", "id-1", "AK1")
+        cache.put(CONFIG_ROOT, account)
+        account["_id"] = "changed"
+        cache.get_by_name("account-1", CONFIG_ROOT)["_id"] = "changed"
+
+        assert cache.get_by_name("account-1", CONFIG_ROOT)["_id"] == "id-1"
+
+    @tier1
+    def test_invalidate(self):
+        """
+        Test that an invalidated account is dropped from all the indexes
+        """
+        cache = AccountCache()
+        cache.put(CONFIG_ROOT, _account("account-1", "id-1", "AK1"))
+        cache.put(CONFIG_ROOT, _account("account-2", "id-2", "AK2"))
+        cache.invalidate(CONFIG_ROOT, "account-1")
+
+        assert cache.get_by_name("account-1", CONFIG_ROOT) is None
+        assert cache.get_by_id("id-1", CONFIG_ROOT) is None
+        assert cache.get_by_access_key("AK1", CONFIG_ROOT) is None
+        assert cache.get_by_access_key("AK2", CONFIG_ROOT)["name"] == "account-2"
+
+    @tier1
+    def test_put_replaces_stale_indexes(self):
+        """
+        Test that caching an account again drops its previous _id and access key
+        """
+        cache = AccountCache()
+        cache.put(CONFIG_ROOT, _account("account-1", "id-1", "AK1"))
+        cache.put(CONFIG_ROOT, _account("account-1", "id-2", "AK2"))
+
+        assert cache.get_by_id("id-1", CONFIG_ROOT) is None
+        assert cache.get_by_access_key("AK1", CONFIG_ROOT) is None
+        assert cache.get_by_access_key("AK2", CONFIG_ROOT)["_id"] == "id-2"
+
+    @tier3
+    def test_put_without_secrets_keeps_access_keys(self):
+        """
+        Test that a status without --show_secrets doesn't drop the cached keys
+        """
+        cache = AccountCache()
+        cache.put(CONFIG_ROOT, _account("account-1", "id-1", "AK1"))
+        cache.put(CONFIG_ROOT, {"name": "account-1", "_id": "id-1"})
+        cache.put(CONFIG_ROOT, _account("account-1", "id-1", "AK1", secret_key=None))
+
+        account = cache.get_by_access_key("AK1", CONFIG_ROOT)
+        assert account is not None, "The account isn't found by its access key"
+        assert account["access_keys"][0]["secret_key"] == "secret"
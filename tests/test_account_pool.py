@@ -0,0 +1,256 @@
+import itertools
+import logging
+import queue
+import threading
+import time
+
+import pytest
+
+from framework.customizations.marks import tier1, tier3
+from noobaa_sa import account_pool
+from noobaa_sa.account_pool import AccountPool
+from noobaa_sa.exceptions import AccountStatusQueryFailed
+from noobaa_sa.records import BucketRecord, RecordListing
+
+log = logging.getLogger(__name__)
+
+
+class FakeConnection:
+    host = "fake-host"
+
+    def __init__(self):
+        self.commands = []
+
+    def exec_cmd(self, cmd):
+        self.commands.append(cmd)
+        return 0, "", ""
+
+    def close(self):
+        pass
+
+
+class FakeAccountManager:
+    """
+    An account manager that keeps the accounts in memory
+    """
+
+    def __init__(self):
+        self.conn = None
+        self.accounts = {}
+        self.accounts_created = []
+        self.deleted = []
+        self.provisioned = threading.Event()
+        self._ids = itertools.count()
+
+    def create_many(self, n, config_root=None, **template_overrides):
+        results = []
+        for _ in range(n):
+            index = next(self._ids)
+            name = f"account-{index}"
+            bucket_path = f"/fs/fs_{name}"
+            self.accounts[name] = {
+                "name": name,
+                "_id": f"id-{index}",
+                "access_keys": [{"access_key": f"AK{index}", "secret_key": "SK"}],
+                "nsfs_account_config": {"new_buckets_path": bucket_path},
+            }
+            self.accounts_created.append(name)
+            results.append(
+                {
+                    "account_name": name,
+                    "access_key": f"AK{index}",
+                    "secret_key": "SK",
+                    "bucket_path": bucket_path,
+                    "success": True,
+                }
+            )
+        self.provisioned.set()
+        return results
+
+    def status(self, account_name, config_root=None):
+        if account_name not in self.accounts:
+            raise AccountStatusQueryFailed(f"No such account {account_name}")
+        return self.accounts[account_name]
+
+    get_cached_status = status
+
+    def delete(self, account_name, config_root=None):
+        self.accounts.pop(account_name)
+        self.deleted.append(account_name)
+
+
+class FakeBucketManager:
+    """
+    A bucket manager that keeps the buckets in memory
+    """
+
+    def __init__(self, buckets=()):
+        self.conn = None
+        self.buckets = {bucket["name"]: bucket for bucket in buckets}
+
+    def list_records(self, config_root=None):
+        return RecordListing(BucketRecord.from_dict(b) for b in self.buckets.values())
+
+    def delete(self, bucket_name, config_root=None, force=False):
+        self.buckets.pop(bucket_name)
+
+
+class FakeSSHConnectionManager:
+    def create_connection(self):
+        return FakeConnection()
+
+
+class FakeTeardownEngine:
+    torn_down = []
+
+    def __init__(self, bucket_manager, account_manager, config_root=None):
+        pass
+
+    def teardown(self, accounts=()):
+        self.torn_down.extend(accounts)
+
+
+def _started(pool):
+    """
+    Start the pool and wait for its initial accounts
+    """
+    pool.start()
+    for _ in range(500):
+        if pool.get_stats()["idle"] == pool.size:
+            return pool
+        time.sleep(0.01)
+    raise AssertionError("The pool didn't provision its initial accounts")
+
+
+class TestAccountPool:
+    """
+    Test leasing, growing and recycling the accounts of the account pool
+    """
+
+    @pytest.fixture
+    def managers(self, monkeypatch):
+        account_manager = FakeAccountManager()
+        bucket_manager = FakeBucketManager()
+        monkeypatch.setattr(account_pool, "NSFSAccount", lambda _: account_manager)
+        monkeypatch.setattr(account_pool, "BucketManager", lambda: bucket_manager)
+        monkeypatch.setattr(
+            account_pool, "SSHConnectionManager", FakeSSHConnectionManager
+        )
+        monkeypatch.setattr(account_pool, "TeardownEngine", FakeTeardownEngine)
+        monkeypatch.setattr(FakeTeardownEngine, "torn_down", [])
+        return account_manager, bucket_manager
+
+    @pytest.fixture
+    def pool(self, managers):
+        pool = AccountPool(size=2, max_size=3, grow_step=2, config_root="/config")
+        yield _started(pool)
+        pool.close()
+
+    @tier1
+    def test_lease_and_grow(self, pool, managers):
+        """
+        Test that the pool grows when leased dry, up to max_size:
+        1. Lease the two initial accounts
+        2. Lease a third account, which grows the pool
+        3. Verify that a fourth lease times out at max_size
+        """
+        account_manager, _ = managers
+        leased = [pool.lease(timeout=5) for _ in range(3)]
+
+        assert len({account["account_name"] for account in leased}) == 3
+        assert leased[0] == {
+            "account_name": "account-0",
+            "access_key": "AK0",
+            "secret_key": "SK",
+        }
+        with pytest.raises(queue.Empty):
+            pool.lease(timeout=0.2)
+        stats = pool.get_stats()
+        assert stats["total"] == 3
+        assert stats["leases"] == 3
+        assert stats["idle"] == 0
+        # The pool owns the accounts, not the manager
+        assert account_manager.accounts_created == []
+
+    @tier1
+    def test_release_scrubs_the_account(self, pool, managers):
+        """
+        Test that a released account is scrubbed and leased again with its
+        current credentials
+        """
+        account_manager, bucket_manager = managers
+        account = pool.lease(timeout=5)
+        other = pool.lease(timeout=5)
+        bucket_manager.buckets = {
+            "bucket-1": {"name": "bucket-1", "owner_account": "id-0"},
+            "bucket-2": {"name": "bucket-2", "owner_account": "id-1"},
+        }
+        account_manager.accounts["account-0"]["access_keys"] = [
+            {"access_key": "AK-rotated", "secret_key": "SK-rotated"}
+        ]
+
+        pool.release(account)
+
+        assert list(bucket_manager.buckets) == ["bucket-2"]
+        assert pool._account_manager.conn.commands == [
+            "sudo find /fs/fs_account-0 -mindepth 1 -delete"
+        ]
+        assert pool.lease(timeout=5) == {
+            "account_name": "account-0",
+            "access_key": "AK-rotated",
+            "secret_key": "SK-rotated",
+        }
+        assert pool.get_stats()["recycled"] == 1
+        pool.release(other["account_name"])
+
+    @tier3
+    def test_release_unknown_account(self, pool):
+        """
+        Test that releasing accounts that aren't leased is ignored
+        """
+        account = pool.lease(timeout=5)
+        pool.release(account)
+        idle = pool.get_stats()["idle"]
+
+        pool.release(account)
+        pool.release("other-account")
+
+        assert pool.get_stats()["idle"] == idle
+        assert pool.get_stats()["recycled"] == 1
+
+    @tier3
+    def test_retire_changed_buckets_path(self, pool, managers):
+        """
+        Test that an account whose buckets path was changed isn't scrubbed,
+        and is deleted and replaced instead
+        """
+        account_manager, _ = managers
+        account = pool.lease(timeout=5)
+        config = account_manager.accounts[account["account_name"]]
+        config["nsfs_account_config"]["new_buckets_path"] = "/data"
+        account_manager.provisioned.clear()
+
+        pool.release(account)
+
+        assert account_manager.deleted == [account["account_name"]]
+        assert not pool._account_manager.conn.commands
+        assert account_manager.provisioned.wait(5)
+        stats = pool.get_stats()
+        assert stats["retired"] == 1
+        assert account["account_name"] not in [
+            pool.lease(timeout=5)["account_name"] for _ in range(2)
+        ]
+
+    @tier3
+    def test_close_tears_down_the_accounts(self, managers):
+        """
+        Test that closing the pool deletes its accounts, and that a release
+        after the close is ignored
+        """
+        pool = _started(AccountPool(size=2, config_root="/config"))
+        account = pool.lease(timeout=5)
+        pool.close()
+
+        assert sorted(FakeTeardownEngine.torn_down) == ["account-0", "account-1"]
+        pool.release(account)
+        assert pool.get_stats()["total"] == 0
@@ -0,0 +1,108 @@
+import asyncio
+import logging
+import threading
+import time
+
+import pytest
+
+from framework.async_executor import AsyncRemoteExecutor
+from framework.customizations.marks import tier1, tier3
+from framework.local_connection import LocalConnection
+from framework.remote_batch import RemoteBatch
+from framework.ssh_connection_manager import ConnectionPool
+
+log = logging.getLogger(__name__)
+
+
+class CountingConnection:
+    """
+    A connection that counts how many commands run on all its instances at once
+    """
+
+    lock = threading.Lock()
+    running = 0
+    max_running = 0
+
+    def exec_cmd(self, cmd):
+        cls = type(self)
+        with cls.lock:
+            cls.running += 1
+            cls.max_running = max(cls.max_running, cls.running)
+        time.sleep(0.02)
+        with cls.lock:
+            cls.running -= 1
+        if cmd == "fail":
+            raise OSError("Socket is closed")
+        return 0, cmd, ""
+
+    def close(self):
+        pass
+
+
+class TestAsyncRemoteExecutor:
+    """
+    Test running remote operations concurrently from asyncio code
+    """
+
+    @tier1
+    def test_gather_with_concurrency_limit(self, monkeypatch):
+        """
+        Test that gather returns the results in order, while no more than
+        concurrency operations run at once
+        """
+        monkeypatch.setattr(CountingConnection, "max_running", 0)
+        pool = ConnectionPool(CountingConnection, size=8)
+        cmds = [f"cmd-{i}" for i in range(12)]
+
+        async def _run_all():
+            async with AsyncRemoteExecutor(concurrency=3, pool=pool) as executor:
+                return await executor.gather(*[executor.run(cmd) for cmd in cmds])
+
+        results = asyncio.run(_run_all())
+
+        assert [stdout for _, stdout, _ in results] == cmds
+        assert CountingConnection.max_running == 3
+
+    @tier3
+    def test_gather_exceptions(self):
+        """
+        Test that a failed operation raises, or is returned if requested
+        """
+        pool = ConnectionPool(CountingConnection, size=2)
+
+        async def _run_all(return_exceptions):
+            async with AsyncRemoteExecutor(pool=pool) as executor:
+                return await executor.gather(
+                    executor.run("ok"),
+                    executor.run("fail"),
+                    return_exceptions=return_exceptions,
+                )
+
+        with pytest.raises(OSError):
+            asyncio.run(_run_all(False))
+        ok, failed = asyncio.run(_run_all(True))
+        assert ok == (0, "ok", "")
+        assert isinstance(failed, OSError)
+
+    @tier1
+    def test_batch_and_upload(self, tmp_path):
+        """
+        Test running a batch and uploading a file over pooled local connections
+        """
+        pool = ConnectionPool(LocalConnection, size=2)
+        local_file = tmp_path / "local"
+        local_file.write_text("content")
+        batch = RemoteBatch().add("echo one", name="one").add("exit 3", name="two")
+
+        async def _run_all():
+            async with AsyncRemoteExecutor(pool=pool) as executor:
+                await executor.upload(str(local_file), str(tmp_path / "remote"))
+                return await executor.run_batch(batch)
+
+        results = asyncio.run(_run_all())
+
+        assert [(r.name, r.retcode, r.stdout) for r in results] == [
+            ("one", 0, "one"),
+            ("two", 3, ""),
+        ]
+        assert (tmp_path / "remote").read_text() == "content"
@@ -0,0 +1,247 @@
+import functools
+import json
+import logging
+import os
+import shutil
+
+import pytest
+
+from framework.customizations.marks import tier1, tier3
+from framework.local_connection import LocalConnection
+from framework.noobaa_cli_batch import NoobaaCliBatch
+from noobaa_sa import bucket
+from noobaa_sa.bucket import BucketManager
+
+log = logging.getLogger(__name__)
+
+FAKE_SUDO = """\
+#!/bin/bash
+exec "$@"
+"""
+
+# Logs its arguments, replies to account status with a buckets path under
+# FS_ROOT, and fails bucket add for missing paths and bucket update for
+# buckets named missing-*
+FAKE_NOOBAA_CLI = """\
+#!/bin/bash
+echo "$*" >> "$CLI_LOG"
+resource=$1 action=$2
+shift 2
+while [ $# -gt 0 ]; do
+    case $1 in
+        --name) name=$2 ;;
+        --path) path=$2 ;;
+    esac
+    shift
+done
+case "$resource $action" in
+    "account status")
+        if [ "$name" = missing ]; then
+            echo '{"error": {"code": "NoSuchAccountName"}}'
+            exit 1
+        fi
+        echo "{\\"response\\": {\\"code\\": \\"AccountStatus\\", \\"reply\\": \\
+{\\"name\\": \\"$name\\", \\"_id\\": \\"id-$name\\", \\
+\\"nsfs_account_config\\": {\\"new_buckets_path\\": \\"$FS_ROOT\\"}}}}" ;;
+    "bucket add")
+        if [ ! -d "$path" ]; then
+            echo '{"error": {"code": "InvalidStoragePath"}}'
+            exit 1
+        fi
+        echo "{\\"response\\": {\\"code\\": \\"BucketCreated\\"}}" ;;
+    "bucket update")
+        if [[ $name == missing-* ]]; then
+            echo '{"error": {"code": "NoSuchBucket"}}'
+            exit 1
+        fi
+        echo "{\\"response\\": {\\"code\\": \\"BucketUpdated\\"}}" ;;
+esac
+"""
+
+STUB_MANAGE_NSFS = """\
+'use strict';
+const fs = require('fs');
+
+async function main(argv = process.argv.slice(2)) {
+    fs.appendFileSync(process.env.CLI_LOG, argv.join(' ') + '\\n');
+    const name = argv[argv.indexOf('--name') + 1];
+    const path = argv[argv.indexOf('--path') + 1];
+    const error = argv[1] === 'add' ?
+        !fs.existsSync(path) && 'InvalidStoragePath' :
+        name.startsWith('missing-') && 'NoSuchBucket';
+    const res = error ? { error: { code: error } } : { response: { code: 'OK' } };
+    process.stdout.write(JSON.stringify(res) + '\\n', () => process.exit(error ? 1 : 0));
+}
+
+exports.main = main;
+"""
+
+
+def _single_process_param():
+    return pytest.param(
+        True,
+        marks=pytest.mark.skipif(
+            not shutil.which("node"), reason="Node.js is not installed"
+        ),
+    )
+
+
+class TestBucketBulkOperations:
+    """
+    Test creating and updating buckets in bulk against a fake noobaa-cli on
+    the local machine
+    """
+
+    @pytest.fixture
+    def bucket_manager(self, tmp_path, monkeypatch):
+        bin_dir = tmp_path / "bin"
+        bin_dir.mkdir()
+        for name, script in [("sudo", FAKE_SUDO), ("noobaa-cli", FAKE_NOOBAA_CLI)]:
+            (bin_dir / name).write_text(script)
+            (bin_dir / name).chmod(0o755)
+        (tmp_path / "fs").mkdir()
+        monkeypatch.setenv("PATH", f"{bin_dir}:{os.environ['PATH']}")
+        monkeypatch.setenv("CLI_LOG", str(tmp_path / "cli.log"))
+        monkeypatch.setenv("FS_ROOT", str(tmp_path / "fs"))
+        monkeypatch.setattr(
+            bucket, "get_noobaa_sa_host_home_path", lambda: str(tmp_path)
+        )
+
+        src_dir = tmp_path / "noobaa-core" / "src" / "cmd"
+        src_dir.mkdir(parents=True)
+        (src_dir / "manage_nsfs.js").write_text(STUB_MANAGE_NSFS)
+        monkeypatch.setattr(
+            bucket,
+            "NoobaaCliBatch",
+            functools.partial(
+                NoobaaCliBatch,
+                noobaa_src=str(tmp_path / "noobaa-core"),
+                node=shutil.which("node"),
+                use_sudo=False,
+            ),
+        )
+
+        bucket_manager = BucketManager.__new__(BucketManager)
+        bucket_manager.manage_nsfs = str(bin_dir / "noobaa-cli")
+        # A config root per test, so the owners aren't found in the account cache
+        bucket_manager.config_root = str(tmp_path / "config_root")
+        bucket_manager.base_cmd = f"sudo {bucket_manager.manage_nsfs}"
+        bucket_manager.unwanted_log = "2>/dev/null"
+        bucket_manager.conn = LocalConnection()
+        bucket_manager.buckets_seeded = {}
+        return bucket_manager
+
+    def _cli_calls(self, tmp_path):
+        return (tmp_path / "cli.log").read_text().splitlines()
+
+    @tier1
+    @pytest.mark.parametrize("single_process", [False, _single_process_param()])
+    def test_create_many(self, bucket_manager, tmp_path, single_process):
+        """
+        Test creating buckets of several owners, with default, explicit and
+        custom paths:
+        1. Create buckets of two owners and of an owner that doesn't exist
+        2. Verify that each owner was looked up once
+        3. Verify the results in the order of the specs, with the buckets of
+           the missing owner failed
+        """
+        explicit_path = str(tmp_path / "explicit" / "bucket-3")
+        specs = [
+            {"bucket_name": "bucket-1", "account_name": "account-a"},
+            {"bucket_name": "bucket-2", "account_name": "missing"},
+            {
+                "bucket_name": "bucket-3",
+                "account_name": "account-b",
+                "path": explicit_path,
+            },
+            {
+                "bucket_name": "bucket-4",
+                "account_name": "account-a",
+                "custom_path": True,
+            },
+            {"bucket_name": "bucket-5", "account_name": "account-b"},
+        ]
+
+        results = bucket_manager.create_many(
+            specs, parallelism=2, single_process=single_process
+        )
+
+        assert [result["bucket_name"] for result in results] == [
+            spec["bucket_name"] for spec in specs
+        ]
+        assert [result["success"] for result in results] == [
+            True,
+            False,
+            True,
+            True,
+            True,
+        ], results
+        assert "Failed to get status" in results[1]["error"]
+        assert os.path.isdir(explicit_path)
+        assert os.path.isdir(tmp_path / "fs_account-a_bucket-4")
+        status_calls = [
+            call for call in self._cli_calls(tmp_path) if call.startswith("account")
+        ]
+        assert len(status_calls) == 3
+        add_calls = [call for call in self._cli_calls(tmp_path) if "bucket add" in call]
+        assert (
+            f"--path {tmp_path}/fs "
+            in next(call for call in add_calls if "--name bucket-1" in call) + " "
+        )
+
+        # The owners are cached now
+        bucket_manager.create_many(
+            [{"bucket_name": "bucket-6", "account_name": "account-a"}], parallelism=2
+        )
+        assert (
+            len([c for c in self._cli_calls(tmp_path) if c.startswith("account")]) == 3
+        )
+
+    @tier3
+    @pytest.mark.parametrize("single_process", [False, _single_process_param()])
+    def test_create_many_failed_path(self, bucket_manager, tmp_path, single_process):
+        """
+        Test that a bucket whose custom path can't be made fails alone
+        """
+        (tmp_path / "fs_account-a_bucket-2").write_text("")
+        specs = [
+            {
+                "bucket_name": f"bucket-{i}",
+                "account_name": "account-a",
+                "custom_path": True,
+            }
+            for i in range(1, 4)
+        ]
+
+        results = bucket_manager.create_many(
+            specs, parallelism=2, single_process=single_process
+        )
+
+        assert [result["success"] for result in results] == [True, False, True]
+        assert results[1]["error"]
+
+    @tier1
+    @pytest.mark.parametrize("single_process", [False, _single_process_param()])
+    def test_update_many(self, bucket_manager, tmp_path, single_process):
+        """
+        Test that each update gets its own result, in order
+        """
+        updates = [
+            {"bucket_name": "bucket-1", "new_name": "bucket-1-renamed"},
+            {"bucket_name": "missing-bucket", "new_name": "other"},
+            {"bucket_name": "bucket-2", "path": "/fs/new"},
+        ]
+
+        results = bucket_manager.update_many(
+            updates, parallelism=2, single_process=single_process
+        )
+
+        assert [(r["bucket_name"], r["success"]) for r in results] == [
+            ("bucket-1", True),
+            ("missing-bucket", False),
+            ("bucket-2", True),
+        ]
+        calls = self._cli_calls(tmp_path)
+        assert any("--name bucket-1 --new_name bucket-1-renamed" in c for c in calls)
+        assert any("--name bucket-2 --path /fs/new" in c for c in calls)
+        assert json.loads(results[1]["error"])["error"]["code"] == "NoSuchBucket"
@@ -1,6 +1,7 @@
 import logging
 import random
-from framework.customizations.marks import tier1
+from framework.customizations.marks import tier1, tier2
+from utility.bucket_inventory import BucketInventory
 from utility.bucket_utils import list_all_versions_of_the_object
 
 log = logging.getLogger(__name__)
@@ -433,3 +434,41 @@ class TestBucketVersioningOperations:
         log.info(
             "ETags of uploaded data response and head object response are identical"
         )
+
+    @tier2
+    def test_versioned_bucket_inventory(self, c_scope_s3client):
+        """
+        Test the local inventory of a versioned bucket:
+        1. Create regular bucket
+        2. Enable versioning on bucket
+        3. Upload 3 versions of an object and delete another object
+        4. Build the bucket inventory
+        5. Verify the inventory answers match the uploaded versions
+        """
+
+        # Create regular bucket and enable versioning on it
+        bucket = self.setup_versioned_bucket(c_scope_s3client)
+
+        # Upload 3 versions of an object and delete another object
+        version_ids = []
+        for i in range(3):
+            response = c_scope_s3client.put_object(
+                bucket, self.obj_name, f"{self.obj_data} {i}"
+            )
+            version_ids.append(response["VersionId"])
+        c_scope_s3client.put_object(bucket, "deleted_obj", self.obj_data)
+        c_scope_s3client.delete_object(bucket, "deleted_obj")
+
+        # Build the bucket inventory
+        inventory = BucketInventory(c_scope_s3client, bucket, versioned=True)
+        inventory.refresh()
+
+        # Verify the inventory answers match the uploaded versions
+        assert inventory.exists(self.obj_name), "Uploaded object missing from inventory"
+        assert not inventory.exists("deleted_obj"), "Deleted object is still listed"
+        assert (
+            inventory.get_latest_version(self.obj_name) == version_ids[-1]
+        ), "Latest version in inventory does not match the last uploaded version"
+        assert inventory.get_size(self.obj_name) == len(f"{self.obj_data} 2")
+        assert len(inventory.get_versions(self.obj_name)) == len(version_ids)
+        assert list(inventory.keys()) == [self.obj_name]
@@ -0,0 +1,149 @@
+import logging
+import threading
+import time
+
+import pytest
+
+from framework import config
+from framework.cluster_connection_manager import ClusterConnectionManager
+from framework.customizations.marks import tier1, tier3
+from noobaa_sa.exceptions import UnexpectedBehaviour
+
+log = logging.getLogger(__name__)
+
+HOSTS = ["host-1", "host-2", "host-3"]
+
+
+class FakeHostConnection:
+    """
+    A connection that records the commands it runs, and fails the
+    systemctl restart on a given host
+    """
+
+    def __init__(self, host, events, failing_host=None):
+        self.host = host
+        self.events = events
+        self.failing_host = failing_host
+
+    def exec_cmd(self, cmd):
+        self.events.append((self.host, cmd))
+        if "systemctl restart" in cmd and self.host == self.failing_host:
+            return 1, "", "Job for noobaa.service failed"
+        return 0, f"{cmd} on {self.host}", ""
+
+    def close(self):
+        pass
+
+
+class TestClusterConnectionManager:
+    """
+    Test running commands on all the hosts of a cluster
+    """
+
+    @pytest.fixture
+    def cluster(self, monkeypatch):
+        monkeypatch.setattr(ClusterConnectionManager, "_instance", None)
+        monkeypatch.setitem(config.ENV_DATA, "noobaa_sa_hosts", HOSTS)
+        cluster = ClusterConnectionManager()
+        cluster.events = []
+        cluster._connections = {
+            host: FakeHostConnection(host, cluster.events) for host in HOSTS
+        }
+        return cluster
+
+    @tier1
+    def test_broadcast(self, cluster):
+        """
+        Test that a command runs on every host, and a per-host command on each
+        """
+        results = cluster.broadcast("nproc")
+        assert results == {host: (0, f"nproc on {host}", "") for host in HOSTS}
+
+        results = cluster.broadcast(lambda host: f"ping {host}", hosts=HOSTS[1:])
+        assert list(results) == HOSTS[1:]
+        assert results["host-2"] == (0, "ping host-2 on host-2", "")
+
+        assert cluster.broadcast("nproc", hosts=[]) == {}
+        with pytest.raises(ValueError):
+            cluster.broadcast("nproc", hosts=["other-host"])
+
+    @tier1
+    def test_broadcast_concurrency(self, cluster):
+        """
+        Test that no more than concurrency hosts run the command at once
+        """
+        running = []
+        max_running = []
+        lock = threading.Lock()
+
+        def _exec_on(host, cmd):
+            with lock:
+                running.append(host)
+                max_running.append(len(running))
+            time.sleep(0.05)
+            with lock:
+                running.remove(host)
+            return 0, "", ""
+
+        cluster.exec_on = _exec_on
+        cluster.broadcast("nproc", concurrency=2)
+
+        assert max(max_running) == 2
+
+    @tier1
+    def test_rolling_restart(self, cluster):
+        """
+        Test that each host is ready again before the next one is restarted
+        """
+        results = cluster.rolling_restart(service="noobaa")
+
+        assert list(results) == HOSTS
+        assert cluster.events == [
+            event
+            for host in HOSTS
+            for event in [
+                (host, "sudo systemctl restart noobaa"),
+                (host, "sudo systemctl is-active --quiet noobaa"),
+            ]
+        ]
+
+    @tier3
+    def test_rolling_restart_stops_on_failure(self, cluster):
+        """
+        Test that a failed restart leaves the hosts after it untouched
+        """
+        for conn in cluster._connections.values():
+            conn.failing_host = "host-2"
+
+        with pytest.raises(UnexpectedBehaviour, match="Failed to restart"):
+            cluster.rolling_restart(service="noobaa")
+        assert {host for host, _ in cluster.events} == {"host-1", "host-2"}
+
+    @tier3
+    def test_rolling_waits_for_ready(self, cluster):
+        """
+        Test that rolling waits for a host to be ready, and times out if it isn't
+        """
+        checks = []
+
+        def _ready_on_third_check(conn):
+            checks.append(conn.host)
+            return checks.count(conn.host) >= 3
+
+        results = cluster.rolling(
+            lambda conn: conn.host,
+            hosts=["host-1"],
+            wait_for=_ready_on_third_check,
+            interval=0.01,
+        )
+        assert results == {"host-1": "host-1"}
+        assert checks == ["host-1"] * 3
+
+        with pytest.raises(UnexpectedBehaviour, match="host-2 is not ready"):
+            cluster.rolling(
+                lambda conn: None,
+                wait_for=lambda conn: conn.host != "host-2",
+                timeout=0.05,
+                interval=0.01,
+            )
+        assert cluster.rolling(lambda conn: None, hosts=[]) == {}
@@ -0,0 +1,135 @@
+import logging
+
+import pytest
+
+from framework.command_tracer import CommandTracer, classify_command
+from framework.customizations import reports
+from framework.customizations.marks import tier1
+
+log = logging.getLogger(__name__)
+
+
+class TestClassifyCommand:
+    """
+    Test classifying the remote commands to aggregate them by
+    """
+
+    @tier1
+    @pytest.mark.parametrize(
+        "cmd, command_class",
+        [
+            (
+                "sudo /usr/local/noobaa-core/bin/noobaa-cli account add --name a1",
+                "noobaa-cli account add",
+            ),
+            ("noobaa-cli bucket list --wide true", "noobaa-cli bucket list"),
+            ("sudo noobaa-cli --help", "noobaa-cli"),
+            ("sudo -E LC_ALL=C systemctl restart noobaa", "systemctl restart"),
+            ("systemctl", "systemctl"),
+            ("sudo getent passwd 1001", "getent"),
+            ("sudo", "other"),
+            ("", "other"),
+        ],
+    )
+    def test_classify_command(self, cmd, command_class):
+        """
+        Test that sudo and its options are skipped, and that noobaa-cli and
+        systemctl are classified by their subcommands
+        """
+        assert classify_command(cmd) == command_class
+
+
+class TestCommandTracer:
+    """
+    Test the aggregation of the traced remote calls
+    """
+
+    @tier1
+    def test_session_and_test_breakdown(self):
+        """
+        Test that the calls are aggregated per command class for the session
+        and for the current test only:
+        1. Record calls outside of a test and within two tests
+        2. Verify the breakdown of each test
+        3. Verify the breakdown of the whole session
+        """
+        tracer = CommandTracer()
+        tracer.record("getent", "getent passwd", 0.5, 10, 100, 0)
+        tracer.start_test("test_1")
+        tracer.record("noobaa-cli account add", "add a1", 1.0, 20, 200, 0)
+        tracer.record("noobaa-cli account add", "add a2", 2.0, 20, 200, 1)
+        tracer.record("upload", "a -> b", 0.25, 1000, 0, None)
+        breakdown = tracer.end_test()
+
+        assert breakdown == [
+            {
+                "command_class": "noobaa-cli account add",
+                "count": 2,
+                "total_time": 3.0,
+                "max_time": 2.0,
+                "bytes_in": 40,
+                "bytes_out": 400,
+                "failures": 1,
+            },
+            {
+                "command_class": "upload",
+                "count": 1,
+                "total_time": 0.25,
+                "max_time": 0.25,
+                "bytes_in": 1000,
+                "bytes_out": 0,
+                "failures": 1,
+            },
+        ]
+
+        tracer.start_test("test_2")
+        tracer.record("getent", "getent group", 4.0, 10, 100, 0)
+        assert [stats["count"] for stats in tracer.get_test_breakdown()] == [1]
+        tracer.end_test()
+
+        session = {s["command_class"]: s for s in tracer.get_session_breakdown()}
+        assert list(session) == ["getent", "noobaa-cli account add", "upload"]
+        assert session["getent"]["count"] == 2
+        assert session["getent"]["total_time"] == 4.5
+        assert tracer.end_test() == []
+
+    @tier1
+    def test_slowest_calls(self):
+        """
+        Test that only the top_n slowest calls are kept, with their tests
+        """
+        tracer = CommandTracer(top_n=3)
+        tracer.start_test("test_1")
+        for duration in [0.3, 0.1, 0.5, 0.2, 0.4, 0.5]:
+            tracer.record("getent", f"getent {duration}", duration, 0, 0, 0)
+        tracer.end_test()
+        tracer.record("getent", "getent 0.05", 0.05, 0, 0, 0)
+
+        slowest = tracer.get_slowest()
+        assert [record.duration for record in slowest] == [0.5, 0.5, 0.4]
+        assert {record.test for record in slowest} == {"test_1"}
+        assert [record.cmd for record in tracer.get_slowest(1)] == ["getent 0.5"]
+
+        tracer.reset()
+        assert tracer.get_slowest() == []
+        assert tracer.get_session_breakdown() == []
+
+    @tier1
+    def test_remote_commands_html(self, monkeypatch):
+        """
+        Test that the HTML report renders the breakdown and the slowest calls
+        with the commands escaped
+        """
+        tracer = CommandTracer()
+        monkeypatch.setattr(reports, "tracer", tracer)
+        assert reports.create_remote_commands_html().strip() == ""
+
+        tracer.start_test("test_1")
+        tracer.record("getent", "getent passwd <uid>", 1.5, 0, 0, 0)
+        tracer.end_test()
+        report = reports.create_remote_commands_html()
+
+        assert "<h2>Remote Commands</h2>" in report
+        assert "<h2>Slowest Remote Commands</h2>" in report
+        assert "<td>getent passwd &lt;uid&gt;</td>" in report
+        assert "<td>1.500 sec</td>" in report
@@ -0,0 +1,85 @@
+import logging
+
+from framework.customizations.marks import tier1
+from noobaa_sa.config_snapshot import ConfigSnapshot, SnapshotEntry
+
+log = logging.getLogger(__name__)
+
+
+def _file(sha256, size=10, mtime=1.0):
+    return SnapshotEntry("f", size, mtime, sha256)
+
+
+def _dir(mtime=1.0):
+    return SnapshotEntry("d", 4096, mtime, None)
+
+
+class TestConfigSnapshot:
+    """
+    Test the diffing of config root snapshots
+    """
+
+    before = ConfigSnapshot(
+        {
+            "accounts": _dir(),
+            "accounts/id-1.json": _file("a"),
+            "accounts_by_name/account-1.symlink": SnapshotEntry("l", 20, 1.0, None),
+            "buckets": _dir(),
+            "buckets/bucket-1.json": _file("b"),
+            "config.json": _file("c"),
+        },
+        {"fs_account-1": _dir()},
+    )
+
+    @tier1
+    def test_unchanged_snapshot(self):
+        """
+        Test that a snapshot has no changes compared to itself
+        """
+        diff = self.before.diff(self.before)
+
+        assert not diff
+        assert diff.format() == ""
+        assert not any(diff.created_resources().values())
+
+    @tier1
+    def test_created_resources(self):
+        """
+        Test that the created accounts, buckets, access keys and bucket paths
+        are picked out of the diff, while the other changes are only listed:
+        1. Take a snapshot with new resources and changed and deleted files
+        2. Diff it against the earlier snapshot
+        3. Verify the created resources and the listed changes
+        """
+        config_entries = dict(self.before.config_entries)
+        config_entries.update(
+            {
+                "accounts": _dir(mtime=2.0),
+                "accounts/id-2.json": _file("d"),
+                "accounts_by_name/account-2.symlink": SnapshotEntry("l", 20, 2, None),
+                "access_keys/AK2.symlink": SnapshotEntry("l", 20, 2, None),
+                "buckets/bucket-2.json": _file("e"),
+                "buckets/bucket-1.json": _file("changed", mtime=2.0),
+                "system.json": _file("f"),
+            }
+        )
+        # The content didn't change, only the mtime
+        config_entries["config.json"] = _file("c", mtime=2.0)
+        del config_entries["accounts/id-1.json"]
+        after = ConfigSnapshot(
+            config_entries,
+            {"fs_account-1": _dir(), "fs_account-2": _dir(), "fs_account-2/b": _dir()},
+        )
+
+        diff = after.diff(self.before)
+
+        assert diff.created_resources() == {
+            "accounts": ["id-2", "account-2"],
+            "buckets": ["bucket-2"],
+            "access_keys": ["AK2"],
+            "bucket_paths": ["fs_account-2"],
+        }
+        assert diff.modified == ["buckets/bucket-1.json"]
+        assert diff.deleted == ["accounts/id-1.json"]
+        assert "system.json" in diff.created
+        assert "created_bucket_paths (2):" in diff.format()
@@ -0,0 +1,111 @@
+import logging
+import os
+
+import pytest
+
+from framework.customizations.marks import tier1, tier3
+from framework.local_connection import LocalConnection
+from utility import linux_users
+from utility.linux_users import LinuxUserAllocator
+
+log = logging.getLogger(__name__)
+
+# Logs the commands instead of running them, and fails useradd if FAIL_USERADD is set
+FAKE_SUDO = """\
+#!/bin/bash
+echo "$*" >> "$SUDO_LOG"
+if [ "$1" = useradd ] && [ -n "$FAIL_USERADD" ]; then
+    echo "useradd: user already exists" >&2
+    exit 9
+fi
+"""
+
+HOST_FACTS = {
+    "users": {"root": (0, 0), "alice": (1000, 1000), "bob": (1002, 1001)},
+    "groups": {"root": 0, "alice": 1000, "wheel": 1003},
+}
+
+
+class TestLinuxUserAllocator:
+    """
+    Test allocating, creating and deleting Linux users in bulk
+    """
+
+    @pytest.fixture
+    def sudo_log(self, tmp_path, monkeypatch):
+        bin_dir = tmp_path / "bin"
+        bin_dir.mkdir()
+        (bin_dir / "sudo").write_text(FAKE_SUDO)
+        (bin_dir / "sudo").chmod(0o755)
+        monkeypatch.setenv("PATH", f"{bin_dir}:{os.environ['PATH']}")
+        monkeypatch.setenv("SUDO_LOG", str(tmp_path / "sudo.log"))
+        monkeypatch.setattr(linux_users, "get_host_facts", lambda conn: HOST_FACTS)
+        return tmp_path / "sudo.log"
+
+    @tier1
+    def test_allocate(self, sudo_log):
+        """
+        Test that the allocated uids, gids and usernames are free and unique
+        """
+        allocator = LinuxUserAllocator(LocalConnection(), id_range=(1000, 1005))
+        users = allocator.allocate(3)
+
+        uids, gids, usernames = zip(*users)
+        assert set(uids) <= {1001, 1003, 1004, 1005}
+        assert len(set(uids)) == 3
+        assert set(gids) <= {1001, 1002, 1004, 1005}
+        assert len(set(gids)) == 3
+        assert len(set(usernames)) == 3
+        assert all(len(username) == 8 for username in usernames)
+        assert not sudo_log.exists(), "Allocating shouldn't run any command"
+
+        with pytest.raises(ValueError, match="Not enough free"):
+            allocator.allocate(5)
+
+    @tier1
+    def test_create_and_cleanup(self, sudo_log):
+        """
+        Test creating users with their groups and deleting them:
+        1. Create two users
+        2. Verify that they are skipped by the next allocation
+        3. Delete the users and their groups
+        """
+        allocator = LinuxUserAllocator(LocalConnection(), id_range=(1000, 1005))
+        users = allocator.create(2)
+
+        assert allocator.created_users == users
+        commands = sudo_log.read_text().splitlines()
+        for uid, gid, username in users:
+            assert f"groupadd -g {gid} group_{username}" in commands
+            assert f"useradd -u {uid} -g {gid} {username}" in commands
+        ((uid, gid, username),) = allocator.allocate(1)
+        assert uid not in [user[0] for user in users]
+        assert gid not in [user[1] for user in users]
+
+        sudo_log.unlink()
+        allocator.cleanup()
+
+        commands = sudo_log.read_text().splitlines()
+        for _, _, username in users:
+            assert f"userdel {username}" in commands
+            assert f"groupdel group_{username}" in commands
+        assert allocator.created_users == []
+
+    @tier3
+    def test_failed_user_removes_its_group(self, sudo_log, monkeypatch):
+        """
+        Test that the group of a user that couldn't be created is deleted
+        """
+        monkeypatch.setenv("FAIL_USERADD", "1")
+        allocator = LinuxUserAllocator(LocalConnection())
+
+        with pytest.raises(ValueError, match="user already exists"):
+            allocator.create(1)
+
+        commands = sudo_log.read_text().splitlines()
+        assert [command.split()[0] for command in commands] == [
+            "groupadd",
+            "useradd",
+            "groupdel",
+        ]
+        assert allocator.created_users == []
@@ -0,0 +1,85 @@
+import logging
+
+import pytest
+
+from framework.customizations.marks import tier1, tier3
+from framework.local_connection import LocalConnection, is_local_host
+from noobaa_sa.exceptions import UnexpectedBehaviour
+
+log = logging.getLogger(__name__)
+
+
+class TestLocalConnection:
+    """
+    Test running the remote operations on the local machine
+    """
+
+    @tier1
+    def test_exec_cmd(self):
+        """
+        Test that commands run in bash and return their exit code and output
+        """
+        conn = LocalConnection()
+
+        assert conn.exec_cmd("echo out; echo err >&2") == (0, "out", "err")
+        assert conn.exec_cmd("[[ -n x ]] && exit 3") == (3, "", "")
+        retcode, stdout, _ = conn.exec_cmd("read line || echo no stdin")
+        assert (retcode, stdout) == (0, "no stdin")
+
+    @tier1
+    def test_exec_script(self):
+        """
+        Test that a script is fed to bash in full
+        """
+        script = "set -e\nfor i in 1 2 3; do echo $i; done\nfalse\necho unreachable\n"
+
+        assert LocalConnection().exec_script(script) == (1, "1\n2\n3", "")
+
+    @tier1
+    def test_upload_and_download_file(self, tmp_path):
+        """
+        Test copying files to and from their target paths
+        """
+        conn = LocalConnection()
+        source = tmp_path / "source"
+        source.write_bytes(b"\x00data\xff")
+
+        conn.upload_file(str(source), str(tmp_path / "uploaded"))
+        conn.download_file(str(tmp_path / "uploaded"), str(tmp_path / "downloaded"))
+
+        assert (tmp_path / "downloaded").read_bytes() == b"\x00data\xff"
+
+    @tier1
+    def test_exec_cmd_stream(self):
+        """
+        Test that the output is streamed in chunks of at most chunk_size bytes,
+        without splitting multi-byte characters
+        """
+        conn = LocalConnection()
+        chunks = list(conn.exec_cmd_stream("printf 'ab€cd€'", chunk_size=2))
+
+        assert "".join(chunks) == "ab€cd€"
+        assert all(len(chunk.encode()) <= 4 for chunk in chunks)
+
+    @tier3
+    def test_exec_cmd_stream_failure(self):
+        """
+        Test that a failed command raises once its output was yielded
+        """
+        chunks = []
+        with pytest.raises(UnexpectedBehaviour, match="retcode 2.*\n.*no such"):
+            for chunk in LocalConnection().exec_cmd_stream(
+                "echo partial; echo no such file >&2; exit 2"
+            ):
+                chunks.append(chunk)
+
+        assert "".join(chunks) == "partial\n"
+
+    @tier1
+    def test_is_local_host(self):
+        """
+        Test telling local host names from unresolvable ones
+        """
+        assert is_local_host("localhost")
+        assert is_local_host("127.0.0.1")
+        assert not is_local_host("no-such-host.invalid")
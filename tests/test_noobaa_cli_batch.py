@@ -0,0 +1,165 @@
+import json
+import logging
+import shutil
+
+import pytest
+
+from framework.customizations.marks import tier1, tier3
+from framework.local_connection import LocalConnection
+from framework.noobaa_cli_batch import NoobaaCliBatch, _parse_cli_command
+from utility.host_facts import get_host_facts
+
+log = logging.getLogger(__name__)
+
+# A stub with the structure of noobaa-core's manage_nsfs: main() catches its
+# errors, and the response is written with a callback that exits
+STUB_MANAGE_NSFS = """\
+'use strict';
+
+async function main(argv = process.argv.slice(2)) {
+    try {
+        await new Promise(resolve => setTimeout(resolve, 1));
+        const [type, action] = argv;
+        if (type === 'crash') {
+            return Promise.reject(new Error('crashed outside of the try'));
+        }
+        if (type === 'noexit') {
+            process.exitCode = 4;
+            return;
+        }
+        if (action !== 'status') throw new Error(`invalid action ${action}`);
+        write_stdout_response({ type, args: argv });
+    } catch (err) {
+        throw_cli_error({ code: 'InvalidAction', message: err.message });
+    }
+}
+
+function write_stdout_response(reply) {
+    const res = JSON.stringify({ response: { code: 'OK', reply } });
+    process.stdout.write(res + '\\n', () => process.exit(0));
+}
+
+function throw_cli_error(error) {
+    const res = JSON.stringify({ error });
+    process.stdout.write(res + '\\n', () => process.exit(1));
+}
+
+exports.main = main;
+if (require.main === module) main();
+"""
+
+
+class TestNoobaaCliCommands:
+    """
+    Test turning noobaa-cli commands into batch operations
+    """
+
+    @tier1
+    @pytest.mark.parametrize(
+        "cmd",
+        [
+            "sudo /usr/local/noobaa-core/bin/noobaa-cli bucket list --wide true",
+            "sudo -E noobaa-cli bucket list --wide true 2>/dev/null",
+            "noobaa-cli bucket list --wide true 2> /dev/null",
+            "noobaa-cli bucket list > /tmp/out 2>&1 --wide true",
+            "noobaa-cli bucket list --wide true >> /tmp/out < /dev/null",
+            "noobaa-cli bucket list &> /tmp/out --wide true",
+        ],
+    )
+    def test_parse_cli_command(self, cmd):
+        """
+        Test that sudo, the executable and the redirections with their
+        targets are dropped
+        """
+        assert _parse_cli_command(cmd) == ["bucket", "list", "--wide", "true"]
+
+    @tier3
+    def test_unsupported_run_options(self):
+        """
+        Test that a parallelism or stop_on_failure is rejected
+        """
+        cli_batch = NoobaaCliBatch(LocalConnection()).add(["bucket", "list"])
+
+        with pytest.raises(ValueError):
+            cli_batch.run(parallelism=4)
+        with pytest.raises(ValueError):
+            cli_batch.run(stop_on_failure=True)
+
+
+@pytest.mark.skipif(not shutil.which("node"), reason="Node.js is not installed")
+class TestNoobaaCliBatch:
+    """
+    Test the noobaa-cli batch runner against a stub of manage_nsfs
+    """
+
+    @pytest.fixture
+    def cli_batch(self, tmp_path):
+        cmd_dir = tmp_path / "src" / "cmd"
+        cmd_dir.mkdir(parents=True)
+        (cmd_dir / "manage_nsfs.js").write_text(STUB_MANAGE_NSFS)
+        return NoobaaCliBatch(
+            LocalConnection(),
+            noobaa_src=str(tmp_path),
+            node=shutil.which("node"),
+            use_sudo=False,
+        )
+
+    @tier1
+    def test_operation_results(self, cli_batch):
+        """
+        Test that each operation gets the exit code and output it would get
+        from noobaa-cli:
+        1. Queue successful, failing and crashing operations
+        2. Run them in a single process
+        3. Verify the exit code and output of each operation
+        """
+        cli_batch.add(["account", "status", "--name", "a1"], name="ok")
+        cli_batch.add("sudo /x/noobaa-cli bucket status --name b1 2>/dev/null")
+        cli_batch.add(["account", "delete"], name="failing")
+        cli_batch.add(["crash"], name="crash")
+        cli_batch.add(["noexit"], name="noexit")
+        cli_batch.add(["bucket", "status"], name="after")
+        results = {result.name: result for result in cli_batch.run()}
+
+        assert results["ok"].retcode == 0, results["ok"]
+        reply = json.loads(results["ok"].stdout)["response"]["reply"]
+        assert reply["args"] == ["account", "status", "--name", "a1"]
+        assert results["1"].retcode == 0
+        assert json.loads(results["1"].stdout)["response"]["reply"]["args"] == [
+            "bucket",
+            "status",
+            "--name",
+            "b1",
+        ]
+        assert results["failing"].retcode == 1
+        error = json.loads(results["failing"].stdout)["error"]
+        assert error["code"] == "InvalidAction"
+        assert results["crash"].retcode == 1
+        assert "crashed outside of the try" in results["crash"].stdout
+        assert results["noexit"].retcode == 4
+        assert results["after"].retcode == 0
+        assert all(result.duration is not None for result in results.values())
+
+    @tier1
+    def test_home_dir_expansion(self, cli_batch):
+        """
+        Test that ~ is expanded to the home dir of the connected user, as the
+        shell does for noobaa-cli
+        """
+        cli_batch.add(["account", "status", "--config_root", "~/config_root"])
+        (result,) = cli_batch.run()
+
+        home_dir = get_host_facts(cli_batch.conn)["home_dir"]
+        reply = json.loads(result.stdout)["response"]["reply"]
+        assert reply["args"][-1] == f"{home_dir}/config_root"
+
+    @tier1
+    def test_missing_noobaa_core(self, cli_batch, tmp_path):
+        """
+        Test that the operations of a runner that fails to start have no retcode
+        """
+        cli_batch.noobaa_src = str(tmp_path / "missing")
+        cli_batch.add(["account", "list"]).add(["bucket", "list"])
+        results = cli_batch.run()
+
+        assert [result.retcode for result in results] == [None, None]
@@ -0,0 +1,74 @@
+import logging
+
+from framework.customizations.marks import tier1
+from noobaa_sa.records import AccountRecord, BucketRecord, RecordListing
+
+log = logging.getLogger(__name__)
+
+
+class TestRecordListing:
+    """
+    Test the lookups of bucket and account record listings
+    """
+
+    buckets = [
+        {"name": "bucket-1", "owner_account": "id-1", "bucket_owner": "account-1"},
+        {"name": "bucket-2", "owner_account": "id-1", "bucket_owner": "account-1"},
+        # Older versions only record the owner by name
+        {"name": "bucket-3", "bucket_owner": "account-2", "path": "/fs/bucket-3"},
+    ]
+
+    @tier1
+    def test_bucket_listing_lookups(self):
+        """
+        Test looking up bucket records by name and by field values
+        """
+        listing = RecordListing(BucketRecord.from_dict(b) for b in self.buckets)
+
+        assert len(listing) == 3
+        assert listing.names() == ["bucket-1", "bucket-2", "bucket-3"]
+        assert "bucket-2" in listing and "bucket-4" not in listing
+        assert listing.get("bucket-3").path == "/fs/bucket-3"
+        assert listing.get("bucket-4") is None
+        assert [b.name for b in listing.find("owner", "id-1")] == [
+            "bucket-1",
+            "bucket-2",
+        ]
+        assert [b.name for b in listing.find("owner", "account-2")] == ["bucket-3"]
+        assert [b.name for b in listing.find("owner_name", "account-1")] == [
+            "bucket-1",
+            "bucket-2",
+        ]
+        assert listing.find("owner", "id-3") == []
+
+    @tier1
+    def test_find_results_are_copies(self):
+        """
+        Test that changing the result of a lookup doesn't change the index
+        """
+        listing = RecordListing(BucketRecord.from_dict(b) for b in self.buckets)
+        listing.find("owner", "id-1").clear()
+
+        assert len(listing.find("owner", "id-1")) == 2
+
+    @tier1
+    def test_account_listing(self):
+        """
+        Test building account records from a wide account listing
+        """
+        accounts = [
+            {
+                "name": "account-1",
+                "_id": "id-1",
+                "nsfs_account_config": {"new_buckets_path": "/fs"},
+            },
+            {"name": "account-2", "_id": "id-2"},
+        ]
+        listing = RecordListing(AccountRecord.from_dict(a) for a in accounts)
+
+        assert listing.get("account-1").id == "id-1"
+        assert listing.get("account-2").new_buckets_path is None
+        assert [a.name for a in listing.find("new_buckets_path", "/fs")] == [
+            "account-1"
+        ]
+        assert [a.name for a in listing] == ["account-1", "account-2"]
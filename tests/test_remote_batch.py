@@ -0,0 +1,87 @@
+import logging
+
+from framework.customizations.marks import tier1, tier3
+from framework.local_connection import LocalConnection
+from framework.remote_batch import RemoteBatch
+
+log = logging.getLogger(__name__)
+
+
+class TestRemoteBatch:
+    """
+    Test the framing of remote batches, run through a local connection
+    """
+
+    conn = LocalConnection()
+
+    @tier1
+    def test_batch_results_framing(self):
+        """
+        Test that each command's result is parsed back intact:
+        1. Queue commands with multiline output, error output and exit codes
+        2. Run the batch
+        3. Verify the results are in order and match each command
+        """
+        batch = RemoteBatch(self.conn)
+        batch.add("printf 'line 1\\nline 2 @@ with spaces\\n'", name="multiline")
+        batch.add("echo error >&2; exit 3", name="failing")
+        batch.add("printf '\\303\\251t\\303\\251'")
+        results = batch.run()
+
+        assert [result.name for result in results] == ["multiline", "failing", "2"]
+        multiline, failing, unnamed = results
+        assert multiline.retcode == 0
+        assert multiline.stdout == "line 1\nline 2 @@ with spaces"
+        assert failing.retcode == 3
+        assert failing.stdout == "" and failing.stderr == "error"
+        assert unnamed.stdout == "été"
+        assert all(result.duration >= 0 for result in results)
+
+    @tier1
+    def test_parallel_batch(self):
+        """
+        Test that a parallel batch runs all the commands and keeps their order
+        """
+        batch = RemoteBatch(self.conn)
+        for i in range(20):
+            batch.add(f"sleep 0.0{i % 3}; echo {i}", name=f"cmd-{i}")
+        results = batch.run(parallelism=4)
+
+        assert [result.name for result in results] == [f"cmd-{i}" for i in range(20)]
+        assert [result.stdout for result in results] == [str(i) for i in range(20)]
+        assert all(result.retcode == 0 for result in results)
+
+    @tier3
+    def test_stop_on_failure(self):
+        """
+        Test that the commands after the first failure don't run and have a
+        retcode of None
+        """
+        batch = RemoteBatch(self.conn)
+        batch.add("true").add("false").add("echo skipped")
+        first, failing, skipped = batch.run(stop_on_failure=True)
+
+        assert first.retcode == 0
+        assert failing.retcode == 1
+        assert skipped.retcode is None and skipped.duration is None
+
+    @tier1
+    def test_batch_file_writes(self, tmp_path):
+        """
+        Test writing single files and archives through a batch
+        """
+        batch = RemoteBatch(self.conn)
+        batch.add_file(str(tmp_path / "single"), b"\x00binary\n", use_sudo=False)
+        batch.add_archive(
+            str(tmp_path / "archive"),
+            {"dir/a.json": '{"a": 1}', "b.json": "b"},
+            use_sudo=False,
+            symlinks={"link.json": "b.json"},
+        )
+        results = batch.run()
+
+        assert all(result.retcode == 0 for result in results), results
+        assert (tmp_path / "single").read_bytes() == b"\x00binary\n"
+        assert (tmp_path / "archive/dir/a.json").read_text() == '{"a": 1}'
+        assert (tmp_path / "archive/link.json").read_text() == "b"
+        assert (tmp_path / "archive/b.json").stat().st_mode & 0o777 == 0o600
@@ -0,0 +1,109 @@
+import json
+import logging
+
+import pytest
+
+from framework.customizations.marks import tier1, tier3
+from framework.remote_stream import iter_json_array_items, iter_lines
+
+log = logging.getLogger(__name__)
+
+REPLY_ITEMS = [
+    {"name": "bucket-1", "path": '/fs/a "quoted" ], path', "size": 12},
+    "a string with ] and , inside",
+    1234567,
+    -0.5,
+    True,
+    None,
+    [1, [2, 3]],
+]
+RESPONSE = json.dumps({"response": {"code": "BucketList", "reply": REPLY_ITEMS}})
+
+
+def _split(text, size):
+    return [text[i : i + size] for i in range(0, len(text), size)]
+
+
+class TestIterJsonArrayItems:
+    """
+    Test the incremental parsing of JSON arrays out of a stream of chunks
+    """
+
+    @tier1
+    @pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 16, 64, len(RESPONSE)])
+    def test_any_chunk_split(self, chunk_size):
+        """
+        Test that the items are parsed the same wherever the chunks split,
+        including within the key, a string, a number and the closing bracket
+        """
+        items = list(iter_json_array_items(_split(RESPONSE, chunk_size)))
+
+        assert items == REPLY_ITEMS
+
+    @tier1
+    def test_number_split_before_closing_bracket(self):
+        """
+        Test that a number cut between chunks is parsed whole
+        """
+        chunks = ['{"reply": [1, 12', "34", "5", "]", "}"]
+
+        assert list(iter_json_array_items(chunks)) == [1, 12345]
+
+    @tier1
+    def test_empty_array_and_other_key(self):
+        """
+        Test an empty array, and parsing the array of another key
+        """
+        assert list(iter_json_array_items(['{"reply": [', "]}"])) == []
+        chunks = _split('{"meta": {"ids": [1, 2]}, "reply": [3]}', 4)
+        assert list(iter_json_array_items(chunks, key="ids")) == [1, 2]
+
+    @tier3
+    def test_missing_key(self):
+        """
+        Test that a stream without the key fails instead of yielding nothing
+        """
+        error = json.dumps({"error": {"code": "InternalError", "message": "failed"}})
+
+        with pytest.raises(json.JSONDecodeError):
+            list(iter_json_array_items(_split(error, 5)))
+        with pytest.raises(json.JSONDecodeError):
+            list(iter_json_array_items([]))
+
+    @tier3
+    def test_truncated_array(self):
+        """
+        Test that a stream that ends within the array fails
+        """
+        with pytest.raises(json.JSONDecodeError):
+            list(iter_json_array_items(['{"reply": [{"name": "b1"}, {"na']))
+        with pytest.raises(json.JSONDecodeError):
+            list(iter_json_array_items(['{"reply": [1, 2']))
+
+    @tier3
+    def test_stream_error_after_array(self):
+        """
+        Test that an error raised by the stream after the array is propagated
+        """
+
+        def _chunks():
+            yield '{"reply": [1]}'
+            raise OSError("The command failed")
+
+        with pytest.raises(OSError):
+            list(iter_json_array_items(_chunks()))
+
+
+class TestIterLines:
+    """
+    Test splitting a stream of chunks into lines
+    """
+
+    @tier1
+    def test_lines_split_across_chunks(self):
+        """
+        Test lines split across chunks, empty lines and a last unterminated line
+        """
+        chunks = ["fir", "st\nsec", "ond\n\nthi", "rd"]
+
+        assert list(iter_lines(chunks)) == ["first", "second", "", "third"]
@@ -1,6 +1,7 @@
 import logging
 import os
 import tempfile
+import time
 from datetime import datetime, timedelta, timezone
 
 import pytest
@@ -11,6 +12,8 @@ from common_ci_utils.random_utils import (
     generate_random_hex,
     generate_unique_resource_name,
 )
+from noobaa_sa.bucket import BucketManager
+from utility.nsfs_server_utils import download_bucket_path
 
 log = logging.getLogger(__name__)
 
@@ -265,6 +268,133 @@ class TestS3ObjectOperations:
             md5sums_match = compare_md5sums(original_full_path, downloaded_full_path)
             assert md5sums_match, f"MD5 sums do not match for {original}"
 
+    @tier2
+    def test_on_disk_data_integrity(self, c_scope_s3client, tmp_directories_factory):
+        """
+        Test that objects written via S3 are stored intact on the bucket path:
+        1. Put random objects to a bucket
+        2. Download the on-disk contents of the bucket path from the NooBaa host
+        3. Compare the MD5 sums of the original objects and their on-disk files
+
+        """
+        origin_dir, on_disk_dir = tmp_directories_factory(
+            dirs_to_create=["origin", "on_disk"]
+        )
+        bucket = c_scope_s3client.create_bucket()
+
+        # 1. Put random objects to a bucket
+        original_objs_names = c_scope_s3client.put_random_objects(
+            bucket, amount=10, min_size="1M", max_size="2M", files_dir=origin_dir
+        )
+
+        # 2. Download the on-disk contents of the bucket path from the NooBaa host
+        bucket_status = BucketManager().status(bucket)
+        bucket_path = bucket_status["response"]["reply"]["path"]
+        download_bucket_path(bucket_path, on_disk_dir)
+
+        # 3. Compare the MD5 sums of the original objects and their on-disk files
+        for obj_name in original_objs_names:
+            on_disk_path = os.path.join(on_disk_dir, obj_name)
+            assert os.path.isfile(on_disk_path), f"{obj_name} is missing on disk"
+            assert compare_md5sums(
+                os.path.join(origin_dir, obj_name), on_disk_path
+            ), f"MD5 sums do not match for {obj_name} on disk"
+
+    @tier2
+    def test_walk_hierarchical_listing(self, c_scope_s3client):
+        """
+        Test walking a bucket hierarchy level by level:
+        1. Put random objects under several nested prefixes
+        2. List the whole bucket via a flat paginated listing
+        3. List the whole bucket via a concurrent hierarchical walk
+        4. Verify that both listings returned the same objects
+
+        """
+        bucket = c_scope_s3client.create_bucket()
+
+        # 1. Put random objects under several nested prefixes
+        written_keys = []
+        for prefix in ["", "a/", "a/b/", "a/b/c/", "d/", "d/e/"]:
+            objs = c_scope_s3client.put_random_objects(
+                bucket, amount=3, min_size="1K", max_size="1K", prefix=prefix
+            )
+            written_keys.extend(f"{prefix}{obj}" for obj in objs)
+
+        # 2. List the whole bucket via a flat paginated listing
+        start_time = time.time()
+        flat_keys = [obj["Key"] for obj in c_scope_s3client.iter_objects(bucket)]
+        log.info(f"Flat listing took {time.time() - start_time:.3f} seconds")
+
+        # 3. List the whole bucket via a concurrent hierarchical walk
+        start_time = time.time()
+        walked_keys = [
+            obj["Key"] for obj in c_scope_s3client.walk(bucket, concurrency=4)
+        ]
+        log.info(f"Hierarchical walk took {time.time() - start_time:.3f} seconds")
+
+        # 4. Verify that both listings returned the same objects
+        assert sorted(flat_keys) == sorted(written_keys), (
+            "Flat listing did not match the written objects",
+            flat_keys,
+        )
+        assert sorted(walked_keys) == sorted(written_keys), (
+            "Hierarchical walk did not match the written objects",
+            walked_keys,
+        )
+
+    @tier2
+    def test_sync_transfers_only_differences(
+        self, c_scope_s3client, tmp_directories_factory
+    ):
+        """
+        Test the differential sync between a local directory and a bucket:
+        1. Sync a directory of random files to a bucket
+        2. Sync again and verify that nothing was transferred
+        3. Modify one file, remove another and sync with deletion
+        4. Verify that only the differences were transferred and deleted
+        5. Sync the bucket back down and verify the data integrity
+
+        """
+        origin_dir, results_dir = tmp_directories_factory(
+            dirs_to_create=["origin", "result"]
+        )
+        bucket = c_scope_s3client.create_bucket()
+        file_names = generate_random_files(
+            origin_dir, amount=5, min_size="1K", max_size="10K"
+        )
+
+        # 1. Sync a directory of random files to a bucket
+        summary = c_scope_s3client.sync(origin_dir, bucket, prefix="dataset")
+        assert sorted(summary["transferred"]) == sorted(file_names), summary
+
+        # 2. Sync again and verify that nothing was transferred
+        summary = c_scope_s3client.sync(origin_dir, bucket, prefix="dataset")
+        assert summary["transferred"] == [], summary
+        assert summary["skipped"] == len(file_names), summary
+
+        # 3. Modify one file, remove another and sync with deletion
+        with open(os.path.join(origin_dir, file_names[0]), "ab") as f:
+            f.write(b"modified")
+        os.remove(os.path.join(origin_dir, file_names[1]))
+        summary = c_scope_s3client.sync(
+            origin_dir, bucket, prefix="dataset", delete=True
+        )
+
+        # 4. Verify that only the differences were transferred and deleted
+        assert summary["transferred"] == [file_names[0]], summary
+        assert summary["deleted"] == [file_names[1]], summary
+
+        # 5. Sync the bucket back down and verify the data integrity
+        c_scope_s3client.sync(
+            results_dir, bucket, prefix="dataset", direction="download"
+        )
+        for file_name in file_names[:1] + file_names[2:]:
+            assert compare_md5sums(
+                os.path.join(origin_dir, file_name),
+                os.path.join(results_dir, file_name),
+            ), f"MD5 sums do not match for {file_name}"
+        assert not os.path.exists(os.path.join(results_dir, file_names[1]))
+
     @tier3
     def test_expected_put_and_get_failures(self, c_scope_s3client):
         """
@@ -339,3 +469,35 @@ class TestS3ObjectOperations:
             "Attempting to copy a non existing object did not fail as expected",
             response,
         )
+
+    @tier2
+    @pytest.mark.parametrize(
+        "transfer_profile", ["signed", "unsigned", "crc32", "sha256"]
+    )
+    def test_put_object_transfer_profiles(self, c_scope_s3client, transfer_profile):
+        """
+        Test putting objects with the different S3 transfer profiles:
+        1. Put an object using the transfer profile
+        2. Get the object and verify its content matches the original
+        3. Verify the client CPU cost of the profile was recorded
+
+        """
+        bucket = c_scope_s3client.create_bucket()
+        obj_name = generate_unique_resource_name(prefix="obj")
+        obj_data = os.urandom(8 * 1024 * 1024)
+        c_scope_s3client.reset_transfer_stats()
+
+        # 1. Put an object using the transfer profile
+        response = c_scope_s3client.put_object(
+            bucket, obj_name, body=obj_data, transfer_profile=transfer_profile
+        )
+        assert response["Code"] == 200, f"put_object failed: {response}"
+
+        # 2. Get the object and verify its content matches the original
+        response = c_scope_s3client.get_object(bucket, obj_name)
+        assert response["Body"].read() == obj_data, "Object content does not match"
+
+        # 3. Verify the client CPU cost of the profile was recorded
+        report = c_scope_s3client.get_transfer_cpu_report()
+        log.info(f"Transfer CPU report: {report}")
+        assert report[transfer_profile]["bytes"] == len(obj_data), report
@@ -0,0 +1,107 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from framework.customizations.marks import tier1, tier3
+from utility.single_flight import SingleFlight
+
+log = logging.getLogger(__name__)
+
+
+def _wait_for(condition, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "Timed out waiting for the condition"
+        time.sleep(0.01)
+
+
+class TestSingleFlight:
+    """
+    Test the coalescing of identical concurrent calls
+    """
+
+    callers = 8
+
+    def _run_blocked_calls(self, single_flight, func, key="key"):
+        """
+        Issue concurrent calls for a key while the first one is blocked
+
+        Returns:
+            list: The futures of the calls, once they all completed
+        """
+        release = threading.Event()
+
+        def _blocked_func():
+            release.wait(10)
+            return func()
+
+        with ThreadPoolExecutor(max_workers=self.callers) as executor:
+            futures = [
+                executor.submit(single_flight.do, key, _blocked_func)
+                for _ in range(self.callers)
+            ]
+            # Release the leader only once all the others wait for it
+            _wait_for(lambda: single_flight.coalesced_calls == self.callers - 1)
+            release.set()
+        return futures
+
+    @tier1
+    def test_concurrent_calls_are_coalesced(self):
+        """
+        Test that concurrent calls of a key execute once:
+        1. Issue concurrent calls for the same key while the first is in flight
+        2. Verify the function was executed once
+        3. Verify all the callers got its result, and only one as the leader
+        4. Verify the counters
+        """
+        single_flight = SingleFlight()
+        executions = []
+
+        def _func():
+            executions.append(1)
+            return "result"
+
+        futures = self._run_blocked_calls(single_flight, _func)
+
+        assert len(executions) == 1, "The function was executed more than once"
+        results = [future.result() for future in futures]
+        assert all(result == "result" for result, _ in results)
+        assert sum(not shared for _, shared in results) == 1
+        assert single_flight.get_stats() == {
+            "executed_calls": 1,
+            "coalesced_calls": self.callers - 1,
+        }
+
+    @tier1
+    def test_calls_are_not_cached(self):
+        """
+        Test that a completed call isn't reused by the next call of the key
+        """
+        single_flight = SingleFlight()
+        counter = iter(range(10))
+
+        assert single_flight.do("key", lambda: next(counter)) == (0, False)
+        assert single_flight.do("key", lambda: next(counter)) == (1, False)
+        assert single_flight.do("other", lambda: next(counter)) == (2, False)
+        assert single_flight.get_stats() == {"executed_calls": 3, "coalesced_calls": 0}
+
+    @tier3
+    def test_error_is_shared_with_waiters(self):
+        """
+        Test that the exception of a call reaches all the coalesced callers,
+        and that the key is released for the next call
+        """
+        single_flight = SingleFlight()
+
+        def _func():
+            raise ValueError("failed call")
+
+        futures = self._run_blocked_calls(single_flight, _func)
+
+        for future in futures:
+            with pytest.raises(ValueError, match="failed call"):
+                future.result()
+        assert single_flight.do("key", lambda: "retried") == ("retried", False)
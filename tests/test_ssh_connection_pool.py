@@ -0,0 +1,169 @@
+import itertools
+import logging
+import queue
+import threading
+import time
+
+import pytest
+
+from framework import config
+from framework.customizations.marks import tier1, tier3
+from framework.ssh_connection_manager import ConnectionPool, SSHConnectionManager
+
+log = logging.getLogger(__name__)
+
+
+class FakeTransport:
+    def __init__(self):
+        self.active = True
+
+    def is_active(self):
+        return self.active
+
+
+class FakeClient:
+    def __init__(self):
+        self.transport = FakeTransport()
+
+    def get_transport(self):
+        return self.transport
+
+
+class FakeConnection:
+    """
+    A connection that echoes the commands it runs
+    """
+
+    _ids = itertools.count()
+
+    def __init__(self):
+        self.id = next(self._ids)
+        self.host = "fake-host"
+        self.client = FakeClient()
+        self.closed = False
+
+    def exec_cmd(self, cmd):
+        time.sleep(0.01)
+        return 0, f"{cmd} on {self.id}", ""
+
+    def close(self):
+        self.closed = True
+
+
+class TestConnectionPool:
+    """
+    Test checking connections out of the connection pool
+    """
+
+    @tier1
+    def test_size_cap(self):
+        """
+        Test that the pool creates up to size connections and reuses them
+        """
+        created = []
+
+        def _factory():
+            created.append(FakeConnection())
+            return created[-1]
+
+        pool = ConnectionPool(_factory, size=2)
+        with pool.checkout() as first, pool.checkout() as second:
+            assert first is not second
+            with pytest.raises(queue.Empty):
+                with pool.checkout(timeout=0.1):
+                    pass
+        with pool.checkout() as conn:
+            assert conn in (first, second)
+        assert len(created) == 2
+
+    @tier1
+    def test_blocked_checkout(self):
+        """
+        Test that a checkout of a full pool waits for a connection to be returned
+        """
+        pool = ConnectionPool(FakeConnection, size=1)
+        checked_out = []
+        with pool.checkout() as conn:
+            waiter = threading.Thread(
+                target=lambda: checked_out.append(pool.checkout().__enter__())
+            )
+            waiter.start()
+            time.sleep(0.1)
+            assert not checked_out, "The checkout didn't wait for the connection"
+        waiter.join(5)
+        assert checked_out == [conn]
+
+    @tier3
+    def test_failed_connection_is_replaced(self):
+        """
+        Test that a connection that raised is closed and replaced, also for
+        a checkout that was waiting for it
+        """
+        pool = ConnectionPool(FakeConnection, size=1)
+        with pytest.raises(OSError):
+            with pool.checkout() as broken:
+                raise OSError("Socket is closed")
+        assert broken.closed
+        with pool.checkout() as conn:
+            assert conn is not broken
+
+    @tier3
+    def test_dropped_transport_is_replaced(self):
+        """
+        Test that an idle connection whose transport dropped isn't handed out
+        """
+        pool = ConnectionPool(FakeConnection, size=2)
+        with pool.checkout() as dropped:
+            pass
+        dropped.client.transport.active = False
+        with pool.checkout() as conn:
+            assert conn is not dropped
+        assert dropped.closed
+
+    @tier3
+    def test_failed_connect_keeps_the_slot(self):
+        """
+        Test that a failed connection attempt doesn't shrink the pool
+        """
+        attempts = []
+
+        def _factory():
+            attempts.append(1)
+            if len(attempts) == 1:
+                raise OSError("Connection refused")
+            return FakeConnection()
+
+        pool = ConnectionPool(_factory, size=1)
+        with pytest.raises(OSError):
+            with pool.checkout(timeout=1):
+                pass
+        with pool.checkout(timeout=1) as conn:
+            assert isinstance(conn, FakeConnection)
+
+
+class TestExecMany:
+    """
+    Test running commands concurrently over the connection pool
+    """
+
+    @pytest.fixture
+    def manager(self, monkeypatch):
+        monkeypatch.setattr(SSHConnectionManager, "_instance", None)
+        monkeypatch.setitem(config.ENV_DATA, "noobaa_sa_host", "fake-host")
+        manager = SSHConnectionManager()
+        manager._pool = ConnectionPool(FakeConnection, size=3)
+        return manager
+
+    @tier1
+    def test_exec_many_results_order(self, manager):
+        """
+        Test that the results are in the order of the commands, and that the
+        commands are spread over the pool's connections
+        """
+        cmds = [f"cmd-{i}" for i in range(20)]
+        results = manager.exec_many(cmds, concurrency=8)
+
+        assert [stdout.split(" on ")[0] for _, stdout, _ in results] == cmds
+        connection_ids = {stdout.split(" on ")[1] for _, stdout, _ in results}
+        assert 1 < len(connection_ids) <= 3
+        assert manager.exec_many([]) == []
@@ -0,0 +1,179 @@
+import logging
+import threading
+import time
+
+from framework.async_executor import AsyncRemoteExecutor
+from framework.customizations.marks import tier1, tier3
+from framework.ssh_connection_manager import ConnectionPool
+from noobaa_sa.exceptions import (
+    AccountDeletionFailed,
+    AccountStatusQueryFailed,
+    BucketDeletionFailed,
+)
+from noobaa_sa.records import BucketRecord, RecordListing
+from noobaa_sa.teardown import TeardownEngine
+
+log = logging.getLogger(__name__)
+
+
+class FakeConnection:
+    def close(self):
+        pass
+
+
+class DeletionLog:
+    """
+    Records the order of the deletions, and how many ran at once
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.deleted = []
+        self.running = 0
+        self.max_running = 0
+
+    def delete(self, kind, name, failing):
+        with self.lock:
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        time.sleep(0.02)
+        with self.lock:
+            self.running -= 1
+            self.deleted.append((kind, name))
+        if name in failing:
+            raise failing[name]
+
+
+class FakeBucketManager:
+    config_root = "/config"
+
+    def __init__(self, deletion_log, buckets, failing=None):
+        self.deletion_log = deletion_log
+        self.buckets = buckets
+        self.failing = failing or {}
+        self.listings = 0
+
+    def list_records(self, config_root=None):
+        self.listings += 1
+        return RecordListing(BucketRecord.from_dict(b) for b in self.buckets)
+
+    async def delete_async(
+        self, bucket_name, config_root=None, force=False, executor=None
+    ):
+        await executor.submit(
+            lambda conn: self.deletion_log.delete("bucket", bucket_name, self.failing)
+        )
+
+
+class FakeAccountManager:
+    def __init__(self, deletion_log, ids, failing=None):
+        self.deletion_log = deletion_log
+        self.ids = ids
+        self.failing = failing or {}
+
+    def get_cached_status(self, account_name, config_root=None):
+        if account_name not in self.ids:
+            raise AccountStatusQueryFailed(f"No such account {account_name}")
+        return {"name": account_name, "_id": self.ids[account_name]}
+
+    async def delete_async(self, account_name, config_root=None, executor=None):
+        await executor.submit(
+            lambda conn: self.deletion_log.delete("account", account_name, self.failing)
+        )
+
+
+BUCKETS = [
+    # Owned by _id
+    {"name": "bucket-1", "owner_account": "id-1", "bucket_owner": "account-1"},
+    # Older versions only record the owner by name
+    {"name": "bucket-2", "bucket_owner": "account-1"},
+    {"name": "bucket-3", "owner_account": "id-2", "bucket_owner": "account-2"},
+    {"name": "bucket-4", "owner_account": "id-3", "bucket_owner": "account-3"},
+    {"name": "bucket-5", "owner_account": "id-1", "bucket_owner": "account-1"},
+]
+
+
+class TestTeardownEngine:
+    """
+    Test deleting accounts and their buckets in parallel waves
+    """
+
+    def _engine(self, deletion_log, concurrency=2, bucket_failures=None, **kwargs):
+        bucket_manager = FakeBucketManager(deletion_log, BUCKETS, bucket_failures)
+        account_manager = FakeAccountManager(
+            deletion_log, {"account-1": "id-1", "account-2": "id-2"}, **kwargs
+        )
+        executor = AsyncRemoteExecutor(
+            concurrency=concurrency, pool=ConnectionPool(FakeConnection, size=4)
+        )
+        return TeardownEngine(bucket_manager, account_manager, executor=executor)
+
+    @tier1
+    def test_teardown_waves(self):
+        """
+        Test that the buckets of the accounts are found in a single listing,
+        and deleted before the accounts with bounded concurrency:
+        1. Tear down two accounts and an additional bucket
+        2. Verify that all the buckets of the accounts were found by owner
+           id or name
+        3. Verify that the buckets were deleted before the accounts, with no
+           more deletions at once than the executor's concurrency
+        """
+        deletion_log = DeletionLog()
+        engine = self._engine(deletion_log, concurrency=2)
+
+        result = engine.teardown(
+            accounts=["account-1", "account-2"], buckets=["bucket-4", "bucket-1"]
+        )
+
+        assert sorted(result.deleted_buckets) == [
+            "bucket-1",
+            "bucket-2",
+            "bucket-3",
+            "bucket-4",
+            "bucket-5",
+        ]
+        assert result.deleted_accounts == ["account-1", "account-2"]
+        assert result.failures == []
+        assert engine.bucket_manager.listings == 1
+        kinds = [kind for kind, _ in deletion_log.deleted]
+        assert kinds == ["bucket"] * 5 + ["account"] * 2
+        assert deletion_log.max_running == 2
+
+    @tier3
+    def test_failures_dont_stop_the_teardown(self):
+        """
+        Test that the failures are collected while the rest is deleted, and
+        that an account without a status still has its buckets found by name
+        """
+        deletion_log = DeletionLog()
+        bucket_error = BucketDeletionFailed("bucket-1 is busy")
+        account_error = AccountDeletionFailed("account-1 has buckets")
+        engine = self._engine(
+            deletion_log,
+            bucket_failures={"bucket-1": bucket_error},
+            failing={"account-1": account_error},
+        )
+
+        result = engine.teardown(accounts=["account-1", "account-3"])
+
+        assert sorted(result.deleted_buckets) == ["bucket-2", "bucket-4", "bucket-5"]
+        assert result.deleted_accounts == ["account-3"]
+        assert result.failures == [
+            ("bucket", "bucket-1", bucket_error),
+            ("account", "account-1", account_error),
+        ]
+
+    @tier1
+    def test_buckets_only(self):
+        """
+        Test that tearing down buckets alone doesn't list the buckets
+        """
+        deletion_log = DeletionLog()
+        engine = self._engine(deletion_log)
+
+        result = engine.teardown(buckets=["bucket-3", "bucket-3"])
+
+        assert result.deleted_buckets == ["bucket-3"]
+        assert result.deleted_accounts == []
+        assert engine.bucket_manager.listings == 0
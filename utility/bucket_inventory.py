@@ -0,0 +1,280 @@
+"""
+Local SQLite inventory of bucket contents
+
+"""
+
+import logging
+import sqlite3
+
+log = logging.getLogger(__name__)
+
+INSERT_BATCH_SIZE = 1000
+
+
+class BucketInventory:
+    """
+    A local index of the objects in an S3 bucket
+
+    The bucket listing is streamed into an SQLite database once, after which
+    questions such as whether a key exists, what its size is or which
+    version is the latest are answered by local queries instead of
+    relisting the bucket.
+
+    Example usage:
+        inventory = BucketInventory(s3_client, bucket_name, versioned=True)
+        inventory.refresh()
+        assert inventory.exists("dir/obj")
+        latest_version_id = inventory.get_latest_version("dir/obj")
+
+    """
+
+    def __init__(self, s3_client, bucket_name, db_path=":memory:", versioned=False):
+        """
+        Args:
+            s3_client (S3Client): The client used to list the bucket
+            bucket_name (str): The name of the bucket to index
+            db_path (str): The path of the SQLite database file.
+                           Defaults to an in-memory database.
+            versioned (bool): Whether to index all the object versions and
+                              delete markers, or only the current objects
+
+        """
+        self.s3_client = s3_client
+        self.bucket_name = bucket_name
+        self.versioned = versioned
+        self._db = sqlite3.connect(db_path)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS objects ("
+            "key TEXT NOT NULL, "
+            "version_id TEXT NOT NULL, "
+            "size INTEGER, "
+            "etag TEXT, "
+            "last_modified TEXT, "
+            "is_latest INTEGER NOT NULL, "
+            "is_delete_marker INTEGER NOT NULL, "
+            "PRIMARY KEY (key, version_id))"
+        )
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS latest_objects ON objects (is_latest, key)"
+        )
+        self._db.commit()
+
+    def refresh(self, prefix=""):
+        """
+        Rebuild the part of the inventory that is under the given prefix
+        from a fresh streamed listing of the bucket
+
+        Args:
+            prefix (str): The prefix to refresh. Refreshes the whole
+                          inventory if empty.
+
+        Returns:
+            int: The number of entries that were indexed under the prefix
+
+        """
+        log.info(
+            f"Refreshing the inventory of s3://{self.bucket_name}/{prefix} "
+            f"(versioned: {self.versioned})"
+        )
+        with self._db:
+            self._db.execute(
+                "DELETE FROM objects WHERE substr(key, 1, ?) = ?",
+                (len(prefix), prefix),
+            )
+            indexed_count = 0
+            batch = []
+            for row in self._iter_listing_rows(prefix):
+                batch.append(row)
+                if len(batch) >= INSERT_BATCH_SIZE:
+                    self._insert_rows(batch)
+                    indexed_count += len(batch)
+                    batch = []
+            self._insert_rows(batch)
+            indexed_count += len(batch)
+
+        log.info(f"Indexed {indexed_count} entries under s3://{self.bucket_name}/{prefix}")
+        return indexed_count
+
+    def exists(self, key):
+        """
+        Check whether a key currently exists in the bucket
+
+        Args:
+            key (str): The object key
+
+        Returns:
+            bool: True if the latest version of the key is not a delete marker
+
+        """
+        row = self._query_latest(key, "is_delete_marker")
+        return row is not None and not row[0]
+
+    def get_size(self, key):
+        """
+        Get the size of the latest version of an object
+
+        Args:
+            key (str): The object key
+
+        Returns:
+            int|None: The size in bytes, or None if the key doesn't exist
+
+        """
+        return self._query_latest_value(key, "size")
+
+    def get_etag(self, key):
+        """
+        Get the ETag of the latest version of an object
+
+        Args:
+            key (str): The object key
+
+        Returns:
+            str|None: The ETag, or None if the key doesn't exist
+
+        """
+        return self._query_latest_value(key, "etag")
+
+    def get_latest_version(self, key):
+        """
+        Get the version ID of the latest version of an object
+
+        Args:
+            key (str): The object key
+
+        Returns:
+            str|None: The version ID, or None if the key doesn't exist
+
+        """
+        return self._query_latest_value(key, "version_id")
+
+    def get_versions(self, key):
+        """
+        Get all the indexed versions of an object, newest first
+
+        Args:
+            key (str): The object key
+
+        Returns:
+            list: A list of dictionaries with the indexed fields of each version
+
+        """
+        cursor = self._db.execute(
+            "SELECT key, version_id, size, etag, last_modified, is_latest, "
+            "is_delete_marker FROM objects WHERE key = ? "
+            "ORDER BY is_latest DESC, last_modified DESC",
+            (key,),
+        )
+        columns = [description[0] for description in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor]
+
+    def keys(self, prefix=""):
+        """
+        Iterate over the keys that currently exist under a prefix, in order
+
+        Args:
+            prefix (str): The prefix of the keys
+
+        Yields:
+            str: The object keys
+
+        """
+        cursor = self._db.execute(
+            "SELECT key FROM objects WHERE is_latest = 1 AND is_delete_marker = 0 "
+            "AND substr(key, 1, ?) = ? ORDER BY key",
+            (len(prefix), prefix),
+        )
+        for (key,) in cursor:
+            yield key
+
+    def count(self, prefix=""):
+        """
+        Count the objects that currently exist under a prefix
+
+        Args:
+            prefix (str): The prefix of the keys
+
+        Returns:
+            int: The number of objects
+
+        """
+        return self._query_aggregate("COUNT(*)", prefix)
+
+    def total_size(self, prefix=""):
+        """
+        Sum the sizes of the objects that currently exist under a prefix
+
+        Args:
+            prefix (str): The prefix of the keys
+
+        Returns:
+            int: The total size in bytes
+
+        """
+        return self._query_aggregate("COALESCE(SUM(size), 0)", prefix)
+
+    def close(self):
+        """
+        Close the underlying database connection
+        """
+        self._db.close()
+
+    def _iter_listing_rows(self, prefix):
+        """
+        Stream the bucket listing as rows of the objects table
+
+        Args:
+            prefix (str): The prefix to list
+
+        Yields:
+            tuple: A row of the objects table
+
+        """
+        if not self.versioned:
+            for obj in self.s3_client.iter_objects(self.bucket_name, prefix):
+                yield (
+                    obj["Key"],
+                    "null",
+                    obj["Size"],
+                    obj["ETag"],
+                    obj["LastModified"].isoformat(),
+                    1,
+                    0,
+                )
+            return
+
+        for entry, is_delete_marker in self.s3_client.iter_object_versions(
+            self.bucket_name, prefix
+        ):
+            yield (
+                entry["Key"],
+                entry["VersionId"],
+                entry.get("Size"),
+                entry.get("ETag"),
+                entry["LastModified"].isoformat(),
+                int(entry["IsLatest"]),
+                int(is_delete_marker),
+            )
+
+    def _insert_rows(self, rows):
+        self._db.executemany(
+            "INSERT OR REPLACE INTO objects VALUES (?, ?, ?, ?, ?, ?, ?)", rows
+        )
+
+    def _query_latest(self, key, column):
+        return self._db.execute(
+            f"SELECT {column} FROM objects WHERE is_latest = 1 AND key = ?", (key,)
+        ).fetchone()
+
+    def _query_latest_value(self, key, column):
+        row = self._query_latest(key, f"{column}, is_delete_marker")
+        if row is None or row[1]:
+            return None
+        return row[0]
+
+    def _query_aggregate(self, expression, prefix):
+        return self._db.execute(
+            f"SELECT {expression} FROM objects WHERE is_latest = 1 "
+            "AND is_delete_marker = 0 AND substr(key, 1, ?) = ?",
+            (len(prefix), prefix),
+        ).fetchone()[0]
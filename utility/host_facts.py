@@ -0,0 +1,123 @@
+"""
+Session cache of facts about the remote machine that hosts the NSFS server
+
+"""
+
+import logging
+import threading
+
+from framework.remote_batch import RemoteBatch
+from framework.ssh_connection_manager import SSHConnectionManager
+from noobaa_sa import constants
+
+log = logging.getLogger(__name__)
+
+# The commands that probe the raw facts - all of them run in a single batch
+FACT_PROBES = {
+    "home_dir": "echo $HOME",
+    "rpm_name": "rpm -qa | grep noobaa",
+    "config_dir_redirect": f"cat {constants.DEFAULT_CONFIG_ROOT_PATH}/config_dir_redirect",
+    "passwd": "getent passwd",
+    "group": "getent group",
+    "cpu_count": "nproc",
+    "mem_total_kb": "awk '/MemTotal/ {print $2}' /proc/meminfo",
+}
+
+_host_facts_cache = {}
+_host_facts_lock = threading.Lock()
+_host_locks = {}
+
+
+def get_host_facts(conn=None, refresh=False):
+    """
+    Get the facts of a remote host, probing them only once per session
+
+    Args:
+        conn (Connection): The connection to the host.
+                           Defaults to the SSHConnectionManager connection.
+        refresh (bool): Whether to probe the host again even if cached
+
+    Returns:
+        dict: The host facts with the following keys:
+              - "home_dir" (str): The home directory of the connected user
+              - "rpm_name" (str): The name of the installed NooBaa RPM
+              - "config_root" (str): The config root the NSFS service uses
+              - "users" (dict): Usernames mapped to (uid, gid) tuples
+              - "groups" (dict): Group names mapped to gids
+              - "cpu_count" (int): The number of available CPUs
+              - "mem_total_bytes" (int): The total memory in bytes
+
+    """
+    conn = conn or SSHConnectionManager().connection
+    # Each host is probed under its own lock, so hosts can be probed in parallel
+    with _host_facts_lock:
+        host_lock = _host_locks.setdefault(conn.host, threading.Lock())
+    with host_lock:
+        if refresh or conn.host not in _host_facts_cache:
+            _host_facts_cache[conn.host] = _probe_host_facts(conn)
+        return _host_facts_cache[conn.host]
+
+
+def invalidate_host_facts(host=None):
+    """
+    Drop the cached facts so they are probed again on the next access
+
+    Should be called whenever the host or the NSFS service is reconfigured.
+
+    Args:
+        host (str): The host to drop the facts of. Drops all hosts if None.
+
+    """
+    with _host_facts_lock:
+        if host is None:
+            _host_facts_cache.clear()
+        else:
+            _host_facts_cache.pop(host, None)
+
+
+def _probe_host_facts(conn):
+    """
+    Probe the facts of a remote host in a single round trip
+
+    Args:
+        conn (Connection): The connection to the host
+
+    Returns:
+        dict: The parsed host facts
+
+    """
+    log.info(f"Probing the host facts of {conn.host}")
+    batch = RemoteBatch(conn)
+    for name, cmd in FACT_PROBES.items():
+        batch.add(cmd, name=name)
+    raw_facts = {result.name: result for result in batch.run()}
+
+    users = {}
+    for line in raw_facts["passwd"].stdout.splitlines():
+        fields = line.split(":")
+        if len(fields) >= 4:
+            users[fields[0]] = (int(fields[2]), int(fields[3]))
+    groups = {}
+    for line in raw_facts["group"].stdout.splitlines():
+        fields = line.split(":")
+        if len(fields) >= 3:
+            groups[fields[0]] = int(fields[2])
+
+    config_dir_redirect = raw_facts["config_dir_redirect"]
+    config_root = (
+        config_dir_redirect.stdout.strip()
+        if config_dir_redirect.retcode == 0 and config_dir_redirect.stdout.strip()
+        else constants.DEFAULT_CONFIG_ROOT_PATH
+    )
+    cpu_count = raw_facts["cpu_count"].stdout.strip()
+    mem_total_kb = raw_facts["mem_total_kb"].stdout.strip()
+
+    return {
+        "home_dir": raw_facts["home_dir"].stdout.strip(),
+        "rpm_name": raw_facts["rpm_name"].stdout.strip(),
+        "config_root": config_root,
+        "users": users,
+        "groups": groups,
+        "cpu_count": int(cpu_count) if cpu_count.isdigit() else 0,
+        "mem_total_bytes": int(mem_total_kb) * 1024 if mem_total_kb.isdigit() else 0,
+    }
@@ -0,0 +1,165 @@
+"""
+Allocation of Linux users and groups on the remote machine in bulk
+
+"""
+
+import logging
+import random
+import string
+import threading
+
+from framework.remote_batch import RemoteBatch
+from framework.ssh_connection_manager import SSHConnectionManager
+from utility.host_facts import get_host_facts, invalidate_host_facts
+
+log = logging.getLogger(__name__)
+
+DEFAULT_ID_RANGE = (1000, 9999)
+USERNAME_LENGTH = 8
+
+
+class LinuxUserAllocator:
+    """
+    Creates Linux users, each with its own group, in a single round trip
+
+    The free usernames, uids and gids are picked locally from the passwd and
+    group databases in the cached host facts, instead of checking every
+    candidate on the remote machine. The users and groups are then created,
+    and later deleted, in one batch.
+
+    Example usage:
+        allocator = LinuxUserAllocator()
+        users = allocator.create(10)
+        for uid, gid, username in users:
+            ...
+        allocator.cleanup()
+
+    """
+
+    def __init__(self, conn=None, id_range=DEFAULT_ID_RANGE):
+        """
+        Args:
+            conn (Connection): The connection to the host.
+                               Defaults to the SSHConnectionManager connection.
+            id_range (tuple): The inclusive range to pick the uids and gids from
+
+        """
+        self.conn = conn or SSHConnectionManager().connection
+        self.id_range = id_range
+        self.created_users = []
+        self._lock = threading.Lock()
+
+    def allocate(self, n):
+        """
+        Pick free usernames, uids and gids without creating anything
+
+        Args:
+            n (int): The number of users
+
+        Returns:
+            list: A (uid, gid, username) tuple per user
+
+        Raises:
+            ValueError: If the range doesn't have n free uids and gids
+
+        """
+        facts = get_host_facts(self.conn)
+        taken_names = set(facts["users"]) | set(facts["groups"])
+        taken_uids = {uid for uid, _ in facts["users"].values()}
+        taken_gids = set(facts["groups"].values())
+        # Also skip the ids of users that were created since the facts were probed
+        for uid, gid, username in self.created_users:
+            taken_names.update((username, f"group_{username}"))
+            taken_uids.add(uid)
+            taken_gids.add(gid)
+
+        ids = range(self.id_range[0], self.id_range[1] + 1)
+        free_uids = [uid for uid in ids if uid not in taken_uids]
+        free_gids = [gid for gid in ids if gid not in taken_gids]
+        if len(free_uids) < n or len(free_gids) < n:
+            raise ValueError(
+                f"Not enough free uids and gids in {self.id_range} for {n} users"
+            )
+
+        usernames = []
+        while len(usernames) < n:
+            username = "".join(
+                random.choice(string.ascii_lowercase) for _ in range(USERNAME_LENGTH)
+            )
+            if username in taken_names or f"group_{username}" in taken_names:
+                continue
+            taken_names.update((username, f"group_{username}"))
+            usernames.append(username)
+        return list(
+            zip(random.sample(free_uids, n), random.sample(free_gids, n), usernames)
+        )
+
+    def create(self, n=1):
+        """
+        Create users, each with a group of the same gid named group_<username>
+
+        Args:
+            n (int): The number of users to create
+
+        Returns:
+            list: A (uid, gid, username) tuple per created user
+
+        Raises:
+            ValueError: If any of the users or groups couldn't be created
+
+        """
+        with self._lock:
+            users = self.allocate(n)
+            log.info(f"Creating {n} Linux users")
+            batch = RemoteBatch(self.conn)
+            for uid, gid, username in users:
+                # useradd and groupadd lock the databases, so they run one at a time
+                # The group is removed again if the user can't be created
+                batch.add(
+                    f"sudo groupadd -g {gid} group_{username} && "
+                    f"{{ sudo useradd -u {uid} -g {gid} {username} || "
+                    f"{{ sudo groupdel group_{username}; false; }}; }}",
+                    name=username,
+                )
+            results = batch.run()
+            # The cached uid/gid maps of the host are now stale
+            invalidate_host_facts(self.conn.host)
+
+            failures = []
+            for user, result in zip(users, results):
+                if result.retcode == 0:
+                    self.created_users.append(user)
+                else:
+                    failures.append(f"{result.name}: {result.stdout or result.stderr}")
+            if failures:
+                raise ValueError(f"Failed to create users: {failures}")
+        return users
+
+    def cleanup(self):
+        """
+        Delete all the created users and their groups
+
+        Raises:
+            ValueError: If any of the users or groups couldn't be deleted
+
+        """
+        with self._lock:
+            if not self.created_users:
+                return
+            log.info(f"Deleting {len(self.created_users)} Linux users")
+            batch = RemoteBatch(self.conn)
+            for _, _, username in self.created_users:
+                batch.add(
+                    f"sudo userdel {username} && sudo groupdel group_{username}",
+                    name=username,
+                )
+            results = batch.run()
+            self.created_users = []
+            invalidate_host_facts(self.conn.host)
+        failures = [
+            f"{result.name}: {result.stdout or result.stderr}"
+            for result in results
+            if result.retcode != 0
+        ]
+        if failures:
+            raise ValueError(f"Failed to delete users: {failures}")
@@ -12,10 +12,13 @@ from common_ci_utils.file_system_utils import compare_md5sums
 from common_ci_utils.templating import Templating
 
 from framework import config
+from framework.remote_batch import RemoteBatch
+from framework.remote_transfer import download_directory, download_file
 from framework.ssh_connection_manager import SSHConnectionManager
 from noobaa_sa import constants
 from noobaa_sa.exceptions import MissingFileOrDirectory, UnexpectedBehaviour
 from noobaa_sa.s3_client import S3Client
+from utility.host_facts import invalidate_host_facts
 
 log = logging.getLogger(__name__)
 
@@ -31,9 +34,12 @@ def run_systemctl_command_on_nsfs_service(cmd):
         Tuple[int, str, str]: The return code, stdout and stderr of the command
 
     """
-    return SSHConnectionManager().connection.exec_cmd(
-        f"sudo systemctl {cmd} {constants.NSFS_SERVICE_NAME}"
-    )
+    conn = SSHConnectionManager().connection
+    result = conn.exec_cmd(f"sudo systemctl {cmd} {constants.NSFS_SERVICE_NAME}")
+    # A stop or a restart may pick up a new configuration of the service
+    if cmd != "status":
+        invalidate_host_facts(conn.host)
+    return result
 
 
 def get_nsfs_service_status():
@@ -96,23 +102,21 @@ def create_tls_key_and_cert(credentials_dir):
     log.info(
         f"Generating TLS key and certificate using openssl under {credentials_dir}"
     )
+    batch = RemoteBatch(conn)
 
     # Create the TLS key
-    conn.exec_cmd(f"sudo openssl genpkey -algorithm RSA -out {credentials_dir}/tls.key")
+    batch.add(f"sudo openssl genpkey -algorithm RSA -out {credentials_dir}/tls.key")
 
     # Create a SAN (Subject Alternative Name) configuration file to use with the CSR
-    with tempfile.NamedTemporaryFile(mode="w+") as tmp_file:
-        templating = Templating(base_path=config.ENV_DATA["template_dir"])
-        account_template = "openssl_san.cnf"
-        account_data_full = templating.render_template(
-            account_template, data={"nsfs_server_ip": conn.host}
-        )
-        tmp_file.write(account_data_full)
-        tmp_file.flush()
-        conn.upload_file(tmp_file.name, "/tmp/openssl_san.cnf")
+    templating = Templating(base_path=config.ENV_DATA["template_dir"])
+    account_template = "openssl_san.cnf"
+    account_data_full = templating.render_template(
+        account_template, data={"nsfs_server_ip": conn.host}
+    )
+    batch.add_file("/tmp/openssl_san.cnf", account_data_full, use_sudo=False)
 
     # Create a CSR (Certificate Signing Cequest) file
-    conn.exec_cmd(
+    batch.add(
         "sudo openssl req -new "
         f"-key {credentials_dir}/tls.key "
         f"-out {credentials_dir}/tls.csr "
@@ -121,7 +125,7 @@ def create_tls_key_and_cert(credentials_dir):
     )
 
     # Use the TLS key and CSR to create a self-signed certificate
-    conn.exec_cmd(
+    batch.add(
         "sudo openssl x509 -req -days 365 "
         f"-in {credentials_dir}/tls.csr "
         f"-signkey {credentials_dir}/tls.key "
@@ -130,6 +134,9 @@ def create_tls_key_and_cert(credentials_dir):
         "-extensions req_ext "
     )
 
+    # Run all the steps in a single round trip
+    batch.run()
+
     return f"{credentials_dir}/tls.crt"
 
 
@@ -254,6 +261,7 @@ def download_file_via_ssh(remotepath, localpath, use_sudo=True):
 
     Using this func with use_sudo enabled can be used as a workaround
     couldn't be downloaded via SFTP due to permissions issues.
+    The file is streamed in binary-safe chunks, see remote_transfer.download_file.
 
     Args:
         remotepath (str): The full path to the file on the remote machine
@@ -263,14 +271,61 @@ def download_file_via_ssh(remotepath, localpath, use_sudo=True):
     Raises:
         UnexpectedBehaviour: In case the file couldn't be downloaded
     """
+    download_file(remotepath, localpath, use_sudo=use_sudo)
+
+
+def download_nsfs_logs(local_dir, remote_log_path=constants.NSFS_LOG_PATH):
+    """
+    Download the NSFS server log compressed on the wire
+
+    The server keeps appending to the log, so a copy of it is downloaded
+    instead, which can be verified against its checksum.
+
+    Args:
+        local_dir (str): The local directory to download the log into
+        remote_log_path (str): The full path of the log on the remote machine
+
+    Returns:
+        str: The full path of the downloaded log on the local machine
+
+    Raises:
+        UnexpectedBehaviour: In case the log couldn't be copied or downloaded
+
+    """
     conn = SSHConnectionManager().connection
-    sudo = "sudo" if use_sudo else ""
-    with open(localpath, "wb") as f:
-        retcode, stdout, stderr = conn.exec_cmd(f"{sudo} cat {remotepath} ")
+    log_name = os.path.basename(remote_log_path)
+    local_log_path = os.path.join(local_dir, log_name)
+    log.info(f"Downloading the NSFS server log {remote_log_path} to {local_log_path}")
+    retcode, snapshot_dir, stderr = conn.exec_cmd("mktemp -d")
+    if retcode != 0:
+        raise UnexpectedBehaviour(f"Failed to create a temporary directory: {stderr}")
+    snapshot_path = f"{snapshot_dir}/{log_name}"
+    try:
+        retcode, _, stderr = conn.exec_cmd(f"sudo cp {remote_log_path} {snapshot_path}")
         if retcode != 0:
             raise UnexpectedBehaviour(
-                f"Failed to download file {remotepath} to {localpath}\n"
-                f"stdout: {stdout}\n"
-                f"stderr: {stderr}\n"
+                f"Failed to copy {remote_log_path} with error {stderr}"
             )
-        f.write(stdout.encode("UTF-8"))
+        download_file(
+            snapshot_path,
+            local_log_path,
+            use_sudo=True,
+            compress=True,
+            verify_checksum=True,
+        )
+    finally:
+        conn.exec_cmd(f"sudo rm -rf {snapshot_dir}")
+    return local_log_path
+
+
+def download_bucket_path(bucket_path, local_dir):
+    """
+    Download the on-disk contents of a bucket path for verification
+
+    Args:
+        bucket_path (str): The full path of the bucket directory on the remote machine
+        local_dir (str): The local directory to download the contents into
+
+    """
+    log.info(f"Downloading the contents of bucket path {bucket_path} to {local_dir}")
+    download_directory(bucket_path, local_dir, use_sudo=True, compress=True)
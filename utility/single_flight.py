@@ -0,0 +1,101 @@
+"""
+Single-flight suppression of duplicate concurrent calls
+
+"""
+
+import threading
+
+
+class _InFlightCall:
+    """
+    The shared state of a call that is currently being executed
+    """
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Merge identical concurrent calls into a single execution
+
+    While a call for a given key is in flight, any other thread that asks for
+    the same key waits for it and receives its result (or its exception)
+    instead of executing the call again. Once the call completes, the next
+    call for the key is executed anew, so results are never cached.
+
+    Example usage:
+        single_flight = SingleFlight()
+        result, shared = single_flight.do(("head_object", key), lambda: head(key))
+
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._in_flight = {}
+        self.executed_calls = 0
+        self.coalesced_calls = 0
+
+    def do(self, key, func):
+        """
+        Execute func, unless a call with the same key is already in flight
+
+        Args:
+            key (hashable): The key that identifies identical calls
+            func (func): The function to execute, without arguments
+
+        Returns:
+            tuple:
+                Any: The return value of the function
+                bool: True if the result was taken from an identical call
+                      that another caller had in flight
+
+        Raises:
+            Any exception: The exception raised by the executed function
+
+        """
+        with self._lock:
+            call = self._in_flight.get(key)
+            is_leader = call is None
+            if is_leader:
+                call = _InFlightCall()
+                self._in_flight[key] = call
+            else:
+                self.coalesced_calls += 1
+
+        if not is_leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = func()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+                self.executed_calls += 1
+            call.done.set()
+        return call.result, False
+
+    def get_stats(self):
+        """
+        Get the counters of the executed and coalesced calls
+
+        Returns:
+            dict: A dictionary with the following keys:
+                  - "executed_calls" (int): The number of calls that were executed
+                  - "coalesced_calls" (int): The number of calls that were saved
+                    by waiting for an identical in-flight call
+
+        """
+        with self._lock:
+            return {
+                "executed_calls": self.executed_calls,
+                "coalesced_calls": self.coalesced_calls,
+            }
@@ -2,6 +2,7 @@
 General utility functions
 """
 
+import functools
 import logging
 import os
 import random
@@ -10,10 +11,11 @@ import re
 import time
 
 from framework import config
-from framework.ssh_connection_manager import SSHConnectionManager
 from common_ci_utils.file_system_utils import compare_md5sums
 from common_ci_utils.random_utils import parse_size_to_bytes
+from jinja2 import Environment, FileSystemLoader
 from noobaa_sa.exceptions import TimeoutExpiredError
+from utility.host_facts import get_host_facts
 
 from utility.retry import logger
 
@@ -24,13 +26,33 @@ def get_noobaa_sa_host_home_path():
     """
     Get the full path of the home directory on the remote machine
 
+    The value is taken from the session's host facts cache.
+
     Returns:
         str: The full path of the home directory on the remote machine
 
     """
-    cmd = "echo $HOME"
-    _, stdout, _ = SSHConnectionManager().connection.exec_cmd(cmd)
-    return stdout
+    return get_host_facts()["home_dir"]
+
+
+@functools.lru_cache(maxsize=None)
+def get_compiled_template(template_name, template_dir=None):
+    """
+    Get a compiled Jinja2 template, loading and compiling it only once
+
+    Args:
+        template_name (str): The path of the template under the templates dir
+        template_dir (str): The templates dir. Defaults to ENV_DATA["template_dir"].
+
+    Returns:
+        jinja2.Template: The compiled template, to render with .render(**data)
+
+    """
+    j2_env = Environment(
+        loader=FileSystemLoader(template_dir or config.ENV_DATA["template_dir"]),
+        trim_blocks=True,
+    )
+    return j2_env.get_template(template_name)
 
 
 def get_current_test_name():
@@ -173,43 +195,6 @@ def camel_to_snake(s):
     return "".join(snake_case)
 
 
-def is_uid_gid_available(uid, gid):
-    """
-    Check if the UID and GID are available.
-
-    Args:
-        uid (int): The UID to check
-        gid (int): The GID to check
-
-    Returns:
-        bool: True if the UID and GID are available, False otherwise
-
-    """
-    conn = SSHConnectionManager().connection
-    check_uid_cmd = f"getent passwd {uid}"
-    check_gid_cmd = f"getent group {gid}"
-    uid_retcode, _, _ = conn.exec_cmd(check_uid_cmd)
-    gid_retcode, _, _ = conn.exec_cmd(check_gid_cmd)
-    return uid_retcode != 0 and gid_retcode != 0
-
-
-def is_linux_username_available(username):
-    """
-    Check if the username is available.
-
-    Args:
-        username (str): The username to check
-
-    Returns:
-        bool: True if the username is available, False otherwise
-
-    """
-    conn = SSHConnectionManager().connection
-    check_user_cmd = f"getent passwd {username}"
-    user_retcode, _, _ = conn.exec_cmd(check_user_cmd)
-    return user_retcode != 0
-
-
 def flatten_dict(d):
     """
     Flatten a nested dictionary into a single-level dictionary that contains
@@ -266,10 +251,7 @@ def get_noobaa_sa_rpm_name():
 
     """
     try:
-        conn = SSHConnectionManager().connection
-        cmd = "rpm -qa | grep noobaa"
-        _, stdout, _ = conn.exec_cmd(cmd)
-        return stdout.strip()
+        return get_host_facts()["rpm_name"]
     except Exception as e:
         log.error(e)
         return ""